@@ -0,0 +1,199 @@
+# calibrate_cost_model.py
+# 在合成的 ItemsAdder 参考包上测量 /api/convert 的耗时和峰值内存，拟合成本模型 (src/utils/cost_model.py)。
+#
+#   python calibrate_cost_model.py                 测量并拟合，样本写入 src/utils/cost_model_samples.json
+#   python calibrate_cost_model.py --fit-only      只用已有样本重新拟合
+#   python calibrate_cost_model.py --output m.json 另外导出模型，可通过环境变量 MCC_COST_MODEL 使用
+#
+# DEFAULT_COST_MODEL 的系数就是用 --fit-only 在仓库中的样本上得到的。换了硬件或转换流程有较大变化时，
+# 在目标机器上重新运行本脚本，把输出的系数写回 DEFAULT_COST_MODEL (或导出后用 MCC_COST_MODEL 指定)。
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+import shutil
+import zipfile
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+import yaml
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from src.utils.cost_model import CostModel, COST_FEATURES, cost_features
+
+SAMPLES_PATH = os.path.join(ROOT, 'src', 'utils', 'cost_model_samples.json')
+
+# 参考包: (物品数, 贴图数, 模型数, 每个模型的元素数, 贴图边长, 配置文件数, 动画贴图数, 贴图是否为噪声)
+# 噪声贴图几乎不可压缩 (字节数与像素数成正比)，纯色贴图像素多而字节少，用于区分两个特征
+REFERENCE_PACKS = [
+    (50, 50, 50, 1, 16, 1, 0, True),
+    (500, 100, 100, 2, 16, 1, 10, True),
+    (2000, 200, 200, 4, 32, 2, 0, True),
+    (5000, 500, 500, 8, 16, 2, 50, True),
+    (10000, 100, 100, 1, 16, 1, 0, True),
+    (20000, 1000, 1000, 2, 16, 4, 0, True),
+    (200, 2000, 100, 1, 16, 1, 0, True),
+    (200, 4000, 100, 1, 64, 1, 0, True),
+    (200, 1000, 100, 1, 256, 1, 0, False),
+    (200, 300, 100, 1, 512, 1, 0, False),
+    (200, 100, 2000, 10, 16, 1, 0, True),
+    (200, 100, 4000, 30, 16, 1, 0, True),
+    (200, 2000, 200, 1, 16, 1, 2000, True),
+    (1000, 8000, 8000, 4, 16, 4, 500, True),
+    (8000, 3000, 3000, 6, 32, 8, 300, True),
+]
+
+def _png(size, noise, rng):
+    if noise:
+        rows = [b'\x00' + rng.randbytes(4 * size) for _ in range(size)]
+    else:
+        rows = [b'\x00' + b'\x80\x40\x20\xff' * size] * size
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', size, size, 8, 6, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(b''.join(rows)))
+            + chunk(b'IEND', b''))
+
+def build_pack(items, textures, models, elements, texture_size, config_files, animated, noise, salt=""):
+    """
+    :param salt: 写入压缩包的附加内容，使每次测量的上传哈希不同 (避免命中报告缓存和共用的解析结果)
+    :return: 压缩包字节
+    """
+    rng = random.Random(items * 7 + textures)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        per_file = max(1, items // config_files)
+        for index in range(config_files):
+            entries = {}
+            for i in range(index * per_file, min(items, (index + 1) * per_file)):
+                entry = {
+                    'display_name': f'Item {i}',
+                    'lore': ['a line of lore', 'another'],
+                    'resource': {'material': 'PAPER', 'generate': False, 'model_path': f'item/m{i % max(models, 1)}'}
+                }
+                if i % 4 == 0:
+                    entry['behaviours'] = {'furniture': {'entity': 'item_display',
+                                                         'hitbox': {'height': 1, 'width': 1, 'length': 1}}}
+                entries[f'item{i}'] = entry
+            zip_ref.writestr(f'ItemsAdder/contents/ref/configs/items{index}.yml',
+                             yaml.safe_dump({'info': {'namespace': 'ref'}, 'items': entries}, sort_keys=False))
+        texture_dir = 'ItemsAdder/contents/ref/resourcepack/assets/ref/textures/item'
+        texture = _png(texture_size, noise, rng)
+        for i in range(textures):
+            zip_ref.writestr(f'{texture_dir}/t{i}.png', texture)
+        for i in range(min(animated, textures)):
+            zip_ref.writestr(f'{texture_dir}/t{i}.png.mcmeta', json.dumps({'animation': {'frametime': 2}}))
+        element = {'from': [0, -8, 0], 'to': [16, 16, 16], 'faces': {'north': {'uv': [0, 0, 16, 16], 'texture': '#0'}}}
+        for i in range(models):
+            zip_ref.writestr(f'ItemsAdder/contents/ref/resourcepack/assets/ref/models/item/m{i}.json',
+                             json.dumps({'textures': {'0': f'ref:item/t{i % max(textures, 1)}'},
+                                         'elements': [element] * elements}))
+        zip_ref.writestr('ItemsAdder/contents/ref/calibration.txt', salt)
+    return buffer.getvalue()
+
+def _load_app(work_dir):
+    # app 在导入时按当前目录创建临时目录
+    os.chdir(work_dir)
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('calibration_app', os.path.join(ROOT, 'web', 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # 每次测量都要真正执行转换
+    module.artifact_cache = None
+    return module
+
+def _analyze(client, pack, name):
+    """:return: /api/analyze 的响应 (含会话 ID 和报告)"""
+    return client.post('/api/analyze', data={'file': (io.BytesIO(pack), name)},
+                       content_type='multipart/form-data').get_json()
+
+def _convert(module, client, session_id, name):
+    """:return: 转换耗时秒数"""
+    form = {'session_id': session_id, 'source_format': 'ItemsAdder', 'target_format': 'CraftEngine'}
+    started = time.time()
+    job_id = client.post('/api/convert', data=form).get_json()['job_id']
+    job = module.conversion_jobs.get(job_id)
+    while not job.finished:
+        job.wait_events(len(job.wait_events()), timeout=1)
+    elapsed = time.time() - started
+    if job.state != module.DONE:
+        raise RuntimeError(f"conversion of {name} failed: {job.error}")
+    return elapsed
+
+def measure(packs):
+    """
+    依次转换各参考包，耗时和内存分两次测量 (tracemalloc 会明显拖慢转换)。
+    单进程串行解析，内存为转换期间 Python 分配的新增峰值 (不含进程基线)。
+    :return: 样本列表 [{"pack", "features", "seconds", "peak_memory_mb"}]
+    """
+    os.environ["MCC_SCAN_WORKERS"] = "1"
+    work_dir = tempfile.mkdtemp(prefix='mcc_calibration_')
+    try:
+        module = _load_app(work_dir)
+        client = module.app.test_client()
+        samples = []
+        for config in packs:
+            name = f"ref_{'_'.join(str(v) for v in config)}.zip"
+            # 转换过程的日志不输出
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                response = _analyze(client, build_pack(*config, salt="time"), name)
+                report = response['report']
+                seconds = _convert(module, client, response['session_id'], name)
+                response = _analyze(client, build_pack(*config, salt="memory"), name)
+                tracemalloc.start()
+                try:
+                    _convert(module, client, response['session_id'], name)
+                    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                finally:
+                    tracemalloc.stop()
+            features = cost_features(report)
+            samples.append({"pack": list(config), "features": features,
+                            "seconds": round(seconds, 3), "peak_memory_mb": round(peak, 2)})
+            print(f"{name}: {seconds:.2f}s, {peak:.1f} MB", flush=True)
+            for folder in ('UPLOAD_FOLDER', 'OUTPUT_FOLDER', 'EXTRACT_FOLDER'):
+                shutil.rmtree(module.app.config[folder], ignore_errors=True)
+                os.makedirs(module.app.config[folder])
+        module.conversion_jobs.shutdown()
+        return samples
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def fit(samples):
+    model = CostModel.calibrate([(s["features"], s["seconds"], s["peak_memory_mb"]) for s in samples])
+    print("time:", {name: float(f"{value:.4g}") for name, value in model.time_coefficients.items()})
+    print("memory:", {name: float(f"{value:.4g}") for name, value in model.memory_coefficients.items()})
+    for sample in samples:
+        estimate = model.estimate(sample["features"])
+        print(f"  {sample['pack']}: {sample['seconds']}s / {estimate['seconds']}s, "
+              f"{sample['peak_memory_mb']} MB / {estimate['peak_memory_mb']} MB")
+    return model
+
+def main():
+    parser = argparse.ArgumentParser(description="校准转换成本模型")
+    parser.add_argument('--fit-only', action='store_true', help="不测量，只用已有样本拟合")
+    parser.add_argument('--samples', default=SAMPLES_PATH, help="样本文件")
+    parser.add_argument('--output', help="导出拟合的模型 (CostModel.to_dict() 格式)")
+    args = parser.parse_args()
+    if args.fit_only:
+        with open(args.samples, 'r', encoding='utf-8') as f:
+            samples = json.load(f)["samples"]
+    else:
+        samples = measure(REFERENCE_PACKS)
+        with open(args.samples, 'w', encoding='utf-8') as f:
+            json.dump({"features": list(COST_FEATURES), "samples": samples}, f, indent=1)
+            f.write('\n')
+    model = fit(samples)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(model.to_dict(), f, indent=1)
+
+if __name__ == '__main__':
+    main()
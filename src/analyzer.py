@@ -1,12 +1,40 @@
 import os
 import yaml
-from src.utils.yaml_loader import safe_load_yaml
+from src.utils import yaml_loader
+from src.utils.yaml_loader import YAML_BACKEND, YAMLBudgetError
+from src.utils.document_store import scan_yaml_files, scan_yaml_blobs, scan_error_result
+from src.utils.file_index import FileIndex
+from src.utils.asset_stats import AssetStats, asset_type, PNG_HEADER_BYTES
+from src.utils.cost_model import cost_features, load_cost_model
+
+# 分析模式: full 解析全部 YAML；quick 每个文件识别出格式即停止，并只对部分 YAML 计数
+ANALYZE_MODES = ("full", "quick")
+# 快速模式参与条目计数的 YAML 字节数，其余文件按已计数部分的条目密度外推
+QUICK_SAMPLE_BYTES = 4 * 1024 * 1024
+# 仅凭文件夹名识别出的格式的置信度
+FOLDER_NAME_CONFIDENCE = 0.5
 
 class PackageAnalyzer:
-    def __init__(self, extract_path):
+    def __init__(self, extract_path, document_store=None, workers=None, zip_file=None, mode="full"):
+        if mode not in ANALYZE_MODES:
+            raise ValueError(f"unknown analyze mode: {mode}")
         self.extract_path = extract_path
+        self.mode = mode
+        # 可选的 zipfile.ZipFile。提供时直接从压缩包目录读取结构，只解压 YAML 成员到内存；
+        # extract_path 仍作为路径前缀 (压缩包稍后解压到该目录)，使文档存储中的路径与解压后一致
+        self.zip_file = zip_file
+        # 包内文件索引，analyze() 时构建，之后可供调用方复用
+        self.file_index = None
+        # 可选的会话文档存储，分析时解析的结果会保留给转换阶段复用
+        self.document_store = document_store
+        # YAML 扫描的工作进程数 (None 为默认值，1 为串行)
+        self.workers = workers
         self.report = {
+            # 快速模式下为 False，计数为估计值 (见 estimates)
+            "exact": mode == "full",
             "formats": [],          # [IA, CE, NEXO]
+            # 各格式的检测置信度 (0 ~ 1，取所有文件中的最大值)；仅凭文件夹名识别的格式为 0.5
+            "format_confidence": {},
             "content_types": set(), # {装饰, 贴图, 装备, 模型}
             "completeness": {
                 "items_config": False,
@@ -17,6 +45,19 @@ class PackageAnalyzer:
                 "item_count": 0,
                 "texture_count": 0,
                 "model_count": 0
+            },
+            # YAML 解析后端统计，便于确认生产环境是否启用了 libyaml
+            "yaml_loader": {
+                "backend": YAML_BACKEND,
+                "files": {},
+                # 每个 YAML 文件探测到的编码 (相对路径 -> 编码)
+                "encodings": {},
+                # 制表符缩进修复记录 (相对路径 -> 行号列表)
+                "tab_repairs": {},
+                # 解析失败被跳过的块 (相对路径 -> 起始行号列表)
+                "skipped_blocks": {},
+                # 超出解析限制被拒绝的文件 (相对路径 -> 原因)
+                "rejected": {}
             }
         }
 
@@ -24,23 +65,32 @@ class PackageAnalyzer:
         # 1. 扫描文件结构和 YAML 内容
         has_ia_structure = False
         has_ce_structure = False
-        
-        for root, dirs, files in os.walk(self.extract_path):
+        yaml_files = []
+        assets = AssetStats()
+        # 需要读取内容才能统计的资源 (只在完整分析时读取)
+        png_files = []
+        model_files = []
+        mcmeta_files = []
+
+        # 压缩包按成员顺序生成虚拟目录树，不解压
+        if self.zip_file is None:
+            self.file_index = FileIndex.from_directory(self.extract_path)
+        else:
+            self.file_index = FileIndex.from_zip(self.zip_file, self.extract_path)
+
+        for root, dirs, files in self.file_index.walk(self.extract_path):
             # 0. 基于文件夹名称的启发式检测
             # 检查当前目录名是否具有特定特征
             current_dir_name = os.path.basename(root).lower()
             
             if current_dir_name == "itemsadder" or "itemsadder" in dirs:
-                if "ItemsAdder" not in self.report["formats"]:
-                    self.report["formats"].append("ItemsAdder")
+                self._add_format("ItemsAdder", FOLDER_NAME_CONFIDENCE)
             
             if current_dir_name == "craftengine" or "craftengine" in dirs:
-                if "CraftEngine" not in self.report["formats"]:
-                    self.report["formats"].append("CraftEngine")
+                self._add_format("CraftEngine", FOLDER_NAME_CONFIDENCE)
             
             if current_dir_name == "nexo" or "nexo" in dirs:
-                if "Nexo" not in self.report["formats"]:
-                    self.report["formats"].append("Nexo")
+                self._add_format("Nexo", FOLDER_NAME_CONFIDENCE)
 
             # 检查资源文件
             if "textures" in dirs or "textures" in root:
@@ -54,102 +104,188 @@ class PackageAnalyzer:
             if "resourcepack" in dirs:
                 self.report["completeness"]["resource_files"] = True
 
+            in_models = "models" in os.path.relpath(root, self.extract_path).split(os.sep)
             for file in files:
+                file_path = os.path.join(root, file)
                 if file.endswith((".yml", ".yaml")):
-                    self._analyze_yaml(os.path.join(root, file))
+                    yaml_files.append(file_path)
+                kind = asset_type(file, in_models)
+                entry = self.file_index.entry(file_path)
+                assets.add_file(kind, entry.size if entry is not None else 0)
+                if kind == "textures":
+                    png_files.append(file_path)
+                elif kind == "models":
+                    model_files.append(file_path)
+                elif kind == "texture_meta":
+                    mcmeta_files.append(file_path)
+
+        # 各文件互不依赖，可并行解析；结果按遍历顺序合并，保证报告稳定
+        if self.mode == "quick":
+            # 每个文件都做识别出格式即停止的浅层扫描，只出现在靠后文件中的格式也能识别；
+            # 字节预算只限制参与条目计数的文件
+            sample = self._quick_sample(yaml_files)
+            results = self._read_and_scan(yaml_files, self.workers, quick=True)
+        elif self.zip_file is None:
+            results = scan_yaml_files(yaml_files, self.workers)
+        else:
+            results = self._read_and_scan(yaml_files, self.workers)
+        if self.mode == "quick":
+            sampled = set(sample)
+            for result in results:
+                if result["path"] not in sampled and result["error"] is None:
+                    # 抽样外文件的条目数由 _record_estimates 按抽样部分的密度外推
+                    result["shape"]["item_count"] = None
+        for result in results:
+            self._record_scan_result(result)
+        if self.mode == "quick":
+            self._record_estimates(yaml_files, sample)
+        else:
+            self._inspect_assets(assets, png_files, model_files, mcmeta_files)
+        self.report["assets"] = assets.to_dict()
+        features = cost_features(self.report)
+        self.report["cost_estimate"] = dict(load_cost_model().estimate(features), features=features)
 
         # 转换 set 为 list 以便 JSON 序列化
         self.report["content_types"] = list(self.report["content_types"])
         
         return self.report
 
-    def _analyze_yaml(self, file_path):
-        try:
-            data = safe_load_yaml(file_path)
-            if not data: return
+    def _file_size(self, path):
+        entry = self.file_index.entry(path)
+        return entry.size if entry is not None and entry.size is not None else 0
 
-            # 检测格式 (现在是并行的，一个文件可能只属于一种格式，但整个包可能包含多种)
-            # 注意：这里我们移除了 elif，因为我们想全面扫描
-            # 不过通常单个 YAML 文件不太可能同时是两种格式的有效配置
-            # 但为了逻辑严谨，我们分别检测
-            
-            is_ia = self._is_ia_config(data)
-            is_ce = self._is_ce_config(data)
-            is_nexo = self._is_nexo_config(data)
+    def _quick_sample(self, yaml_files):
+        # 按遍历顺序抽样计数，累计大小超出预算后不再计入 (至少计入一个文件)
+        sample = []
+        sampled_bytes = 0
+        for path in yaml_files:
+            size = self._file_size(path)
+            if sample and sampled_bytes + size > QUICK_SAMPLE_BYTES:
+                break
+            sample.append(path)
+            sampled_bytes += size
+        return sample
 
-            if is_ia:
-                if "ItemsAdder" not in self.report["formats"]:
-                    self.report["formats"].append("ItemsAdder")
-                
-                if "items" in data:
-                    self.report["completeness"]["items_config"] = True
-                    self.report["content_types"].add("装备")
-                    if isinstance(data["items"], dict):
-                        self.report["details"]["item_count"] += len(data["items"])
-                        # 进一步检测类型
-                        for item in data["items"].values():
-                            if "behaviours" in item:
-                                if "furniture" in item["behaviours"]:
-                                    self.report["content_types"].add("装饰")
-                                
-                if "categories" in data:
-                    self.report["completeness"]["categories_config"] = True
-                    
-            if is_ce:
-                    if "CraftEngine" not in self.report["formats"]:
-                        self.report["formats"].append("CraftEngine")
-                        
-            if is_nexo:
-                    if "Nexo" not in self.report["formats"]:
-                        self.report["formats"].append("Nexo")
-                
-        except Exception:
-            pass # 忽略无法解析的文件
-
-    def _is_ia_config(self, data):
-        # 简单的启发式检测 IA 配置
-        keys = ["items", "categories", "equipments", "armors_rendering", "recipes", "loots", "info"]
-        # ItemsAdder 配置通常有 info.namespace
-        if "info" in data and "namespace" in data["info"]:
-            return True
-        # 或者包含特定的 IA 键
-        for k in keys:
-            if k in data:
-                # 进一步检查结构以避免误判
-                if k == "items" and isinstance(data[k], dict):
-                    # 检查 item 结构是否有 IA 特征 (如 resource)
-                    first_item = next(iter(data[k].values()), {})
-                    if "resource" in first_item or "behaviours" in first_item:
-                        return True
-        return False
-
-    def _is_ce_config(self, data):
-        # 检测 CraftEngine 配置
-        # CE 配置通常在 items 下有 'model' 且 model.type 为 minecraft:model 等
-        if "items" in data:
-            for item in data["items"].values():
-                if "behavior" in item and "type" in item["behavior"]:
-                    if item["behavior"]["type"] == "furniture_item":
-                        return True
-                if "model" in item:
-                    return True
-        return False
-
-    def _is_nexo_config(self, data):
-        # 检测 Nexo 配置
-        # Nexo 类似于 IA，但有一些特定字段
-        # 通常包含 'itemname', 'Pack', 'Mechanics', 'Components'
-        
-        if isinstance(data, dict):
-             for key, value in data.items():
-                 if isinstance(value, dict):
-                     if "Mechanics" in value:
-                         return True
-                     if "Pack" in value:
-                         return True
-                     if "Components" in value:
-                         return True
-                     if "itemname" in value:
-                         return True
-                         
-        return False
+    def _record_estimates(self, yaml_files, sample):
+        details = self.report["details"]
+        total_bytes = sum(self._file_size(path) for path in yaml_files)
+        sampled_bytes = sum(self._file_size(path) for path in sample)
+        if sampled_bytes and total_bytes > sampled_bytes:
+            details["item_count"] = int(round(details["item_count"] * total_bytes / sampled_bytes))
+        self.report["estimates"] = {
+            "item_count": details["item_count"],
+            "yaml_files": len(yaml_files),
+            "sampled_files": len(sample),
+            "yaml_bytes": total_bytes,
+            "sampled_bytes": sampled_bytes
+        }
+
+    def _read(self, path, size=-1):
+        if self.zip_file is not None:
+            with self.zip_file.open(self.file_index.entry(path).member) as f:
+                return f.read(size)
+        with open(path, 'rb') as f:
+            return f.read(size)
+
+    def _inspect_assets(self, assets, png_files, model_files, mcmeta_files):
+        # PNG 只读取 IHDR 头；模型和 mcmeta 需要解析 JSON，过大的文件按无效处理
+        max_bytes = yaml_loader.PARSE_LIMITS.max_bytes
+        for path in png_files:
+            try:
+                head = self._read(path, PNG_HEADER_BYTES)
+            except Exception:
+                head = b''
+            assets.add_png(head)
+        for path in model_files:
+            try:
+                raw = self._read(path) if self._file_size(path) <= max_bytes else b''
+            except Exception:
+                raw = b''
+            assets.add_model(raw)
+        for path in mcmeta_files:
+            try:
+                raw = self._read(path) if self._file_size(path) <= max_bytes else b''
+            except Exception:
+                raw = b''
+            assets.add_mcmeta(raw)
+
+    def _read_and_scan(self, yaml_files, workers, quick=False):
+        # 在当前进程读取内容 (压缩包成员或文件)，再交给 scan_yaml_blobs
+        max_bytes = yaml_loader.PARSE_LIMITS.max_bytes
+        items = []
+        errors = {}
+        for path in yaml_files:
+            entry = self.file_index.entry(path)
+            if entry.size is not None and entry.size > max_bytes:
+                # 不读取超出限制的文件
+                errors[path] = scan_error_result(path, YAMLBudgetError(
+                    f"document is {entry.size} bytes, limit is {max_bytes}"))
+                continue
+            try:
+                if self.zip_file is not None:
+                    raw = self.zip_file.read(entry.member)
+                else:
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+            except Exception as e:
+                errors[path] = scan_error_result(path, e)
+                continue
+            # 压缩包成员解压前修改时间未知，由文档存储在首次访问解压后的文件时确定
+            items.append((path, raw, len(raw), entry.mtime))
+        results = iter(scan_yaml_blobs(items, workers, quick))
+        return [errors[path] if path in errors else next(results) for path in yaml_files]
+
+    def _record_scan_result(self, result):
+        # 基于事件流的浅层扫描结果，只在必要时才构造了完整对象树
+        if result["error"] is not None:
+            if result.get("error_type") == "YAMLBudgetError":
+                rel_path = os.path.relpath(result["path"], self.extract_path).replace(os.sep, "/")
+                self.report["yaml_loader"]["rejected"][rel_path] = result["error"]
+            return # 忽略无法解析的文件
+        if self.document_store is not None and self.mode == "full":
+            # 快速模式的结果可能是估计值，不能供转换阶段复用
+            self.document_store.add_scan_result(result)
+        self._record_loader_info(result["path"], result["info"])
+        self._record_shape(result["shape"])
+
+    def _record_loader_info(self, file_path, info):
+        backend_counts = self.report["yaml_loader"]["files"]
+        backend = info.get("backend", YAML_BACKEND)
+        backend_counts[backend] = backend_counts.get(backend, 0) + 1
+        rel_path = os.path.relpath(file_path, self.extract_path).replace(os.sep, "/")
+        if "encoding" in info:
+            self.report["yaml_loader"]["encodings"][rel_path] = info["encoding"]
+        if info.get("tab_repairs"):
+            self.report["yaml_loader"]["tab_repairs"][rel_path] = [r["line"] for r in info["tab_repairs"]]
+        if info.get("chunk_errors"):
+            self.report["yaml_loader"]["skipped_blocks"][rel_path] = [e["line"] for e in info["chunk_errors"]]
+
+    def _add_format(self, name, confidence):
+        if name not in self.report["formats"]:
+            self.report["formats"].append(name)
+        confidences = self.report["format_confidence"]
+        confidences[name] = max(confidences.get(name, 0.0), confidence)
+
+    def _record_shape(self, shape):
+        # 检测格式 (一个文件通常只属于一种格式，但整个包可能包含多种)
+        for name in shape["formats"]:
+            if name not in self.report["formats"]:
+                self.report["formats"].append(name)
+        # 未达到阈值的格式也记录置信度
+        confidences = self.report["format_confidence"]
+        for name, confidence in shape["confidence"].items():
+            confidences[name] = max(confidences.get(name, 0.0), confidence)
+
+        top_keys = shape["top_keys"]
+        if "ItemsAdder" in shape["formats"]:
+            if "items" in top_keys:
+                self.report["completeness"]["items_config"] = True
+                self.report["content_types"].add("装备")
+                if shape["item_count"] is not None:
+                    self.report["details"]["item_count"] += shape["item_count"]
+                # 进一步检测类型
+                if shape["has_furniture"]:
+                    self.report["content_types"].add("装饰")
+
+            if "categories" in top_keys:
+                self.report["completeness"]["categories_config"] = True
@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
-import os
 import yaml
 from src.utils.yaml_loader import safe_load_yaml
+from src.utils.yaml_dumper import fast_dump
+from src.utils.output_sink import DirectorySink
+from src.utils.progress import NULL_PROGRESS
+
+# 转换输出的版本号，输出内容或结构变化时递增 (使已缓存的转换结果失效)
+CONVERTER_VERSION = 1
 
 # 自定义 YAML Dumper 以确保列表缩进正确
 class IndentDumper(yaml.Dumper):
@@ -16,10 +21,41 @@ def _recipe_represent_str(dumper, data):
 
 RecipeDumper.add_representer(str, _recipe_represent_str)
 
+def dump_yaml(data, dumper=IndentDumper):
+    """
+    按 IndentDumper / RecipeDumper 的格式序列化数据。
+    优先使用 libyaml 快速路径 (输出逐字节相同)，无法保证一致时退回纯 Python 发射器。
+
+    :param data: 要序列化的数据
+    :param dumper: IndentDumper 或 RecipeDumper
+    :return: YAML 文本
+    """
+    if dumper in (IndentDumper, RecipeDumper):
+        text = fast_dump(data, quote_strings=dumper is RecipeDumper)
+        if text is not None:
+            return text
+    return yaml.dump(data, Dumper=dumper, sort_keys=False, allow_unicode=True, default_flow_style=False)
+
 class BaseConverter(ABC):
     def __init__(self):
         self.config = {}
         self.namespace = "converted"
+        # 输出写入目标，默认直接写磁盘
+        self.output = DirectorySink(None)
+        # 进度报告 (各转换阶段和资源迁移)，默认不报告
+        self.progress = NULL_PROGRESS
+
+    def set_output(self, sink):
+        """
+        :param sink: OutputSink，配置和迁移的资源都通过它写出
+        """
+        self.output = sink
+
+    def set_progress(self, progress):
+        """
+        :param progress: Progress (如后台转换任务)，接收各阶段的进度
+        """
+        self.progress = progress
 
     @abstractmethod
     def convert(self, data, namespace=None):
@@ -53,10 +89,9 @@ class BaseConverter(ABC):
         :param data: 要写入的数据
         :param file_path: 文件路径
         """
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            if dumper is None:
-                dumper = IndentDumper
-            yaml.dump(data, f, Dumper=dumper, sort_keys=False, allow_unicode=True, default_flow_style=False)
-            f.write("\n#该配置由 MCC Tool 自动生成 \n")
-            f.write("#MCC Tool由闲鱼店铺：快乐售货铺 提供\n")
+        if dumper is None:
+            dumper = IndentDumper
+        text = (dump_yaml(data, dumper)
+                + "\n#该配置由 MCC Tool 自动生成 \n"
+                + "#MCC Tool由闲鱼店铺：快乐售货铺 提供\n")
+        self.output.write_text(file_path, text)
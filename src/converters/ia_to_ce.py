@@ -4,6 +4,7 @@ import re
 from turtle import position
 from .base import BaseConverter, RecipeDumper
 from src.migrators.ia_to_ce import IAMigrator
+from src.utils.source_fs import DirectorySource
 
 class IAConverter(BaseConverter):
     def __init__(self):
@@ -17,13 +18,26 @@ class IAConverter(BaseConverter):
         }
         self.ia_resourcepack_root = None
         self.ce_resourcepack_root = None
+        # 输入资源包的文件来源 (SourceFS)，模型读取和资源迁移共用
+        self.file_index = None
         self.generated_models = {} # 存储需要生成的模型
         self.armor_humanoid_keys = set()
         self.armor_leggings_keys = set()
 
-    def set_resource_paths(self, ia_root, ce_root):
+    def set_resource_paths(self, ia_root, ce_root, file_index=None):
+        """
+        :param ia_root: IA 资源包根目录
+        :param ce_root: CE 资源包输出目录
+        :param file_index: 可选，覆盖 ia_root 的 SourceFS (如直接读取压缩包的 ZipSource)；未提供时首次需要时遍历 ia_root 构建
+        """
         self.ia_resourcepack_root = ia_root
         self.ce_resourcepack_root = ce_root
+        self.file_index = file_index
+
+    def _resource_index(self):
+        if self.file_index is None:
+            self.file_index = DirectorySource.from_directory(self.ia_resourcepack_root)
+        return self.file_index
 
     def save_config(self, output_dir):
         """
@@ -35,7 +49,7 @@ class IAConverter(BaseConverter):
           categories.yml  (分类)
         """
         # 如果目录不存在则创建
-        os.makedirs(output_dir, exist_ok=True)
+        self.output.makedirs(output_dir)
         
         # 将物品分为护甲物品和其他物品
         armor_items = {}
@@ -53,6 +67,8 @@ class IAConverter(BaseConverter):
             else:
                 other_items[key] = value
 
+        self.progress.set_stage("writing")
+
         # 1. 保存 items.yml (其他物品 + 模板)
         items_data = {}
         if self.ce_config["templates"]:
@@ -89,7 +105,10 @@ class IAConverter(BaseConverter):
                 self.ce_resourcepack_root, 
                 self.namespace,
                 self.armor_humanoid_keys,
-                self.armor_leggings_keys
+                self.armor_leggings_keys,
+                file_index=self._resource_index(),
+                output_sink=self.output,
+                progress=self.progress
             )
             migrator.migrate()
             
@@ -98,9 +117,7 @@ class IAConverter(BaseConverter):
             models_root = os.path.join(self.ce_resourcepack_root, "assets", self.namespace, "models")
             for rel_path, content in self.generated_models.items():
                 full_path = os.path.join(models_root, rel_path)
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, 'w', encoding='utf-8') as f:
-                    json.dump(content, f, indent=4)
+                self.output.write_text(full_path, json.dumps(content, indent=4))
 
     def convert(self, ia_data, namespace=None):
         if namespace:
@@ -110,6 +127,7 @@ class IAConverter(BaseConverter):
 
         # 转换物品
         if "items" in ia_data:
+            self.progress.set_stage("converting_items", len(ia_data["items"]))
             self._convert_items(ia_data["items"])
 
         # 转换装备 (旧方式)
@@ -122,10 +140,14 @@ class IAConverter(BaseConverter):
 
         # 转换分类
         if "categories" in ia_data:
+            self.progress.set_stage("converting_categories", len(ia_data["categories"]))
             self._convert_categories(ia_data["categories"])
 
         if "recipes" in ia_data:
-            self._convert_recipes(ia_data["recipes"])
+            recipes = ia_data["recipes"]
+            total = sum(len(group) for group in recipes.values() if isinstance(group, dict)) if isinstance(recipes, dict) else 0
+            self.progress.set_stage("converting_recipes", total)
+            self._convert_recipes(recipes)
         
         # 自动生成分类 (如果不存在)
         if not self.ce_config["categories"] and self.ce_config["items"]:
@@ -165,6 +187,7 @@ class IAConverter(BaseConverter):
     def _convert_items(self, items_data):
         for item_key, item_data in items_data.items():
             self._convert_item(item_key, item_data)
+            self.progress.advance()
     
     def _normalize_equipment_key(self, raw_path):
         if not raw_path:
@@ -216,6 +239,7 @@ class IAConverter(BaseConverter):
         将 ItemsAdder 分类转换为 CraftEngine 分类
         """
         for cat_key, cat_data in categories_data.items():
+            self.progress.advance()
             ce_cat_id = f"{self.namespace}:{cat_key}"
             
             # 映射物品列表
@@ -322,6 +346,7 @@ class IAConverter(BaseConverter):
             if not isinstance(group_data, dict):
                 continue
             for recipe_key, recipe_data in group_data.items():
+                self.progress.advance()
                 if not isinstance(recipe_data, dict):
                     continue
                 if recipe_data.get("enabled") is False:
@@ -634,12 +659,11 @@ class IAConverter(BaseConverter):
             
         full_path = os.path.join(self.ia_resourcepack_root, "assets", target_namespace, "models", f"{clean_path}.json")
         print(f"Full path: {full_path}")
-        if not os.path.exists(full_path):
+        if not self._resource_index().isfile(full_path):
             return 0.5
             
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                model_data = json.load(f)
+            model_data = json.loads(self._resource_index().read_bytes(full_path).decode('utf-8'))
                 
             elements = model_data.get("elements", [])
             has_negative = False
@@ -955,18 +979,19 @@ class IAConverter(BaseConverter):
         if rel_path.endswith(".json"):
             rel_path = rel_path[:-5]
             
+        index = self._resource_index()
         # 尝试每个变体
         for suffix in variants:
             check_path = f"{rel_path}{suffix}"
             
             # 1. 尝试 assets/<namespace>/models/<check_path>.json
             full_path = os.path.join(self.ia_resourcepack_root, "assets", ns, "models", f"{check_path}.json")
-            if os.path.exists(full_path):
+            if index.exists(full_path):
                  return check_path if ":" not in base_path else f"{ns}:{check_path}"
                  
             # 2. 尝试 <namespace>/models/<check_path>.json (非标准)
             full_path_2 = os.path.join(self.ia_resourcepack_root, ns, "models", f"{check_path}.json")
-            if os.path.exists(full_path_2):
+            if index.exists(full_path_2):
                  return check_path if ":" not in base_path else f"{ns}:{check_path}"
 
         # 如果都没找到，返回默认 (第一个变体)
@@ -1,8 +1,9 @@
 import os
-import re
 import json
 from .base import BaseConverter, RecipeDumper
 from src.migrators.nexo_to_ce import NexoMigrator
+from src.utils import yaml_loader
+from src.utils.yaml_loader import YAMLBudgetError
 
 class NexoConverter(BaseConverter):
     def __init__(self):
@@ -16,17 +17,21 @@ class NexoConverter(BaseConverter):
         }
         self.nexo_resourcepack_root = None
         self.ce_resourcepack_root = None
+        # 可选，覆盖 nexo_resourcepack_root 的 SourceFS，交给资源迁移复用
+        self.file_index = None
         self.generated_models = {} 
         self.armor_humanoid_keys = set()
         self.armor_leggings_keys = set()
         self.source_namespaces = set()
 
-    def set_resource_paths(self, nexo_root, ce_root):
+    def set_resource_paths(self, nexo_root, ce_root, file_index=None):
         self.nexo_resourcepack_root = nexo_root
         self.ce_resourcepack_root = ce_root
+        self.file_index = file_index
 
     def save_config(self, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
+        self.progress.set_stage("writing")
+        self.output.makedirs(output_dir)
         
         armor_items = {}
         other_items = {}
@@ -76,7 +81,10 @@ class NexoConverter(BaseConverter):
                 self.namespace,
                 self.armor_humanoid_keys,
                 self.armor_leggings_keys,
-                source_namespaces=self.source_namespaces
+                source_namespaces=self.source_namespaces,
+                file_index=self.file_index,
+                output_sink=self.output,
+                progress=self.progress
             )
             migrator.migrate()
             
@@ -84,9 +92,7 @@ class NexoConverter(BaseConverter):
             models_root = os.path.join(self.ce_resourcepack_root, "assets", self.namespace, "models")
             for rel_path, content in self.generated_models.items():
                 full_path = os.path.join(models_root, rel_path)
-                os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                with open(full_path, 'w', encoding='utf-8') as f:
-                    json.dump(content, f, indent=4)
+                self.output.write_text(full_path, json.dumps(content, indent=4))
 
     def convert(self, nexo_data, namespace=None):
         if namespace:
@@ -97,6 +103,8 @@ class NexoConverter(BaseConverter):
         # 我们需要区分物品和其他可能的键（如果有）。
         # 然而，查看示例，文件似乎就是物品列表。
         
+        # 物品可能嵌套在分组中，总数未知
+        self.progress.set_stage("converting_items")
         self._convert_items(nexo_data)
         
         # 如果需要，自动生成分类
@@ -126,10 +134,31 @@ class NexoConverter(BaseConverter):
         }
         self.ce_config["categories"][cat_id] = ce_category
 
+    @staticmethod
+    def check_nesting(items_data):
+        """
+        检查物品分组的嵌套深度 (不超过解析限制的 max_depth)，转换前按文件调用以便跳过有问题的文件。
+        :param items_data: 物品配置
+        :raises: YAMLBudgetError 嵌套过深时
+        """
+        if not isinstance(items_data, dict):
+            return
+        max_depth = yaml_loader.PARSE_LIMITS.max_depth
+        stack = [(items_data, "", 0)]
+        while stack:
+            data, prefix, depth = stack.pop()
+            if depth > max_depth:
+                raise YAMLBudgetError(f"物品分组嵌套超过 {max_depth} 层: {prefix}")
+            for key, value in data.items():
+                if isinstance(value, dict) and "material" not in value and "itemname" not in value:
+                    stack.append((value, f"{prefix}{key}_", depth + 1))
+
     def _convert_items(self, items_data):
         if not isinstance(items_data, dict):
             return
-        
+        # 先检查深度，下面的递归不会超出解析限制
+        self.check_nesting(items_data)
+
         # 递归函数查找物品
         def recurse(data, prefix=""):
             for key, value in data.items():
@@ -139,6 +168,7 @@ class NexoConverter(BaseConverter):
                 # 检查是否为物品
                 if "material" in value or "itemname" in value:
                     self._convert_item(key, value)
+                    self.progress.advance()
                 else:
                     # 递归
                     recurse(value, prefix + key + "_")
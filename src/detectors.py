@@ -0,0 +1,194 @@
+# 路径通配符: 任意键 / 只匹配所在映射的第一个键
+ANY = "*"
+FIRST = "^"
+
+class Signature:
+    def __init__(self, path, key, value=None, weight=1.0):
+        """
+        :param path: 键所在映射的路径模式 (元组，可包含 ANY / FIRST)
+        :param key: 键名，或多个可选键名的元组
+        :param value: 不为 None 时要求该键的标量值等于 value
+        :param weight: 命中时计入的分数 (每个签名只计一次)
+        """
+        self.path = tuple(path)
+        self.keys = (key,) if isinstance(key, str) else tuple(key)
+        self.value = value
+        self.weight = weight
+
+    def matches_path(self, path, firsts):
+        if len(path) != len(self.path):
+            return False
+        return _match_prefix(self.path, path, firsts)
+
+def _match_prefix(pattern, path, firsts):
+    for token, name, first in zip(pattern, path, firsts):
+        if token == ANY:
+            continue
+        if token == FIRST:
+            if not first:
+                return False
+        elif token != name:
+            return False
+    return True
+
+class FormatDetector:
+    """
+    一种格式的检测规则: 一组带权重的签名，命中签名的权重和达到阈值即认定为该格式。
+    新格式通过 register_detector() 注册，由 FormatMatcher 在同一次遍历中与其他格式一起打分。
+    """
+    def __init__(self, name, signatures, threshold=1.0):
+        """
+        :param name: 格式名 (与报告中的 formats 一致)
+        :param signatures: Signature 列表
+        :param threshold: 命中签名的权重和达到该值时认定为此格式
+        """
+        self.name = name
+        self.signatures = list(signatures)
+        self.threshold = threshold
+
+# 已注册的检测器，按注册顺序出现在报告中
+DETECTORS = []
+
+def register_detector(detector):
+    """注册检测器；同名检测器会被替换 (保持原位置)。"""
+    for index, existing in enumerate(DETECTORS):
+        if existing.name == detector.name:
+            DETECTORS[index] = detector
+            return detector
+    DETECTORS.append(detector)
+    return detector
+
+# Nexo 物品的特征键
+NEXO_ITEM_KEYS = ("Mechanics", "Pack", "Components", "itemname")
+
+register_detector(FormatDetector("ItemsAdder", [
+    # ItemsAdder 配置通常有 info.namespace
+    Signature(("info",), "namespace"),
+    # 或第一个物品具有 IA 特征
+    Signature(("items", FIRST), ("resource", "behaviours")),
+    # 以下键其他格式也会使用，只提高置信度
+    Signature((), ("equipments", "armors_rendering"), weight=0.3),
+    Signature((), "categories", weight=0.2),
+]))
+
+register_detector(FormatDetector("CraftEngine", [
+    Signature(("items", ANY), "model"),
+    Signature(("items", ANY, "behavior"), "type", value="furniture_item"),
+    Signature((), "templates", weight=0.3),
+]))
+
+register_detector(FormatDetector("Nexo", [
+    Signature((ANY,), NEXO_ITEM_KEYS),
+]))
+
+register_detector(FormatDetector("Oraxen", [
+    Signature((ANY,), "displayname", weight=0.6),
+    Signature((ANY, "Pack"), ("generate_model", "parent_model"), weight=0.4),
+    Signature((ANY,), ("Mechanics", "Pack"), weight=0.2),
+]))
+
+register_detector(FormatDetector("MythicCrucible", [
+    Signature((ANY,), "Id", weight=0.5),
+    Signature((ANY,), "Display", weight=0.3),
+    Signature((ANY,), "Skills", weight=0.3),
+    Signature((ANY, "Options"), "Model", weight=0.3),
+]))
+
+class FormatMatcher:
+    """
+    单次遍历的多格式匹配器。遍历方按文档顺序报告映射中的键和标量值，
+    并通过 wants() 询问是否需要进入某个子映射。
+    路径以键名元组表示，firsts 为同长度的布尔元组 (各级键是否为所在映射的第一个键)。
+    """
+    def __init__(self, detectors=None):
+        self.detectors = list(DETECTORS if detectors is None else detectors)
+        self._signatures = []
+        self._by_key = {}
+        self._patterns = set()
+        for owner, detector in enumerate(self.detectors):
+            for signature in detector.signatures:
+                sid = len(self._signatures)
+                self._signatures.append((owner, signature))
+                for key in signature.keys:
+                    self._by_key.setdefault((len(signature.path), key), []).append(sid)
+                self._patterns.add(signature.path)
+        self._max_depth = max((len(p) for p in self._patterns), default=0)
+        self._matched = set()
+        self._scores = [0.0] * len(self.detectors)
+        self._decided = False
+
+    def wants(self, path, firsts):
+        """位于 path 的映射是否包含签名需要的键 (或需要继续向下遍历)。"""
+        if len(path) > self._max_depth:
+            return False
+        for pattern in self._patterns:
+            if len(pattern) >= len(path) and _match_prefix(pattern, path, firsts):
+                return True
+        return False
+
+    def key(self, path, firsts, key):
+        """报告 path 处映射中的一个键。"""
+        for sid in self._by_key.get((len(path), key), ()):
+            if sid in self._matched:
+                continue
+            owner, signature = self._signatures[sid]
+            if signature.value is None and signature.matches_path(path, firsts):
+                self._hit(sid, owner, signature)
+
+    def scalar(self, path, firsts, key, value):
+        """报告 path 处映射中 key 的标量值。"""
+        for sid in self._by_key.get((len(path), key), ()):
+            if sid in self._matched:
+                continue
+            owner, signature = self._signatures[sid]
+            if signature.value is not None and signature.value == value and signature.matches_path(path, firsts):
+                self._hit(sid, owner, signature)
+
+    def _hit(self, sid, owner, signature):
+        self._matched.add(sid)
+        self._scores[owner] += signature.weight
+        if self._scores[owner] >= self.detectors[owner].threshold:
+            self._decided = True
+
+    @property
+    def decided(self):
+        """是否已认定至少一种格式。"""
+        return self._decided
+
+    def confidences(self):
+        """
+        :return: {格式名: 置信度}，只包含有命中的格式；置信度为权重和与阈值之比，最大为 1.0
+        """
+        return {detector.name: round(min(1.0, score / detector.threshold), 2)
+                for detector, score in zip(self.detectors, self._scores) if score > 0}
+
+    def formats(self):
+        """:return: 达到阈值的格式名列表 (按注册顺序)"""
+        return [detector.name for detector, score in zip(self.detectors, self._scores)
+                if score >= detector.threshold]
+
+def detect_data(data, detectors=None):
+    """
+    对已加载的数据运行匹配器 (只进入签名涉及的映射)。
+    :param data: 解析后的 YAML 数据
+    :return: FormatMatcher
+    """
+    matcher = FormatMatcher(detectors)
+    if isinstance(data, dict):
+        stack = [((), (), data)]
+        while stack:
+            path, firsts, mapping = stack.pop()
+            children = []
+            for index, (key, value) in enumerate(mapping.items()):
+                if not isinstance(key, str):
+                    continue
+                matcher.key(path, firsts, key)
+                if isinstance(value, dict):
+                    child_path = path + (key,)
+                    child_firsts = firsts + (index == 0,)
+                    if matcher.wants(child_path, child_firsts):
+                        children.append((child_path, child_firsts, value))
+                elif not isinstance(value, list):
+                    matcher.scalar(path, firsts, key, value)
+            stack.extend(reversed(children))
+    return matcher
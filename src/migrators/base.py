@@ -1,10 +1,24 @@
 from abc import ABC, abstractmethod
 import os
+from src.utils.source_fs import DirectorySource
+from src.utils.output_sink import DirectorySink
+from src.utils.progress import NULL_PROGRESS
 
 class BaseMigrator(ABC):
-    def __init__(self, input_path, output_path):
+    def __init__(self, input_path, output_path, file_index=None, output_sink=None, progress=None):
         self.input_path = input_path
         self.output_path = output_path
+        # 输出写入目标 (路径仍以 output_path 为根)，未提供时直接写磁盘
+        self.output = output_sink if output_sink is not None else DirectorySink(None)
+        # 输入资源包的文件来源 (SourceFS)，存在性检查、遍历和读取都经过它；未提供时遍历一次输入目录构建
+        self.file_index = file_index if file_index is not None else DirectorySource.from_directory(input_path)
+        # 进度报告 (migrating_textures / migrating_models 阶段)
+        self.progress = progress if progress is not None else NULL_PROGRESS
+
+    def _count_files(self, src_dirs, extensions):
+        """:return: src_dirs 下 (递归) 扩展名匹配的文件数，作为迁移阶段的总项数"""
+        return sum(1 for src_dir in src_dirs for _, _, files in self.file_index.walk(src_dir)
+                   for name in files if name.endswith(extensions))
 
     @abstractmethod
     def migrate(self):
@@ -1,11 +1,10 @@
 import os
-import shutil
 import json
 from .base import BaseMigrator
 
 class IAMigrator(BaseMigrator):
-    def __init__(self, ia_resourcepack_path, ce_resourcepack_path, namespace, armor_humanoid_keys=None, armor_leggings_keys=None):
-        super().__init__(ia_resourcepack_path, ce_resourcepack_path)
+    def __init__(self, ia_resourcepack_path, ce_resourcepack_path, namespace, armor_humanoid_keys=None, armor_leggings_keys=None, file_index=None, output_sink=None, progress=None):
+        super().__init__(ia_resourcepack_path, ce_resourcepack_path, file_index, output_sink, progress)
         self.namespace = namespace
         self.armor_humanoid_keys = set(armor_humanoid_keys or [])
         self.armor_leggings_keys = set(armor_leggings_keys or [])
@@ -42,17 +41,17 @@ class IAMigrator(BaseMigrator):
         """
         # 1. 标准: assets/namespace/type
         path1 = os.path.join(self.input_path, "assets", self.namespace, resource_type)
-        if os.path.exists(path1):
+        if self.file_index.exists(path1):
             return path1
             
         # 2. 缺失 assets: namespace/type
         path2 = os.path.join(self.input_path, self.namespace, resource_type)
-        if os.path.exists(path2):
+        if self.file_index.exists(path2):
             return path2
             
         # 3. 扁平: type (仅当 input_path 已经是命名空间根目录时)
         path3 = os.path.join(self.input_path, resource_type)
-        if os.path.exists(path3):
+        if self.file_index.exists(path3):
             return path3
             
         return None
@@ -215,7 +214,8 @@ class IAMigrator(BaseMigrator):
         # 目前，我们将假设大多数是物品并将它们移动到 textures/item/。
         # 除了通常去 entity/equipment/ 的护甲图层。
         
-        for root, _, files in os.walk(src_dir):
+        self.progress.set_stage("migrating_textures", self._count_files([src_dir], (".png", ".mcmeta")))
+        for root, _, files in self.file_index.walk(src_dir):
             for file in files:
                 if not file.endswith((".png", ".mcmeta")):
                     continue
@@ -239,10 +239,11 @@ class IAMigrator(BaseMigrator):
                         dest_rel = os.path.join("item", rel_path)
 
                 dest_dir = os.path.join(self.output_path, "assets", self.namespace, "textures", dest_rel)
-                os.makedirs(dest_dir, exist_ok=True)
+                self.output.makedirs(dest_dir)
                 
                 dest_file = os.path.join(dest_dir, file)
-                shutil.copy2(src_file, dest_file)
+                self.output.copy_file(src_file, dest_file, source=self.file_index)
+                self.progress.advance()
                 # print(f"已复制纹理: {file} -> {dest_rel}")
 
     def _migrate_models(self):
@@ -254,7 +255,8 @@ class IAMigrator(BaseMigrator):
         if not src_dir:
             return
 
-        for root, _, files in os.walk(src_dir):
+        self.progress.set_stage("migrating_models", self._count_files([src_dir], ".json"))
+        for root, _, files in self.file_index.walk(src_dir):
             for file in files:
                 if not file.endswith(".json"):
                     continue
@@ -270,12 +272,13 @@ class IAMigrator(BaseMigrator):
                     dest_rel = os.path.join("item", rel_path)
                     
                 dest_dir = os.path.join(self.output_path, "assets", self.namespace, "models", dest_rel)
-                os.makedirs(dest_dir, exist_ok=True)
+                self.output.makedirs(dest_dir)
                 
                 dest_file = os.path.join(dest_dir, file)
                 
                 # 我们需要处理 JSON 内容以修复纹理路径
                 self._process_model_file(src_file, dest_file)
+                self.progress.advance()
 
     def generate_missing_item_models(self):
         """
@@ -287,35 +290,34 @@ class IAMigrator(BaseMigrator):
         # 目标纹理目录: assets/<namespace>/textures/item/
         textures_dir = os.path.join(self.output_path, "assets", self.namespace, "textures", "item")
         
-        if not os.path.exists(textures_dir):
+        if not self.output.exists(textures_dir):
             return
 
-        for root, _, files in os.walk(textures_dir):
-            for file in files:
-                if not file.endswith(".png"):
-                    continue
-                
-                # 来自 textures/item/ 的相对路径
-                rel_path = os.path.relpath(root, textures_dir)
-                texture_name = file[:-4]
-                
-                # 对应的模型路径
-                if rel_path == ".":
-                    model_rel_dir = models_dir
-                    texture_ref = f"{self.namespace}:item/{texture_name}"
-                else:
-                    model_rel_dir = os.path.join(models_dir, rel_path)
-                    # 纹理引用必须使用正斜杠
-                    rel_path_fwd = rel_path.replace("\\", "/")
-                    texture_ref = f"{self.namespace}:item/{rel_path_fwd}/{texture_name}"
+        for texture_path in self.output.files_under(textures_dir):
+            file = os.path.basename(texture_path)
+            if not file.endswith(".png"):
+                continue
+            
+            # 来自 textures/item/ 的相对路径
+            rel_path = os.path.relpath(os.path.dirname(texture_path), textures_dir)
+            texture_name = file[:-4]
+            
+            # 对应的模型路径
+            if rel_path == ".":
+                model_rel_dir = models_dir
+                texture_ref = f"{self.namespace}:item/{texture_name}"
+            else:
+                model_rel_dir = os.path.join(models_dir, rel_path)
+                # 纹理引用必须使用正斜杠
+                rel_path_fwd = rel_path.replace("\\", "/")
+                texture_ref = f"{self.namespace}:item/{rel_path_fwd}/{texture_name}"
 
-                model_file_path = os.path.join(model_rel_dir, f"{texture_name}.json")
-                
-                # 如果模型不存在，则创建它
-                if not os.path.exists(model_file_path):
-                    os.makedirs(model_rel_dir, exist_ok=True)
-                    self._create_basic_item_model(model_file_path, texture_ref)
-                    # print(f"已生成缺失的模型: {model_file_path}")
+            model_file_path = os.path.join(model_rel_dir, f"{texture_name}.json")
+            
+            # 如果模型不存在，则创建它
+            if not self.output.exists(model_file_path):
+                self._create_basic_item_model(model_file_path, texture_ref)
+                # print(f"已生成缺失的模型: {model_file_path}")
 
     def _create_basic_item_model(self, file_path, texture_ref):
         data = {
@@ -324,13 +326,11 @@ class IAMigrator(BaseMigrator):
                 "layer0": texture_ref
             }
         }
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        self.output.write_text(file_path, json.dumps(data, indent=4))
 
     def _process_model_file(self, src_file, dest_file):
         try:
-            with open(src_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json.loads(self.file_index.read_bytes(src_file).decode('utf-8'))
             
             # 移除非 minecraft 的 parent 引用
             if "parent" in data:
@@ -390,8 +390,7 @@ class IAMigrator(BaseMigrator):
                                     path_part = f"item/{path_part}"
                                 override["model"] = f"{self.namespace}:{path_part}"
 
-            with open(dest_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4)
+            self.output.write_text(dest_file, json.dumps(data, indent=4))
                 
         except Exception as e:
             print(f"处理模型 {src_file} 时出错: {e}")
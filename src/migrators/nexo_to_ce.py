@@ -1,11 +1,10 @@
 import os
-import shutil
 import json
 from .base import BaseMigrator
 
 class NexoMigrator(BaseMigrator):
-    def __init__(self, nexo_resourcepack_path, ce_resourcepack_path, namespace, armor_humanoid_keys=None, armor_leggings_keys=None, source_namespaces=None):
-        super().__init__(nexo_resourcepack_path, ce_resourcepack_path)
+    def __init__(self, nexo_resourcepack_path, ce_resourcepack_path, namespace, armor_humanoid_keys=None, armor_leggings_keys=None, source_namespaces=None, file_index=None, output_sink=None, progress=None):
+        super().__init__(nexo_resourcepack_path, ce_resourcepack_path, file_index, output_sink, progress)
         self.namespace = namespace
         self.armor_humanoid_keys = set(armor_humanoid_keys or [])
         self.armor_leggings_keys = set(armor_leggings_keys or [])
@@ -17,39 +16,39 @@ class NexoMigrator(BaseMigrator):
         
         # 自动扫描资源包中的所有命名空间，以防止配置名与资源包内命名空间不一致导致资源遗漏
         assets_path = os.path.join(self.input_path, "assets")
-        if os.path.exists(assets_path):
-            for d in os.listdir(assets_path):
+        if self.file_index.exists(assets_path):
+            for d in self.file_index.listdir(assets_path):
                 full_path = os.path.join(assets_path, d)
-                if os.path.isdir(full_path) and d not in ["minecraft", ".mcassetsroot", "realms"]:
+                if self.file_index.isdir(full_path) and d not in ["minecraft", ".mcassetsroot", "realms"]:
                     self.source_namespaces.add(d)
             mc_textures = os.path.join(assets_path, "minecraft", "textures")
-            if os.path.exists(mc_textures):
-                for d in os.listdir(mc_textures):
+            if self.file_index.exists(mc_textures):
+                for d in self.file_index.listdir(mc_textures):
                     full_path = os.path.join(mc_textures, d)
-                    if os.path.isdir(full_path):
+                    if self.file_index.isdir(full_path):
                         self.source_namespaces.add(d)
             mc_models = os.path.join(assets_path, "minecraft", "models")
-            if os.path.exists(mc_models):
-                for d in os.listdir(mc_models):
+            if self.file_index.exists(mc_models):
+                for d in self.file_index.listdir(mc_models):
                     full_path = os.path.join(mc_models, d)
-                    if os.path.isdir(full_path):
+                    if self.file_index.isdir(full_path):
                         self.source_namespaces.add(d)
 
-        if os.path.exists(self.input_path):
-            for d in os.listdir(self.input_path):
+        if self.file_index.exists(self.input_path):
+            for d in self.file_index.listdir(self.input_path):
                 full_path = os.path.join(self.input_path, d)
-                if not os.path.isdir(full_path):
+                if not self.file_index.isdir(full_path):
                     continue
                 if d in ["assets", ".mcassetsroot", "realms"]:
                     continue
-                if os.path.exists(os.path.join(full_path, "textures")) or os.path.exists(os.path.join(full_path, "models")):
+                if self.file_index.exists(os.path.join(full_path, "textures")) or self.file_index.exists(os.path.join(full_path, "models")):
                     self.source_namespaces.add(d)
 
         root_textures = os.path.join(self.input_path, "textures")
-        if os.path.exists(root_textures):
+        if self.file_index.exists(root_textures):
             self.root_textures_dir = root_textures
         root_models = os.path.join(self.input_path, "models")
-        if os.path.exists(root_models):
+        if self.file_index.exists(root_models):
             self.root_models_dir = root_models
 
     def migrate(self):
@@ -62,43 +61,49 @@ class NexoMigrator(BaseMigrator):
         ns = namespace if namespace else self.namespace
         # 1. assets/<namespace>/type
         path1 = os.path.join(self.input_path, "assets", ns, resource_type)
-        if os.path.exists(path1):
+        if self.file_index.exists(path1):
             return path1
         # 2. assets/minecraft/type/<namespace> 
         
         # 3. <namespace>/type
         path2 = os.path.join(self.input_path, ns, resource_type)
-        if os.path.exists(path2):
+        if self.file_index.exists(path2):
             return path2
             
         return None
 
+    def _texture_dirs(self, ns):
+        """:return: 源命名空间 ns 的纹理目录列表"""
+        src_dirs = []
+        # 1. assets/ns/textures
+        p1 = os.path.join(self.input_path, "assets", ns, "textures")
+        if self.file_index.exists(p1): src_dirs.append(p1)
+        # 2. assets/minecraft/textures/ns (常见模式)
+        p2 = os.path.join(self.input_path, "assets", "minecraft", "textures", ns)
+        if self.file_index.exists(p2): src_dirs.append(p2)
+        # 3. 直接在包根目录下的 textures (非标准但可能存在)
+        p3 = os.path.join(self.input_path, ns, "textures")
+        if self.file_index.exists(p3): src_dirs.append(p3)
+        
+        # 4. 如果没找到，尝试在 assets/minecraft/textures 下查找
+        # 但这可能会扫描过多内容，所以我们只作为最后的尝试
+        if not src_dirs and ns == self.namespace: # 仅对主命名空间尝试通用目录
+            p4 = os.path.join(self.input_path, "assets", "minecraft", "textures")
+            if self.file_index.exists(p4):
+                # 仅当没有更具体的目录时
+                pass 
+            if self.root_textures_dir:
+                src_dirs.append(self.root_textures_dir)
+        return src_dirs
+
     def _migrate_textures(self):
         # 遍历所有源命名空间
-        for ns in self.source_namespaces:
-            src_dirs = []
-            # 1. assets/ns/textures
-            p1 = os.path.join(self.input_path, "assets", ns, "textures")
-            if os.path.exists(p1): src_dirs.append(p1)
-            # 2. assets/minecraft/textures/ns (常见模式)
-            p2 = os.path.join(self.input_path, "assets", "minecraft", "textures", ns)
-            if os.path.exists(p2): src_dirs.append(p2)
-            # 3. 直接在包根目录下的 textures (非标准但可能存在)
-            p3 = os.path.join(self.input_path, ns, "textures")
-            if os.path.exists(p3): src_dirs.append(p3)
-            
-            # 4. 如果没找到，尝试在 assets/minecraft/textures 下查找
-            # 但这可能会扫描过多内容，所以我们只作为最后的尝试
-            if not src_dirs and ns == self.namespace: # 仅对主命名空间尝试通用目录
-                p4 = os.path.join(self.input_path, "assets", "minecraft", "textures")
-                if os.path.exists(p4):
-                    # 仅当没有更具体的目录时
-                    pass 
-                if self.root_textures_dir:
-                    src_dirs.append(self.root_textures_dir)
-
+        dirs_by_ns = [(ns, self._texture_dirs(ns)) for ns in self.source_namespaces]
+        self.progress.set_stage("migrating_textures",
+                                self._count_files([d for _, dirs in dirs_by_ns for d in dirs], (".png", ".mcmeta")))
+        for ns, src_dirs in dirs_by_ns:
             for src_dir in src_dirs:
-                for root, _, files in os.walk(src_dir):
+                for root, _, files in self.file_index.walk(src_dir):
                     for file in files:
                         if not file.endswith((".png", ".mcmeta")):
                             continue
@@ -138,27 +143,34 @@ class NexoMigrator(BaseMigrator):
                                 dest_rel = os.path.join(ns, dest_rel)
 
                         dest_dir = os.path.join(self.output_path, "assets", self.namespace, "textures", os.path.dirname(dest_rel))
-                        os.makedirs(dest_dir, exist_ok=True)
-                        shutil.copy2(src_file, os.path.join(self.output_path, "assets", self.namespace, "textures", dest_rel))
+                        self.output.makedirs(dest_dir)
+                        self.output.copy_file(src_file, os.path.join(self.output_path, "assets", self.namespace, "textures", dest_rel), source=self.file_index)
+                        self.progress.advance()
+
+    def _model_dirs(self, ns):
+        """:return: 源命名空间 ns 的模型目录列表"""
+        src_dirs = []
+        # 1. assets/ns/models
+        p1 = os.path.join(self.input_path, "assets", ns, "models")
+        if self.file_index.exists(p1): src_dirs.append(p1)
+        # 2. assets/minecraft/models/ns
+        p2 = os.path.join(self.input_path, "assets", "minecraft", "models", ns)
+        if self.file_index.exists(p2): src_dirs.append(p2)
+        # 3. 直接在包根目录下的 models
+        p3 = os.path.join(self.input_path, ns, "models")
+        if self.file_index.exists(p3): src_dirs.append(p3)
+        if ns == self.namespace and self.root_models_dir:
+            src_dirs.append(self.root_models_dir)
+        return src_dirs
 
     def _migrate_models(self):
         # 遍历所有源命名空间
-        for ns in self.source_namespaces:
-            src_dirs = []
-            # 1. assets/ns/models
-            p1 = os.path.join(self.input_path, "assets", ns, "models")
-            if os.path.exists(p1): src_dirs.append(p1)
-            # 2. assets/minecraft/models/ns
-            p2 = os.path.join(self.input_path, "assets", "minecraft", "models", ns)
-            if os.path.exists(p2): src_dirs.append(p2)
-            # 3. 直接在包根目录下的 models
-            p3 = os.path.join(self.input_path, ns, "models")
-            if os.path.exists(p3): src_dirs.append(p3)
-            if ns == self.namespace and self.root_models_dir:
-                src_dirs.append(self.root_models_dir)
-            
+        dirs_by_ns = [(ns, self._model_dirs(ns)) for ns in self.source_namespaces]
+        self.progress.set_stage("migrating_models",
+                                self._count_files([d for _, dirs in dirs_by_ns for d in dirs], ".json"))
+        for ns, src_dirs in dirs_by_ns:
             for src_dir in src_dirs:
-                for root, _, files in os.walk(src_dir):
+                for root, _, files in self.file_index.walk(src_dir):
                     for file in files:
                         if not file.endswith(".json"):
                             continue
@@ -184,15 +196,15 @@ class NexoMigrator(BaseMigrator):
                                 dest_rel = os.path.join(ns, dest_rel)
 
                         dest_dir = os.path.join(self.output_path, "assets", self.namespace, "models", os.path.dirname(dest_rel))
-                        os.makedirs(dest_dir, exist_ok=True)
+                        self.output.makedirs(dest_dir)
                         dest_file = os.path.join(dest_dir, file)
                         
                         self._process_model_file(src_file, dest_file, source_ns=ns)
+                        self.progress.advance()
 
     def _process_model_file(self, src_file, dest_file, source_ns=None):
         try:
-            with open(src_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json.loads(self.file_index.read_bytes(src_file).decode('utf-8'))
             
             # 更新纹理
             if "textures" in data:
@@ -239,8 +251,7 @@ class NexoMigrator(BaseMigrator):
                                 new_path = self._inject_namespace_path(new_path, ns)
                             override["model"] = f"{self.namespace}:{new_path}"
 
-            with open(dest_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4)
+            self.output.write_text(dest_file, json.dumps(data, indent=4))
         except Exception as e:
             print(f"Error processing model {src_file}: {e}")
 
@@ -0,0 +1,30 @@
+import hashlib
+import json
+from src.utils.disk_cache import DiskCache
+
+class ArtifactCache:
+    """
+    转换结果压缩包的缓存，以 (上传内容哈希, 源格式, 目标格式, 命名空间, 转换器版本) 为键。
+    同一压缩包以相同参数再次转换时直接返回已有的结果。超出容量时按最近使用时间淘汰。
+    """
+    def __init__(self, directory, max_mb=1024):
+        self._disk = DiskCache(directory, int(max_mb) * 1024 * 1024)
+
+    @staticmethod
+    def key(upload_digest, source_format, target_format, namespace, version):
+        """:return: 十六进制的缓存键"""
+        parts = [upload_digest, source_format, target_format, namespace or "", version]
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """:return: 缓存的压缩包路径，未命中时返回 None"""
+        return self._disk.get_path(key)
+
+    def put(self, key, zip_path, move=False, link=False):
+        """
+        :param zip_path: 转换结果压缩包
+        :param move: 为 True 时把压缩包移入缓存目录
+        :param link: 为 True 时尽量以硬链接存入 (压缩包之后不能再被修改)
+        :return: 缓存的压缩包路径，超出容量或写入失败时返回 None
+        """
+        return self._disk.set_file(key, zip_path, move, link)
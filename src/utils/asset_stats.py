@@ -0,0 +1,127 @@
+import json
+import struct
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# 签名 (8) + IHDR 块长度和类型 (8) + 宽高 (8)
+PNG_HEADER_BYTES = 24
+
+# 按扩展名归类资源，统计各类的总字节数
+ASSET_TYPES = {
+    ".png": "textures",
+    ".mcmeta": "texture_meta",
+    ".json": "json",
+    ".ogg": "sounds",
+    ".yml": "configs",
+    ".yaml": "configs",
+}
+
+def asset_type(file_name, in_models=False):
+    """
+    :param file_name: 文件名
+    :param in_models: 文件是否位于 models 目录下 (此时 .json 视为模型)
+    :return: 类型名，未知扩展名为 other
+    """
+    dot = file_name.rfind('.')
+    kind = ASSET_TYPES.get(file_name[dot:].lower(), "other") if dot >= 0 else "other"
+    if kind == "json" and in_models:
+        return "models"
+    return kind
+
+def png_dimensions(head):
+    """
+    只读取 PNG 的 IHDR 头获取宽高，不解码图像。
+    :param head: 文件开头至少 PNG_HEADER_BYTES 个字节
+    :return: (宽, 高)；不是有效的 PNG 头时返回 None
+    """
+    if len(head) < PNG_HEADER_BYTES or not head.startswith(PNG_SIGNATURE) or head[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', head[16:24])
+
+def model_element_count(raw):
+    """
+    :param raw: 模型 JSON 的原始字节
+    :return: elements 数量；无法解析时返回 None
+    """
+    try:
+        data = json.loads(raw.decode('utf-8-sig'))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    elements = data.get("elements")
+    return len(elements) if isinstance(elements, list) else 0
+
+def is_animated_mcmeta(raw):
+    """
+    :param raw: .mcmeta 的原始字节
+    :return: 是否声明了 animation
+    """
+    try:
+        data = json.loads(raw.decode('utf-8-sig'))
+    except (ValueError, UnicodeDecodeError):
+        return False
+    return isinstance(data, dict) and "animation" in data
+
+class AssetStats:
+    """
+    累计资源包的文件统计，供报告和成本估计使用。
+    文件数和字节数来自文件索引；模型元素、PNG 尺寸和动画纹理需要读取文件内容，只在完整分析时统计。
+    """
+    def __init__(self):
+        self.bytes = {}
+        self.files = {}
+        self.model_elements = 0
+        self.max_model_elements = 0
+        self.invalid_models = 0
+        self.png_pixels = 0
+        self.max_png_width = 0
+        self.max_png_height = 0
+        self.invalid_pngs = 0
+        self.animated_textures = 0
+
+    def add_file(self, kind, size):
+        self.bytes[kind] = self.bytes.get(kind, 0) + (size or 0)
+        self.files[kind] = self.files.get(kind, 0) + 1
+
+    def add_png(self, head):
+        dimensions = png_dimensions(head)
+        if dimensions is None:
+            self.invalid_pngs += 1
+            return
+        width, height = dimensions
+        self.png_pixels += width * height
+        self.max_png_width = max(self.max_png_width, width)
+        self.max_png_height = max(self.max_png_height, height)
+
+    def add_model(self, raw):
+        count = model_element_count(raw)
+        if count is None:
+            self.invalid_models += 1
+            return
+        self.model_elements += count
+        self.max_model_elements = max(self.max_model_elements, count)
+
+    def add_mcmeta(self, raw):
+        if is_animated_mcmeta(raw):
+            self.animated_textures += 1
+
+    def to_dict(self):
+        return {
+            "bytes": dict(self.bytes),
+            "files": dict(self.files),
+            "total_bytes": sum(self.bytes.values()),
+            "models": {
+                "files": self.files.get("models", 0),
+                "elements": self.model_elements,
+                "max_elements": self.max_model_elements,
+                "invalid": self.invalid_models
+            },
+            "png": {
+                "files": self.files.get("textures", 0),
+                "pixels": self.png_pixels,
+                "max_width": self.max_png_width,
+                "max_height": self.max_png_height,
+                "invalid": self.invalid_pngs
+            },
+            "animated_textures": self.animated_textures
+        }
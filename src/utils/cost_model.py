@@ -0,0 +1,149 @@
+import os
+import json
+
+MB = 1024 * 1024
+
+# 成本模型的输入特征 (均由分析报告得出)。模型元素数、PNG 像素数和动画纹理数只在完整分析时统计，
+# 快速分析时为 0
+COST_FEATURES = ("items", "yaml_mb", "copied_files", "copied_mb", "model_files", "model_mb",
+                 "model_elements", "png_megapixels", "animated_textures")
+# 转换时会被复制的资源类型
+_COPIED_TYPES = ("textures", "texture_meta", "models", "sounds")
+
+def cost_features(report):
+    """
+    从分析报告提取成本模型的特征。
+    :param report: PackageAnalyzer 的报告 (需包含 assets)
+    :return: 特征字典
+    """
+    assets = report["assets"]
+    sizes = assets["bytes"]
+    counts = assets["files"]
+    return {
+        "items": report["details"]["item_count"],
+        "yaml_mb": sizes.get("configs", 0) / MB,
+        "copied_files": sum(counts.get(kind, 0) for kind in _COPIED_TYPES),
+        "copied_mb": sum(sizes.get(kind, 0) for kind in _COPIED_TYPES) / MB,
+        "model_files": counts.get("models", 0),
+        "model_mb": sizes.get("models", 0) / MB,
+        "model_elements": assets["models"]["elements"],
+        "png_megapixels": assets["png"]["pixels"] / 1000000,
+        "animated_textures": assets["animated_textures"],
+    }
+
+def _solve(matrix, vector):
+    # 高斯消元 (部分主元)，矩阵奇异时对应的未知数取 0
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        if abs(a[pivot][col]) < 1e-12:
+            continue
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(n):
+            if r != col and a[r][col]:
+                factor = a[r][col] / a[col][col]
+                for c in range(col, n + 1):
+                    a[r][c] -= factor * a[col][c]
+    return [a[i][n] / a[i][i] if abs(a[i][i]) >= 1e-12 else 0.0 for i in range(n)]
+
+def _fit_nonnegative(rows, targets):
+    """
+    非负最小二乘 (逐个剔除负系数后重新拟合)。各列先按最大值缩放以改善数值条件。
+    :param rows: 特征行列表 (第一列为常数项 1)
+    :param targets: 目标值列表
+    :return: 系数列表
+    """
+    width = len(rows[0])
+    scales = [max(abs(row[c]) for row in rows) or 1.0 for c in range(width)]
+    scaled = [[row[c] / scales[c] for c in range(width)] for row in rows]
+    active = list(range(width))
+    while active:
+        xtx = [[sum(row[i] * row[j] for row in scaled) for j in active] for i in active]
+        xty = [sum(row[i] * y for row, y in zip(scaled, targets)) for i in active]
+        solution = _solve(xtx, xty)
+        negative = [k for k, value in enumerate(solution) if value < 0]
+        if not negative:
+            break
+        active.pop(min(negative, key=lambda k: solution[k]))
+    coefficients = [0.0] * width
+    for k, column in enumerate(active):
+        coefficients[column] = solution[k] / scales[column]
+    return coefficients
+
+class CostModel:
+    """
+    线性成本模型: 转换耗时 (秒) 与峰值内存 (MB) 分别为特征的非负线性组合加常数项。
+    系数通过 calibrate() 在已知耗时和内存的参考资源包上拟合。
+    """
+    def __init__(self, time_coefficients, memory_coefficients):
+        # {"intercept": ..., <特征名>: ...}，缺少的特征系数视为 0
+        self.time_coefficients = dict(time_coefficients)
+        self.memory_coefficients = dict(memory_coefficients)
+
+    @staticmethod
+    def _apply(coefficients, features):
+        return coefficients.get("intercept", 0.0) + sum(
+            coefficients.get(name, 0.0) * features.get(name, 0) for name in COST_FEATURES)
+
+    def estimate(self, features):
+        """
+        :param features: cost_features() 的结果
+        :return: {"seconds": 预计耗时, "peak_memory_mb": 预计峰值内存}
+        """
+        return {
+            "seconds": round(self._apply(self.time_coefficients, features), 2),
+            "peak_memory_mb": round(self._apply(self.memory_coefficients, features), 1)
+        }
+
+    @classmethod
+    def calibrate(cls, samples):
+        """
+        在参考资源包的测量结果上拟合系数。样本数应不少于特征数加一。
+
+        :param samples: (特征字典, 实测耗时秒数, 实测峰值内存 MB) 列表
+        :return: CostModel
+        :raises: ValueError 样本不足时
+        """
+        if len(samples) < len(COST_FEATURES) + 1:
+            raise ValueError(f"need at least {len(COST_FEATURES) + 1} reference samples, got {len(samples)}")
+        rows = [[1.0] + [float(features.get(name, 0)) for name in COST_FEATURES] for features, _, _ in samples]
+        names = ("intercept",) + COST_FEATURES
+        time_fit = _fit_nonnegative(rows, [seconds for _, seconds, _ in samples])
+        memory_fit = _fit_nonnegative(rows, [memory for _, _, memory in samples])
+        return cls(dict(zip(names, time_fit)), dict(zip(names, memory_fit)))
+
+    def to_dict(self):
+        return {"time": self.time_coefficients, "memory": self.memory_coefficients}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["time"], data["memory"])
+
+# 默认系数: 由 calibrate_cost_model.py 在单核环境下对 15 个合成 ItemsAdder 参考包 (50 ~ 20000 个物品，
+# 50 ~ 8000 个贴图/模型，16 ~ 512 像素的贴图，含动画贴图) 测量拟合，样本见 cost_model_samples.json
+# (python calibrate_cost_model.py --fit-only 可复现)。内存为 tracemalloc 测得的转换期间新增峰值 (不含进程基线)
+DEFAULT_COST_MODEL = CostModel(
+    {"intercept": 0.06226, "items": 0.0, "yaml_mb": 3.326, "copied_files": 0.0, "copied_mb": 0.01013,
+     "model_files": 0.0002706, "model_mb": 0.0, "model_elements": 3.605e-05, "png_megapixels": 0.0001143,
+     "animated_textures": 0.0003354},
+    {"intercept": 0.06788, "items": 0.01093, "yaml_mb": 0.0, "copied_files": 0.0008097, "copied_mb": 0.007519,
+     "model_files": 0.0001089, "model_mb": 0.0, "model_elements": 0.0, "png_megapixels": 0.0,
+     "animated_textures": 7.188e-05}
+)
+
+def load_cost_model():
+    """
+    当前使用的成本模型。环境变量 MCC_COST_MODEL 可指向 CostModel.to_dict() 导出的 JSON 文件，
+    用于在实际部署的硬件上重新校准。
+    :return: CostModel
+    """
+    path = os.environ.get("MCC_COST_MODEL")
+    if not path:
+        return DEFAULT_COST_MODEL
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return CostModel.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Failed to load cost model {path}: {e}")
+        return DEFAULT_COST_MODEL
@@ -0,0 +1,181 @@
+import os
+import uuid
+import shutil
+from threading import Lock
+
+class DiskCache:
+    """
+    基于目录的键值缓存，容量超限时按最近使用时间 (文件 mtime) 淘汰。
+    每个条目是一个文件，写入先落到临时文件再原子替换，
+    因此多个进程可以共用同一目录。
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._total = self._scan_total()
+
+    def _path(self, key):
+        # 按前两位分桶，避免单个目录下文件过多
+        return os.path.join(self.directory, key[:2], key)
+
+    def _iter_entries(self):
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    yield entry
+
+    def _entry_size(self, path):
+        """:return: 已有条目的大小，不存在时为 0 (覆盖写入时从总大小中扣除)"""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _scan_total(self):
+        total = 0
+        try:
+            for entry in self._iter_entries():
+                total += entry.stat().st_size
+        except OSError:
+            pass
+        return total
+
+    def get(self, key):
+        """
+        读取条目，命中时刷新其使用时间。
+        :param key: 十六进制字符串键
+        :return: 字节内容，未命中时返回 None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return value
+
+    def set(self, key, value):
+        """
+        写入条目，写入后如超出容量则淘汰最久未使用的条目。
+        单个条目超过总容量时直接放弃写入。
+        :param key: 十六进制字符串键
+        :param value: 字节内容
+        """
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(value)
+            replaced = self._entry_size(path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write failed for {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._total += len(value) - replaced
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def get_path(self, key):
+        """
+        查找条目文件 (适合较大的条目，由调用方直接发送文件)，命中时刷新其使用时间。
+        :param key: 十六进制字符串键
+        :return: 条目文件路径，未命中时返回 None
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def set_file(self, key, src_path, move=False, link=False):
+        """
+        复制文件作为条目内容 (不读入内存)，其余同 set。
+        :param key: 十六进制字符串键
+        :param src_path: 源文件路径
+        :param move: 为 True 时移动源文件而不是复制 (放弃写入时源文件保留)
+        :param link: 为 True 时优先创建硬链接而不是复制 (源文件之后不能再被原地修改)；不支持时仍复制
+        :return: 条目文件路径，放弃写入时返回 None
+        """
+        try:
+            size = os.path.getsize(src_path)
+        except OSError:
+            return None
+        if size > self.max_bytes:
+            return None
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if move:
+                shutil.move(src_path, tmp_path)
+            elif not (link and _try_link(src_path, tmp_path)):
+                shutil.copyfile(src_path, tmp_path)
+            replaced = self._entry_size(path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache write failed for {key}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self._total += size - replaced
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+        return path
+
+    def evict(self):
+        """淘汰最久未使用的条目，直到总大小降到容量的 90% 以下。"""
+        with self._lock:
+            try:
+                entries = [(e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in self._iter_entries()]
+            except OSError:
+                return
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            limit = self.max_bytes * 0.9
+            for _, size, path in entries:
+                if total <= limit:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    # 可能已被其他进程淘汰
+                    pass
+                total -= size
+            self._total = total
+
+    def clear(self):
+        """删除所有条目。"""
+        with self._lock:
+            for entry in list(self._iter_entries()):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._total = 0
+
+def _try_link(src_path, dst_path):
+    """:return: 是否成功创建硬链接 (跨文件系统等情况下失败)"""
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        return False
+    return True
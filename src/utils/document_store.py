@@ -0,0 +1,301 @@
+import os
+import hashlib
+from threading import Lock
+from src.utils.yaml_loader import load_yaml_bytes, configure_loader, loader_config
+from src.detectors import detect_data
+from src.utils.yaml_shape import scan_yaml_bytes, quick_scan_yaml_bytes, shape_roles
+from src.utils.parallel import map_ordered
+from src.utils.source_fs import SourceFS
+from src.utils.progress import NULL_PROGRESS
+
+class DocumentScanError(Exception):
+    """YAML 文件无法读取或解析。"""
+    pass
+
+def scan_yaml_file(file_path):
+    """
+    读取并浅层扫描单个 YAML 文件。只依赖文件路径，可在子进程中执行。
+
+    :param file_path: 文件路径
+    :return: 字典 path / digest / size / mtime / info / shape / data / error (及 error_type)
+    """
+    try:
+        st = os.stat(file_path)
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        return scan_error_result(file_path, e)
+    return scan_yaml_blob((file_path, raw, st.st_size, st.st_mtime_ns))
+
+def scan_error_result(file_path, error):
+    """构造扫描失败的结果字典。"""
+    return {"path": file_path, "info": {}, "shape": None, "data": None,
+            "error": str(error), "error_type": type(error).__name__}
+
+def scan_yaml_blob(item):
+    """
+    浅层扫描已读入内存的 YAML 内容 (例如直接从 zip 中读取的成员)，可在子进程中执行。
+
+    :param item: (路径, 原始字节, 大小, 修改时间)；修改时间未知时为 None
+    :return: 与 scan_yaml_file 相同的结果字典
+    """
+    return _scan_blob(item, scan_yaml_bytes)
+
+def quick_scan_yaml_blob(item):
+    """
+    快速模式的扫描 (见 quick_scan_yaml_bytes)，结果中的 shape 可能是估计值 (partial 为 True)，
+    不应写入文档存储。
+
+    :param item: 与 scan_yaml_blob 相同
+    :return: 与 scan_yaml_file 相同的结果字典
+    """
+    return _scan_blob(item, quick_scan_yaml_bytes)
+
+def _scan_blob(item, scanner):
+    file_path, raw, size, mtime = item
+    result = {"path": file_path, "info": {}, "shape": None, "data": None, "error": None,
+              "digest": hashlib.sha1(raw).hexdigest(), "size": size, "mtime": mtime}
+    try:
+        result["shape"], result["data"] = scanner(raw, result["info"])
+    except Exception as e:
+        return scan_error_result(file_path, e)
+    return result
+
+def scan_yaml_files(file_paths, workers=None, progress=None):
+    """
+    并行扫描多个 YAML 文件，结果顺序与输入一致。
+    工作进程会沿用当前进程的解析缓存和解析限制。
+
+    :param file_paths: 文件路径列表
+    :param workers: 工作进程数，None 使用默认值，1 为串行
+    :param progress: 可选的 Progress，每扫描完一个文件调用一次 advance
+    :return: scan_yaml_file 结果列表
+    """
+    return map_ordered(scan_yaml_file, file_paths, workers,
+                       initializer=configure_loader, initargs=loader_config(), progress=progress)
+
+def scan_yaml_blobs(items, workers=None, quick=False, progress=None):
+    """
+    并行扫描多个已读入内存的 YAML 内容，结果顺序与输入一致。
+
+    :param items: scan_yaml_blob 的参数列表
+    :param workers: 工作进程数，None 使用默认值，1 为串行
+    :param quick: 为 True 时使用 quick_scan_yaml_blob
+    :param progress: 可选的 Progress，每扫描完一项调用一次 advance
+    :return: 结果列表
+    """
+    return map_ordered(quick_scan_yaml_blob if quick else scan_yaml_blob, items, workers,
+                       initializer=configure_loader, initargs=loader_config(), progress=progress)
+
+def classify_document(data):
+    """
+    根据顶层键判断 YAML 文档在转换流程中的用途。
+
+    :param data: 解析后的 YAML 数据
+    :return: 用途集合，可能包含 items / categories / recipes / nexo
+    """
+    roles = set()
+    if not isinstance(data, dict):
+        return roles
+    if isinstance(data.get("items"), dict) or "equipments" in data or "armors_rendering" in data:
+        roles.add("items")
+    if "categories" in data:
+        roles.add("categories")
+    if "recipes" in data:
+        roles.add("recipes")
+    if "Nexo" in detect_data(data).formats():
+        roles.add("nexo")
+    return roles
+
+class DocumentEntry:
+    def __init__(self, key, digest, data, roles, size, mtime, info=None):
+        self.key = key
+        self.digest = digest
+        # data 为 None 表示只做过浅层分类，尚未构造对象树
+        self.data = data
+        self.roles = set(roles)
+        self.size = size
+        self.mtime = mtime
+        # 按内容哈希校验过的压缩包成员的 CRC (再次遇到同一成员时不必重新读取)
+        self.crc = None
+        # 加载细节 (解析后端等)
+        self.info = info or {}
+
+class DocumentStore:
+    """
+    会话级的 YAML 文档存储。
+    以 (相对路径, 内容哈希) 标识文档，缓存解析结果和分类，
+    使 /api/analyze 与 /api/convert 之间无需重复读取和解析同一文件。
+    """
+    def __init__(self, root):
+        self.root = root
+        self._entries = {}
+        self._lock = Lock()
+
+    def _key(self, file_path):
+        return os.path.relpath(file_path, self.root).replace(os.sep, "/")
+
+    def get_entry(self, file_path, file_index=None):
+        """
+        获取文件的缓存条目。文件大小或修改时间变化时视为失效。
+        修改时间无法判断时 (直接从 zip 分析得到的条目，或索引条目来自压缩包) 读取文件按内容哈希校验；
+        解压后第一次访问时校验通过则记录修改时间，之后只比较大小和修改时间。
+        :param file_path: 文件路径
+        :param file_index: 可选的 FileIndex，提供时从索引读取大小和修改时间而不访问文件系统
+        :return: DocumentEntry 或 None
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(file_path))
+        if entry is None:
+            return None
+        indexed = file_index.entry(file_path) if file_index is not None else None
+        if indexed is not None and (indexed.mtime is not None or indexed.member is not None):
+            size, mtime = indexed.size, indexed.mtime
+        else:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                return None
+            size, mtime = st.st_size, st.st_mtime_ns
+        if size != entry.size:
+            return None
+        if mtime is not None and entry.mtime is not None:
+            return entry if mtime == entry.mtime else None
+        member = indexed.member if indexed is not None else None
+        if member is not None and entry.crc is not None and member.CRC == entry.crc:
+            return entry
+        raw = self._read_raw(file_path, file_index)
+        if raw is None or hashlib.sha1(raw).hexdigest() != entry.digest:
+            return None
+        if mtime is not None:
+            entry.mtime = mtime
+        elif member is not None:
+            entry.crc = member.CRC
+        return entry
+
+    @staticmethod
+    def _read_raw(file_path, file_index):
+        # 读取文件内容用于校验，无法读取时返回 None
+        try:
+            if isinstance(file_index, SourceFS) and not file_index.is_local(file_path):
+                return file_index.read_bytes(file_path)
+            with open(file_path, 'rb') as f:
+                return f.read()
+        except Exception:
+            return None
+
+    def _put(self, file_path, digest, roles, info, data, size, mtime):
+        entry = DocumentEntry(self._key(file_path), digest, data, roles, size, mtime, info)
+        with self._lock:
+            self._entries[entry.key] = entry
+        return entry
+
+    def add_scan_result(self, result):
+        """
+        记录 scan_yaml_file 的结果 (由分析器调用)。
+        :param result: scan_yaml_file 返回的字典
+        :return: DocumentEntry；扫描失败时返回 None
+        """
+        if result["error"] is not None:
+            return None
+        return self._put(result["path"], result["digest"], shape_roles(result["shape"]),
+                         result["info"], result["data"], result["size"], result["mtime"])
+
+    def classify(self, file_path):
+        """
+        获取文件的分类条目。未分析过的文件只做浅层扫描，不构造对象树。
+        :param file_path: 文件路径
+        :return: DocumentEntry
+        :raises: DocumentScanError 无法读取或解析时
+        """
+        entry = self.get_entry(file_path)
+        if entry is not None:
+            return entry
+        result = scan_yaml_file(file_path)
+        if result["error"] is not None:
+            raise DocumentScanError(result["error"])
+        return self.add_scan_result(result)
+
+    def classify_many(self, file_paths, workers=None, file_index=None, progress=None):
+        """
+        批量分类，未缓存的文件交给进程池并行扫描。
+        :param file_paths: 文件路径列表
+        :param workers: 工作进程数，None 使用默认值，1 为串行
+        :param file_index: 可选的 FileIndex，用于校验缓存条目；为 SourceFS 时从中读取不在磁盘上的文件
+        :param progress: 可选的 Progress，每个文件分类完成时 advance (缓存命中的文件一次计入)
+        :return: 与输入顺序一致的 (路径, DocumentEntry 或 None, 错误信息) 列表
+        """
+        if progress is None:
+            progress = NULL_PROGRESS
+        entries = {}
+        missing = []
+        for file_path in file_paths:
+            entry = self.get_entry(file_path, file_index)
+            if entry is not None:
+                entries[file_path] = (entry, None)
+            else:
+                missing.append(file_path)
+        if entries:
+            progress.advance(len(entries))
+        if isinstance(file_index, SourceFS):
+            # 磁盘上的文件仍由工作进程自行读取，压缩包成员在本进程读出后交给工作进程
+            results = []
+            items = []
+            for file_path in missing:
+                if file_index.is_local(file_path):
+                    continue
+                try:
+                    raw = file_index.read_bytes(file_path)
+                except Exception as e:
+                    results.append(scan_error_result(file_path, e))
+                    progress.advance()
+                    continue
+                items.append((file_path, raw, len(raw), None))
+            results.extend(scan_yaml_blobs(items, workers, progress=progress))
+            results.extend(scan_yaml_files([p for p in missing if file_index.is_local(p)], workers, progress))
+        else:
+            results = scan_yaml_files(missing, workers, progress)
+        for result in results:
+            entries[result["path"]] = (self.add_scan_result(result), result["error"])
+        return [(file_path,) + entries[file_path] for file_path in file_paths]
+
+    def load_entry(self, file_path, source=None):
+        """
+        读取并解析文件，命中缓存时直接返回已有条目。
+        :param file_path: 文件路径
+        :param source: 可选的 SourceFS，提供时通过它读取文件 (可以是压缩包成员)
+        :return: DocumentEntry
+        :raises: 解析失败时抛出 yaml.YAMLError 或 OSError
+        """
+        entry = self.get_entry(file_path, source)
+        if entry is not None and entry.data is not None:
+            return entry
+        if source is not None and not source.is_local(file_path):
+            raw = source.read_bytes(file_path)
+            size, mtime = len(raw), None
+        else:
+            st = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            size, mtime = st.st_size, st.st_mtime_ns
+        info = {}
+        data = load_yaml_bytes(raw, info)
+        if entry is not None:
+            # 只分类过的条目: 补充对象树，保留已有分类
+            entry.data = data
+            entry.info.update(info)
+            return entry
+        digest = hashlib.sha1(raw).hexdigest()
+        return self._put(file_path, digest, classify_document(data), info, data, size, mtime)
+
+    def load(self, file_path, source=None):
+        """
+        加载 YAML 数据 (带缓存)。
+        :param file_path: 文件路径
+        :param source: 可选的 SourceFS (见 load_entry)
+        :return: 解析后的数据
+        """
+        return self.load_entry(file_path, source).data
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,255 @@
+import os
+
+# Windows 等大小写不敏感的文件系统上，查找时忽略大小写 (与 os.path.exists 的行为一致)
+_CASE_INSENSITIVE = os.path.normcase('A') == 'a'
+
+class FileEntry:
+    def __init__(self, size, mtime, member=None):
+        self.size = size
+        # 修改时间 (纳秒)；来自压缩包目录时未知，为 None
+        self.mtime = mtime
+        # 来自压缩包目录时为对应的 zipfile.ZipInfo
+        self.member = member
+
+class _DirNode:
+    def __init__(self):
+        # 保持插入顺序，遍历顺序与 os.walk (目录) 或成员顺序 (压缩包) 一致
+        self.dirs = {}
+        self.files = {}
+        self._folded = None
+
+    def child(self, name):
+        node = self.dirs.get(name)
+        if node is None:
+            node = self.files.get(name)
+        if node is None and _CASE_INSENSITIVE:
+            if self._folded is None:
+                self._folded = {}
+                for key, value in list(self.files.items()) + list(self.dirs.items()):
+                    self._folded.setdefault(key.lower(), value)
+            node = self._folded.get(name.lower())
+        return node
+
+    def add_dir(self, name):
+        node = self.dirs.get(name)
+        if node is None:
+            node = _DirNode()
+            self.dirs[name] = node
+            self._folded = None
+        return node
+
+    def add_file(self, name, entry):
+        self.files[name] = entry
+        self._folded = None
+
+    def remove(self, name):
+        node = self.dirs.pop(name, None)
+        if node is None:
+            node = self.files.pop(name, None)
+        self._folded = None
+        return node
+
+    def copy(self):
+        """:return: 目录结构的副本 (文件条目共用)"""
+        node = _DirNode()
+        node.dirs = {name: child.copy() for name, child in self.dirs.items()}
+        node.files = dict(self.files)
+        return node
+
+class FileIndex:
+    """
+    资源包目录的内存文件索引 (路径字典树，叶子记录大小和修改时间)。
+    一次遍历 (os.scandir 或压缩包成员列表) 构建，之后的存在性检查和目录遍历都只查询内存。
+    不在根目录下的路径直接交给文件系统处理。
+    """
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self._tree = _DirNode()
+
+    @classmethod
+    def from_directory(cls, root):
+        """
+        用 os.scandir 遍历目录构建索引。与 os.walk 一样不进入符号链接指向的目录。
+        :param root: 根目录
+        :return: FileIndex；目录不存在时为空索引
+        """
+        index = cls(root)
+        stack = [(index.root, index._tree)]
+        while stack:
+            path, node = stack.pop()
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    child = node.add_dir(entry.name)
+                    if not entry.is_symlink():
+                        subdirs.append((entry.path, child))
+                    continue
+                try:
+                    st = entry.stat()
+                    node.add_file(entry.name, FileEntry(st.st_size, st.st_mtime_ns))
+                except OSError:
+                    node.add_file(entry.name, FileEntry(None, None))
+            stack.extend(reversed(subdirs))
+        return index
+
+    @classmethod
+    def from_zip(cls, zip_file, root, select=None):
+        """
+        从压缩包的中央目录构建索引，不解压任何内容。
+        路径按 ZipFile.extract 的规则清理，使索引中的路径与解压到 root 后一致；同名成员后者覆盖前者。
+        :param zip_file: zipfile.ZipFile
+        :param root: 压缩包 (将要) 解压到的目录
+        :param select: 可选，判断文件成员是否收录的函数 (参数为成员名)；
+                       提供时与 extract_pack 的结果一致，目录只来自收录文件的上级目录
+        :return: FileIndex
+        """
+        index = cls(root)
+        for info in zip_file.infolist():
+            if select is not None and (info.is_dir() or not select(info.filename)):
+                continue
+            parts = [p for p in info.filename.replace('\\', '/').split('/') if p not in ('', '.', '..')]
+            if not parts:
+                continue
+            dir_parts = parts if info.is_dir() else parts[:-1]
+            node = index._tree
+            for name in dir_parts:
+                node = node.add_dir(name)
+            if not info.is_dir():
+                node.add_file(parts[-1], FileEntry(info.file_size, None, info))
+        return index
+
+    def _parts(self, path):
+        # 根目录下的路径返回相对路径片段列表，否则返回 None
+        path = os.path.normpath(path)
+        if path == self.root:
+            return []
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        if not path.startswith(prefix):
+            return None
+        return path[len(prefix):].split(os.sep)
+
+    def _lookup(self, parts):
+        node = self._tree
+        for name in parts:
+            if not isinstance(node, _DirNode):
+                return None
+            node = node.child(name)
+            if node is None:
+                return None
+        return node
+
+    def contains(self, path):
+        """路径是否在索引的根目录下 (由索引负责回答)。"""
+        return self._parts(path) is not None
+
+    def exists(self, path):
+        parts = self._parts(path)
+        if parts is None:
+            return os.path.exists(path)
+        return self._lookup(parts) is not None
+
+    def isdir(self, path):
+        parts = self._parts(path)
+        if parts is None:
+            return os.path.isdir(path)
+        return isinstance(self._lookup(parts), _DirNode)
+
+    def isfile(self, path):
+        parts = self._parts(path)
+        if parts is None:
+            return os.path.isfile(path)
+        return isinstance(self._lookup(parts), FileEntry)
+
+    def entry(self, path):
+        """
+        :param path: 文件路径
+        :return: FileEntry；不是索引中的文件时返回 None
+        """
+        parts = self._parts(path)
+        if parts is None:
+            return None
+        node = self._lookup(parts)
+        return node if isinstance(node, FileEntry) else None
+
+    def listdir(self, path):
+        """
+        与 os.listdir 相同 (子目录和文件名)。
+        :raises: FileNotFoundError 目录不存在时
+        """
+        parts = self._parts(path)
+        if parts is None:
+            return os.listdir(path)
+        node = self._lookup(parts)
+        if not isinstance(node, _DirNode):
+            raise FileNotFoundError(path)
+        return list(node.dirs) + list(node.files)
+
+    def walk(self, top):
+        """
+        与 os.walk(top) 相同的 (root, dirs, files) 序列 (自顶向下，可原地修改 dirs 以剪枝)。
+        :param top: 起始目录
+        """
+        parts = self._parts(top)
+        if parts is None:
+            yield from os.walk(top)
+            return
+        node = self._lookup(parts)
+        if not isinstance(node, _DirNode):
+            return
+        stack = [(os.path.normpath(top), node)]
+        while stack:
+            path, node = stack.pop()
+            dirs = list(node.dirs)
+            yield path, dirs, list(node.files)
+            for name in reversed(dirs):
+                child = node.dirs.get(name)
+                if child is not None:
+                    stack.append((os.path.join(path, name), child))
+
+    def copy_tree(self, top, target):
+        """
+        将 top 目录下的索引复制到另一个索引的根目录 (不访问文件系统)，之后两者的移动互不影响。
+        :param top: 本索引中的目录
+        :param target: 接收副本的索引
+        """
+        parts = self._parts(top)
+        node = self._lookup(parts) if parts is not None else None
+        if isinstance(node, _DirNode):
+            target._tree = node.copy()
+
+    def move(self, src, dst, target=None):
+        """
+        同步 shutil.move(src, dst) 对索引的影响 (dst 为完整的目标路径)。
+        :param src: 原路径
+        :param dst: 新路径
+        :param target: dst 不在本索引根目录下时，接收该子树的另一个索引
+        """
+        src_parts = self._parts(src)
+        if not src_parts:
+            return
+        parent = self._lookup(src_parts[:-1])
+        if not isinstance(parent, _DirNode):
+            return
+        node = parent.remove(src_parts[-1])
+        if node is None:
+            return
+        index = target if target is not None else self
+        dst_parts = index._parts(dst)
+        if not dst_parts:
+            return
+        parent = index._tree
+        for name in dst_parts[:-1]:
+            parent = parent.add_dir(name)
+        if isinstance(node, _DirNode):
+            parent.dirs[dst_parts[-1]] = node
+            parent._folded = None
+        else:
+            parent.add_file(dst_parts[-1], node)
@@ -0,0 +1,211 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Condition
+from src.utils.progress import Progress
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# 同一阶段内进度事件的最小间隔 (秒)。阶段结束时 (包括任务结束) 总会补发最终计数
+PROGRESS_EVENT_INTERVAL = 0.1
+
+class JobError(Exception):
+    """任务因输入问题无法完成 (错误信息直接展示给用户)。"""
+    pass
+
+class Job(Progress):
+    """
+    后台任务。任务函数通过 Progress 接口 (set_stage / advance) 报告阶段和计数，
+    每次变化记录为一个事件 (见 wait_events)，各阶段的累计耗时记录在 timings 中。
+    """
+    def __init__(self, job_id, key=None):
+        self.id = job_id
+        # 任务所属对象 (如会话 ID)，见 JobManager.active
+        self.key = key
+        self.state = QUEUED
+        # 当前阶段名及其已处理项数 / 总项数 (未知时为 None)
+        self.stage = None
+        self.processed = 0
+        self.total = None
+        # 阶段名 -> 累计耗时 (毫秒)，同名阶段多次出现时累加
+        self.timings = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self._stage_started = None
+        self._last_progress_event = 0
+        # 当前阶段是否有因节流未发出的计数
+        self._progress_pending = False
+        self._events = []
+        self._lock = Lock()
+        self._changed = Condition(self._lock)
+
+    def set_stage(self, stage, total=None):
+        with self._lock:
+            now = time.time()
+            self._end_stage(now)
+            self.stage = stage
+            self.processed = 0
+            self.total = total
+            self._stage_started = now
+            self.updated = now
+            # 新阶段的第一次进度不受上一阶段的节流影响
+            self._last_progress_event = 0
+            self._emit("stage", now)
+
+    def set_total(self, total):
+        """更新当前阶段的总项数 (开始阶段时还不知道时)。"""
+        with self._lock:
+            self.total = total
+
+    def advance(self, count=1):
+        with self._lock:
+            now = time.time()
+            self.processed += count
+            self.updated = now
+            if now - self._last_progress_event >= PROGRESS_EVENT_INTERVAL or self.processed == self.total:
+                self._emit("progress", now)
+            else:
+                self._progress_pending = True
+
+    def _end_stage(self, now):
+        if self._progress_pending:
+            # 补发被节流的最终计数
+            self._emit("progress", now)
+        if self.stage is not None and self._stage_started is not None:
+            elapsed = (now - self._stage_started) * 1000
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0) + elapsed, 1)
+        self._stage_started = None
+
+    def _emit(self, event_type, now, **extra):
+        # 调用方持有 self._lock
+        event = {
+            "seq": len(self._events),
+            "type": event_type,
+            "stage": self.stage,
+            "processed": self.processed,
+            "total": self.total,
+            "elapsed_ms": round((now - self.created) * 1000, 1),
+            "stage_elapsed_ms": round((now - self._stage_started) * 1000, 1) if self._stage_started else None
+        }
+        event.update(extra)
+        self._events.append(event)
+        if event_type == "progress":
+            self._last_progress_event = now
+            self._progress_pending = False
+        self._changed.notify_all()
+
+    def wait_events(self, after=0, timeout=None):
+        """
+        等待并返回序号不小于 after 的事件。任务结束后不再等待。
+        :param after: 第一个需要的事件序号
+        :param timeout: 最长等待秒数
+        :return: 事件字典列表 (可能为空)
+        """
+        with self._lock:
+            if len(self._events) <= after and not self.finished:
+                self._changed.wait(timeout)
+            return list(self._events[after:])
+
+    def _finish(self, state, result=None, error=None):
+        with self._lock:
+            now = time.time()
+            if state in (DONE, FAILED):
+                self._end_stage(now)
+            self.state = state
+            self.result = result
+            self.error = error
+            self.updated = now
+            if state in (DONE, FAILED):
+                self._emit(state, now, result=result, error=error, timings=dict(self.timings))
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "stage": self.stage,
+                "processed": self.processed,
+                "total": self.total,
+                "timings": dict(self.timings),
+                "result": self.result,
+                "error": self.error,
+                "created": self.created,
+                "updated": self.updated
+            }
+
+class JobManager:
+    """
+    后台任务队列: 固定大小的线程池执行任务，调用方通过任务 ID 查询状态和结果。
+    已结束的任务保留 keep_seconds 秒供查询 (刷新页面后仍可取回结果)。
+    """
+    def __init__(self, max_workers=2, keep_seconds=3600):
+        self.max_workers = max_workers
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = Lock()
+
+    def submit(self, func, *args, key=None, **kwargs):
+        """
+        提交任务。func 以 Job 为第一个参数调用，返回值 (需可 JSON 序列化) 即任务结果；
+        抛出的异常使任务失败，异常信息记录为 error。
+
+        :param key: 可选，任务所属对象 (如会话 ID)，用于 active() 查询；同一 key 可以有多个任务
+        :return: Job
+        """
+        with self._lock:
+            self._prune()
+            job = Job(str(uuid.uuid4()), key)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job._finish(RUNNING)
+        try:
+            result = func(job, *args, **kwargs)
+        except JobError as e:
+            print(f"Job {job.id} failed: {e}")
+            job._finish(FAILED, error=str(e))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job._finish(FAILED, error=str(e))
+        else:
+            job._finish(DONE, result=result)
+        print(f"Job {job.id} {job.state}, stage timings (ms): {job.timings}")
+
+    def _active(self, key):
+        for job in self._jobs.values():
+            if job.key == key and not job.finished:
+                return job
+        return None
+
+    def active(self, key):
+        """:return: 指定 key 的一个未结束任务，没有时返回 None"""
+        with self._lock:
+            return self._active(key)
+
+    def get(self, job_id):
+        """:return: Job，不存在或已过期时返回 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        deadline = time.time() - self.keep_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated < deadline]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,184 @@
+import os
+import time
+import shutil
+import zipfile
+from abc import ABC, abstractmethod
+
+class OutputSink(ABC):
+    """
+    转换输出的写入目标。转换器和迁移器仍按输出目录下的完整路径写入，
+    由具体实现决定写到磁盘目录、内存还是直接写进压缩包。
+    不在 root 下的路径无法映射为成员名，会抛出 ValueError。
+    """
+    def __init__(self, root):
+        self.root = os.path.normpath(root) if root is not None else None
+
+    def relpath(self, path):
+        """:return: 相对于 root 的成员名 (以 / 分隔)"""
+        path = os.path.normpath(path)
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        if not path.startswith(prefix):
+            raise ValueError(f"{path} is outside of output root {self.root}")
+        return path[len(prefix):].replace(os.sep, '/')
+
+    def makedirs(self, path):
+        """确保目录存在 (只有目录输出需要)。"""
+        pass
+
+    @abstractmethod
+    def write_bytes(self, path, data, mtime=None):
+        """
+        写入文件内容。
+        :param path: 输出目录下的完整路径
+        :param data: 字节内容
+        :param mtime: 可选的修改时间 (秒)
+        """
+        pass
+
+    def write_text(self, path, text):
+        self.write_bytes(path, text.encode('utf-8'))
+
+    def copy_file(self, src, dst, source=None):
+        """
+        复制源文件 (保留修改时间，与 shutil.copy2 一致)。
+        :param source: 可选的 SourceFS，src 不在磁盘上 (如压缩包成员) 时从中读取
+        """
+        if source is not None:
+            self.write_bytes(dst, source.read_bytes(src), source.stat(src)[1])
+            return
+        with open(src, 'rb') as f:
+            data = f.read()
+        self.write_bytes(dst, data, os.stat(src).st_mtime)
+
+    @abstractmethod
+    def exists(self, path):
+        """:return: 路径 (文件或目录) 是否已写入"""
+        pass
+
+    @abstractmethod
+    def files_under(self, top):
+        """:return: top 目录下 (递归) 所有已写入文件的完整路径"""
+        pass
+
+    def close(self):
+        pass
+
+class DirectorySink(OutputSink):
+    """直接写入磁盘目录 (root 为 None 时接受任意路径)。"""
+    def makedirs(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def write_bytes(self, path, data, mtime=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def write_text(self, path, text):
+        # 文本模式写入，换行符与平台一致 (与原先直接 open(path, 'w') 相同)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def copy_file(self, src, dst, source=None):
+        if source is not None and not source.is_local(src):
+            super().copy_file(src, dst, source)
+            return
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(src, dst)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def files_under(self, top):
+        return [os.path.join(root, name) for root, _, files in os.walk(top) for name in files]
+
+class MemorySink(OutputSink):
+    """
+    输出保存在内存中 (成员名 -> (内容, 修改时间))，适合小型资源包。
+    同一路径重复写入时后者覆盖前者，与目录输出一致。
+    """
+    def __init__(self, root):
+        super().__init__(root)
+        self.files = {}
+
+    def write_bytes(self, path, data, mtime=None):
+        self.files[self.relpath(path)] = (bytes(data), mtime if mtime is not None else time.time())
+
+    def exists(self, path):
+        name = self.relpath(path)
+        if name in self.files:
+            return True
+        prefix = name + '/'
+        return any(key.startswith(prefix) for key in self.files)
+
+    def files_under(self, top):
+        prefix = self.relpath(top) + '/'
+        return [os.path.join(self.root, *key.split('/')) for key in self.files if key.startswith(prefix)]
+
+    @property
+    def total_bytes(self):
+        return sum(len(data) for data, _ in self.files.values())
+
+    def write_zip(self, file, compression=zipfile.ZIP_DEFLATED):
+        """
+        将内存中的输出写为压缩包 (成员按名称排序)。
+        :param file: 压缩包路径或可写的文件对象
+        """
+        with zipfile.ZipFile(file, 'w', compression) as zip_ref:
+            for name in sorted(self.files):
+                data, mtime = self.files[name]
+                info = zipfile.ZipInfo(name, _zip_date_time(mtime))
+                info.compress_type = compression
+                zip_ref.writestr(info, data)
+
+class ZipSink(OutputSink):
+    """
+    直接写入压缩包，不在磁盘上生成中间目录。成员名为相对于 root 的路径。
+    同一路径重复写入时压缩包中会出现同名成员 (解压时后者覆盖前者)。
+    """
+    def __init__(self, root, file, compression=zipfile.ZIP_DEFLATED):
+        """
+        :param root: 转换器使用的输出根目录 (不会被创建)
+        :param file: 压缩包路径或可写的文件对象
+        """
+        super().__init__(root)
+        self.compression = compression
+        self._zip = zipfile.ZipFile(file, 'w', compression)
+        self._names = set()
+
+    def write_bytes(self, path, data, mtime=None):
+        name = self.relpath(path)
+        if name in self._names:
+            print(f"Warning: {name} written twice to output archive")
+        self._names.add(name)
+        info = zipfile.ZipInfo(name, _zip_date_time(mtime if mtime is not None else time.time()))
+        info.compress_type = self.compression
+        self._zip.writestr(info, data)
+
+    def copy_file(self, src, dst, source=None):
+        if source is not None and not source.is_local(src):
+            super().copy_file(src, dst, source)
+            return
+        name = self.relpath(dst)
+        if name in self._names:
+            print(f"Warning: {name} written twice to output archive")
+        self._names.add(name)
+        self._zip.write(src, name)
+
+    def exists(self, path):
+        name = self.relpath(path)
+        prefix = name + '/'
+        return name in self._names or any(key.startswith(prefix) for key in self._names)
+
+    def files_under(self, top):
+        prefix = self.relpath(top) + '/'
+        return [os.path.join(self.root, *key.split('/')) for key in self._names if key.startswith(prefix)]
+
+    def close(self):
+        self._zip.close()
+
+def _zip_date_time(mtime):
+    # zip 格式不能表示 1980 年之前的时间
+    return time.localtime(max(mtime, 315532800))[:6]
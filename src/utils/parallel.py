@@ -0,0 +1,116 @@
+import os
+import sys
+import pickle
+import multiprocessing
+from threading import Lock
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.utils.progress import NULL_PROGRESS
+
+# 文件数少于该值时直接串行处理，避免进程启动开销
+MIN_PARALLEL_ITEMS = 8
+
+# 共用的进程池及其参数 (工作进程数, initializer, 序列化后的 initargs)，见 _shared_pool
+_pool = None
+_pool_key = None
+_pool_lock = Lock()
+
+def is_frozen():
+    """是否运行在 PyInstaller 打包的可执行文件中。"""
+    return bool(getattr(sys, 'frozen', False))
+
+def default_workers():
+    """
+    默认工作进程数。
+    可通过环境变量 MCC_SCAN_WORKERS 指定；PyInstaller 单文件版本默认串行，
+    因为每个子进程都要重新解包运行时，启动代价很高。
+    """
+    env_value = os.environ.get("MCC_SCAN_WORKERS")
+    if env_value:
+        try:
+            return max(1, int(env_value))
+        except ValueError:
+            pass
+    if is_frozen():
+        return 1
+    return os.cpu_count() or 1
+
+def _mp_context():
+    """
+    工作进程的启动方式。调用方 (Web 服务) 是多线程进程，fork 会把其他线程持有的锁原样复制到子进程，
+    因此优先使用 forkserver (从干净的服务进程 fork，启动仍然较快)，不支持时使用 spawn。
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _shared_pool(workers, initializer, initargs):
+    """
+    返回共用的进程池，工作进程在多次调用之间复用。
+    参数 (包括 initializer 恢复的配置) 变化时换用新的进程池，旧进程池在已提交的任务完成后关闭。
+    """
+    global _pool, _pool_key
+    key = (workers, initializer, pickle.dumps(initargs))
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                        initializer=initializer, initargs=initargs)
+            _pool_key = key
+        return _pool
+
+def _discard_pool(executor):
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is executor:
+            _pool = None
+            _pool_key = None
+    executor.shutdown(wait=False)
+
+def shutdown_pool():
+    """关闭共用的进程池 (如退出前)。"""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_key = None
+
+def _advancing(results, progress):
+    for result in results:
+        progress.advance()
+        yield result
+
+def map_ordered(func, items, workers=None, initializer=None, initargs=(), progress=None):
+    """
+    将 func 应用到 items 的每个元素，结果顺序与输入一致。
+    workers 大于 1 且任务足够多时使用共用的进程池 (见 _shared_pool)，否则串行执行。
+
+    :param func: 模块级函数 (需可被 pickle)
+    :param items: 输入列表
+    :param workers: 工作进程数，None 表示使用 default_workers()
+    :param initializer: 可选，在每个工作进程启动时调用 (用于恢复模块级配置)
+    :param initargs: initializer 的参数
+    :param progress: 可选的 Progress，每得到一个结果调用一次 advance
+    :return: 结果列表
+    """
+    items = list(items)
+    if workers is None:
+        workers = default_workers()
+    if multiprocessing.parent_process() is not None:
+        # 已在工作进程中 (例如多文件并行扫描时解析大文件)，不再嵌套进程池
+        workers = 1
+    if progress is None:
+        progress = NULL_PROGRESS
+    if workers <= 1 or len(items) < MIN_PARALLEL_ITEMS:
+        return list(_advancing((func(item) for item in items), progress))
+    # 小任务按批发送，减少进程间通信次数
+    chunksize = max(1, len(items) // (min(workers, len(items)) * 4))
+    # 进程池按请求的进程数共用 (工作进程按需启动)，不随本次任务数变化
+    executor = _shared_pool(workers, initializer, initargs)
+    try:
+        return list(_advancing(executor.map(func, items, chunksize=chunksize), progress))
+    except BrokenProcessPool:
+        # 工作进程异常退出后进程池不可再用，下次调用时重新创建
+        _discard_pool(executor)
+        raise
@@ -0,0 +1,17 @@
+class Progress:
+    """
+    进度报告接口: 转换器和迁移器在每个阶段开始时调用 set_stage，每处理一项调用 advance。
+    默认实现不做任何事；后台转换任务 (Job) 记录阶段、计数和耗时。
+    """
+    def set_stage(self, stage, total=None):
+        """
+        :param stage: 阶段名
+        :param total: 该阶段要处理的项数，未知时为 None
+        """
+        pass
+
+    def advance(self, count=1):
+        pass
+
+# 未设置进度报告时使用的空实现
+NULL_PROGRESS = Progress()
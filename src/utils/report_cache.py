@@ -0,0 +1,59 @@
+import copy
+import json
+from collections import OrderedDict
+from threading import Lock
+from src.utils.disk_cache import DiskCache
+
+class ReportCache:
+    """
+    按上传内容哈希缓存分析报告 (内存 LRU，可选磁盘存储)。
+    条目为 {"report": 报告字典}，同一压缩包再次上传时直接返回报告而不重新分析。
+    """
+    def __init__(self, max_entries=64, directory=None, max_mb=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        # 磁盘存储使重启后仍能命中，None 表示只在内存中缓存
+        self._disk = DiskCache(directory, int(max_mb) * 1024 * 1024) if directory else None
+
+    def get(self, digest):
+        """
+        :param digest: 上传内容的十六进制摘要
+        :return: 条目的副本，未命中时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                return copy.deepcopy(entry)
+        if self._disk is None:
+            return None
+        raw = self._disk.get(digest)
+        if raw is None:
+            return None
+        try:
+            entry = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            return None
+        self._remember(digest, entry)
+        return copy.deepcopy(entry)
+
+    def set(self, digest, report):
+        """
+        :param digest: 上传内容的十六进制摘要
+        :param report: 可 JSON 序列化的报告字典
+        """
+        entry = {"report": copy.deepcopy(report)}
+        self._remember(digest, entry)
+        if self._disk is not None:
+            self._disk.set(digest, json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+
+    def _remember(self, digest, entry):
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
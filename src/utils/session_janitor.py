@@ -0,0 +1,168 @@
+import os
+import time
+import shutil
+import threading
+from threading import Lock
+
+class SessionJanitor:
+    """
+    清理会话目录 (上传目录下以会话 ID 命名、输出目录下以任务 ID 命名的子目录，以下统称会话)。
+    超过 ttl_seconds 未使用的会话直接删除；总大小超过 quota_bytes 时按最近使用时间
+    (会话目录的 mtime，由 touch() 刷新) 淘汰最久未使用的会话，直到降到配额的 90% 以下。
+    is_busy 返回 True 的会话 (如有未结束的任务) 和 pin() 中的会话不会被清理。
+    """
+    def __init__(self, roots, ttl_seconds, quota_bytes, is_busy=None, on_evict=None, min_idle=60):
+        """
+        :param roots: 会话目录的父目录列表
+        :param ttl_seconds: 会话保留时间，None 表示不按时间清理
+        :param quota_bytes: 所有会话的总大小上限，None 表示不限制
+        :param is_busy: 可选，判断会话是否正在使用的函数 (参数为会话 ID)
+        :param on_evict: 可选，会话被删除后调用 (参数为会话 ID)，用于释放内存中的会话状态
+        :param min_idle: 最近这么多秒内使用过的会话不会因配额被淘汰
+        """
+        self.roots = list(roots)
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.is_busy = is_busy
+        self.on_evict = on_evict
+        self.min_idle = min_idle
+        self.last_sweep = None
+        self._pins = {}
+        self._lock = Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def touch(self, session_id):
+        """记录会话被使用 (刷新会话目录的 mtime)。"""
+        for root in self.roots:
+            try:
+                os.utime(os.path.join(root, session_id))
+            except OSError:
+                pass
+
+    def pin(self, session_id):
+        """在 unpin() 之前保护会话不被清理 (可嵌套)。"""
+        with self._lock:
+            self._pins[session_id] = self._pins.get(session_id, 0) + 1
+
+    def unpin(self, session_id):
+        with self._lock:
+            count = self._pins.get(session_id, 0) - 1
+            if count > 0:
+                self._pins[session_id] = count
+            else:
+                self._pins.pop(session_id, None)
+        self.touch(session_id)
+
+    def _busy(self, session_id):
+        if session_id in self._pins:
+            return True
+        return self.is_busy is not None and self.is_busy(session_id)
+
+    def usage(self):
+        """
+        :return: 会话列表 [{"id", "bytes", "last_used", "busy"}]，按最近使用时间从旧到新排序
+        """
+        sessions = {}
+        for root in self.roots:
+            try:
+                entries = list(os.scandir(root))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                session = sessions.setdefault(entry.name, {"id": entry.name, "bytes": 0, "last_used": 0})
+                session["bytes"] += _tree_size(entry.path)
+                session["last_used"] = max(session["last_used"], mtime)
+        with self._lock:
+            for session in sessions.values():
+                session["busy"] = self._busy(session["id"])
+        return sorted(sessions.values(), key=lambda s: s["last_used"])
+
+    def sweep(self, now=None):
+        """
+        执行一次清理。
+        :return: 摘要 {"time", "expired", "evicted", "freed_bytes", "total_bytes"}
+        """
+        now = time.time() if now is None else now
+        sessions = self.usage()
+        summary = {"time": now, "expired": [], "evicted": [], "freed_bytes": 0, "total_bytes": 0}
+        remaining = []
+        for session in sessions:
+            expired = self.ttl_seconds is not None and now - session["last_used"] > self.ttl_seconds
+            if expired and self._evict(session["id"]):
+                summary["expired"].append(session["id"])
+                summary["freed_bytes"] += session["bytes"]
+            else:
+                remaining.append(session)
+        total = sum(session["bytes"] for session in remaining)
+        if self.quota_bytes is not None and total > self.quota_bytes:
+            limit = self.quota_bytes * 0.9
+            for session in remaining:
+                if total <= limit:
+                    break
+                if now - session["last_used"] < self.min_idle:
+                    continue
+                if self._evict(session["id"]):
+                    summary["evicted"].append(session["id"])
+                    summary["freed_bytes"] += session["bytes"]
+                    total -= session["bytes"]
+        summary["total_bytes"] = total
+        self.last_sweep = summary
+        if summary["expired"] or summary["evicted"]:
+            print(f"Janitor removed {len(summary['expired'])} expired and {len(summary['evicted'])} evicted sessions "
+                  f"({summary['freed_bytes']} bytes)")
+        return summary
+
+    def _evict(self, session_id):
+        # 在锁内再次检查，避免删除刚开始使用的会话
+        with self._lock:
+            if self._busy(session_id):
+                return False
+            for root in self.roots:
+                shutil.rmtree(os.path.join(root, session_id), ignore_errors=True)
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+        return True
+
+    def start(self, interval=60):
+        """启动后台清理线程，每 interval 秒清理一次。"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="janitor", daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Janitor sweep failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+def _tree_size(path):
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                pass
+    return total
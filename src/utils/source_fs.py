@@ -0,0 +1,148 @@
+import os
+import time
+import shutil
+import zipfile
+from abc import ABC, abstractmethod
+from src.utils.file_index import FileIndex
+from src.utils.zip_extract import is_pack_member
+
+class SourceFS(FileIndex, ABC):
+    """
+    转换输入的只读文件来源。在 FileIndex 的查找和遍历之上提供文件内容的读取，
+    转换器和迁移器通过它读取 YAML、模型 JSON 和贴图，不关心文件在磁盘上还是在压缩包中。
+    与 FileIndex 相同，不在根目录下的路径直接交给文件系统处理。
+    """
+    def is_local(self, path):
+        """路径是否对应磁盘上的文件 (可直接交给 open / shutil)。"""
+        return True
+
+    def open(self, path):
+        """:return: 只读的二进制文件对象"""
+        return open(path, 'rb')
+
+    def read_bytes(self, path):
+        with self.open(path) as f:
+            return f.read()
+
+    def stat(self, path):
+        """
+        :return: (大小, 修改时间 (秒))；修改时间未知时为 None
+        :raises: FileNotFoundError 文件不存在时
+        """
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+
+    @abstractmethod
+    def rename(self, src, dst, target=None):
+        """
+        移动文件或目录并同步索引 (参数同 FileIndex.move)。
+        :param target: dst 不在本来源根目录下时，接收该子树的另一个来源 (见 derive)
+        """
+        pass
+
+    @abstractmethod
+    def derive(self, root):
+        """:return: 根目录为 root、与本来源共用底层存储的新来源 (作为 rename 的 target)"""
+        pass
+
+    @abstractmethod
+    def working_copy(self, top, root):
+        """
+        复制 top 目录，得到可以 rename 而不影响本来源的新来源 (本来源可能被多个转换共用)。
+        :param top: 要复制的目录
+        :param root: 副本的根目录 (调用方独占的工作目录)
+        :return: 根目录为 root 的新来源
+        """
+        pass
+
+    def close(self):
+        pass
+
+class DirectorySource(SourceFS):
+    """磁盘目录 (例如解压目录)。rename 会移动磁盘上的文件。"""
+    def rename(self, src, dst, target=None):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.move(src, dst)
+        self.move(src, dst, target)
+
+    def derive(self, root):
+        # 该目录可能残留上次转换的内容
+        os.makedirs(root, exist_ok=True)
+        return DirectorySource.from_directory(root)
+
+    def working_copy(self, top, root):
+        shutil.rmtree(root, ignore_errors=True)
+        shutil.copytree(top, root, symlinks=True)
+        return DirectorySource.from_directory(root)
+
+class ZipSource(SourceFS):
+    """
+    直接读取压缩包成员，不解压到磁盘。root 是压缩包解压后 (虚拟) 的根目录，
+    路径与解压到 root 后一致，文件内容在读取时才解压。
+    移动只修改索引 (成员仍按原 ZipInfo 读取)。
+    """
+    def __init__(self, root, zip_file=None, owner=False):
+        super().__init__(root)
+        self.zip_file = zip_file
+        # 是否由本来源负责关闭 zip_file (derive 得到的来源共用同一个句柄)
+        self._owner = owner
+
+    @classmethod
+    def open_archive(cls, zip_path, root, select=is_pack_member):
+        """
+        :param zip_path: 压缩包路径
+        :param root: 虚拟的解压目录
+        :param select: 判断成员是否收录的函数，默认与 extract_pack 相同；None 表示全部收录
+        :return: ZipSource
+        """
+        zip_file = zipfile.ZipFile(zip_path, 'r')
+        try:
+            index = cls.from_zip(zip_file, root, select)
+        except Exception:
+            zip_file.close()
+            raise
+        index.zip_file = zip_file
+        index._owner = True
+        return index
+
+    def _member(self, path):
+        entry = self.entry(path)
+        if entry is None:
+            raise FileNotFoundError(path)
+        return entry.member
+
+    def is_local(self, path):
+        return not self.contains(path)
+
+    def open(self, path):
+        if self.is_local(path):
+            return open(path, 'rb')
+        return self.zip_file.open(self._member(path))
+
+    def read_bytes(self, path):
+        if self.is_local(path):
+            return super().read_bytes(path)
+        return self.zip_file.read(self._member(path))
+
+    def stat(self, path):
+        if self.is_local(path):
+            return super().stat(path)
+        member = self._member(path)
+        return member.file_size, time.mktime(member.date_time + (0, 0, -1))
+
+    def rename(self, src, dst, target=None):
+        self.move(src, dst, target)
+
+    def derive(self, root):
+        return ZipSource(root, self.zip_file)
+
+    def working_copy(self, top, root):
+        # 只复制索引，成员仍从同一个压缩包读取
+        index = ZipSource(root, self.zip_file)
+        self.copy_tree(top, index)
+        return index
+
+    def close(self):
+        if self._owner and self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
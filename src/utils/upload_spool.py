@@ -0,0 +1,86 @@
+import io
+import os
+import hashlib
+
+# 读取上传流的块大小
+CHUNK_SIZE = 1024 * 1024
+
+class UploadSpool:
+    """
+    接收上传流并同时计算 SHA-256。不超过 max_memory 的上传只保存在内存中，
+    超出时直接写入最终路径 (不经过临时文件)，避免同一份数据在磁盘上写两次。
+    内存中的上传只有在 persist() 时才写入磁盘，不需要保留时 (如命中报告缓存) 直接丢弃。
+    """
+    def __init__(self, file_path, max_memory):
+        """
+        :param file_path: 需要保留时压缩包的存放路径
+        :param max_memory: 内存中保存的最大字节数
+        """
+        self.file_path = file_path
+        self.max_memory = max_memory
+        self.size = 0
+        self._data = None
+        self._on_disk = False
+
+    def receive(self, stream, chunk_size=CHUNK_SIZE):
+        """
+        :param stream: 可读的二进制流 (request.stream 或上传文件流)
+        :return: 内容的十六进制 SHA-256 摘要
+        """
+        digest = hashlib.sha256()
+        buffer = io.BytesIO()
+        out = None
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                self.size += len(chunk)
+                if out is None and self.size > self.max_memory:
+                    out = open(self.file_path, 'wb')
+                    out.write(buffer.getvalue())
+                    buffer = None
+                    self._on_disk = True
+                if out is not None:
+                    out.write(chunk)
+                else:
+                    buffer.write(chunk)
+        finally:
+            if out is not None:
+                out.close()
+        if buffer is not None:
+            self._data = buffer.getvalue()
+        return digest.hexdigest()
+
+    @property
+    def in_memory(self):
+        return not self._on_disk
+
+    def open(self):
+        """:return: 可随机读取的二进制文件对象 (可直接交给 zipfile.ZipFile)"""
+        if self._on_disk:
+            return open(self.file_path, 'rb')
+        return io.BytesIO(self._data)
+
+    def persist(self):
+        """
+        确保上传内容保存在 file_path，之后释放内存中的副本。
+        :return: file_path
+        """
+        if not self._on_disk:
+            with open(self.file_path, 'wb') as f:
+                f.write(self._data or b'')
+            self._on_disk = True
+            self._data = None
+        return self.file_path
+
+    def discard(self):
+        """丢弃上传内容 (包括已写入磁盘的部分)。"""
+        self._data = None
+        if self._on_disk:
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+            self._on_disk = False
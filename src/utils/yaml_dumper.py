@@ -0,0 +1,183 @@
+import io
+import os
+import re
+from yaml.emitter import Emitter
+from yaml.representer import SafeRepresenter
+
+# libyaml 提供的 C 发射器，未编译 libyaml 时不可用
+try:
+    from yaml import CDumper
+except ImportError:
+    CDumper = None
+
+# 快速输出开关，可通过环境变量 MCC_FAST_DUMP=0 关闭
+FAST_DUMP = CDumper is not None and os.environ.get("MCC_FAST_DUMP", "1") != "0"
+
+# 与纯 Python 发射器的折行宽度一致
+LINE_WIDTH = 80
+# 较长的键会被写成复杂键 (? key)，两种发射器对长度的计算方式不同 (是否计入标签、按字符或字节)，
+# 超过该长度的键一律交给纯 Python 发射器
+_SIMPLE_KEY_LIMIT = 100
+_LINE_BREAKS = re.compile('[\n\r\x85\u2028\u2029]')
+# 纯 Python 发射器在双引号字符串中会转义 BMP 以外的字符，libyaml 不会
+_NON_BMP = re.compile('[\U00010000-\U0010FFFF]')
+# 映射键行: 键后只跟冒号 (可带锚点或标签)，其值为下一行开始的块集合
+_BLOCK_KEY_LINE = re.compile(r"""(?:'(?:[^']|'')*'|"[^"]*"|[^'"].*?):(?: [&!]\S*)*$""")
+# 键值行: 键、分隔符、值
+_KEY_VALUE = re.compile(r"""('(?:[^']|'')*'|"[^"]*"|[^'"].*?): (.*)$""")
+
+def _check_str(dumper, data):
+    # 多行字符串需要按行折叠，交给纯 Python 发射器
+    if _LINE_BREAKS.search(data):
+        dumper.fast_safe = False
+
+def _fast_represent_str(dumper, data):
+    _check_str(dumper, data)
+    return SafeRepresenter.represent_str(dumper, data)
+
+def _fast_represent_quoted_str(dumper, data):
+    _check_str(dumper, data)
+    return dumper.represent_scalar("tag:yaml.org,2002:str", data, style='"')
+
+def _fast_represent_binary(dumper, data):
+    # 二进制数据以 base64 块标量输出
+    dumper.fast_safe = False
+    return dumper.represent_binary(data)
+
+if CDumper is not None:
+    class FastDumper(CDumper):
+        """
+        CDumper 的表示层与 yaml.Dumper 相同，只有发射器不同。
+        fast_safe 记录是否出现了两种发射器可能输出不同的内容。
+        """
+        fast_safe = True
+        quote_strings = False
+
+        def represent_mapping(self, tag, mapping, flow_style=None):
+            # 只有可能写成复杂键的键才需要检查: 空字符串、过长的字符串、集合
+            if hasattr(mapping, 'items'):
+                for key in mapping:
+                    if isinstance(key, str):
+                        if not key or len(key) >= _SIMPLE_KEY_LIMIT:
+                            self.fast_safe = False
+                    elif isinstance(key, (tuple, frozenset)):
+                        self.fast_safe = False
+            return super().represent_mapping(tag, mapping, flow_style)
+
+    class FastQuotedDumper(FastDumper):
+        quote_strings = True
+
+    FastDumper.add_representer(str, _fast_represent_str)
+    FastDumper.add_representer(bytes, _fast_represent_binary)
+    FastQuotedDumper.add_representer(str, _fast_represent_quoted_str)
+
+def _indent_block_sequences(lines):
+    """
+    libyaml 总是将映射值中的块序列写成无缩进形式 (- 与键对齐)，
+    IndentDumper 则将其缩进两格，序列内的所有内容随之右移。
+    按行计算每行所在的无缩进序列层数并补齐缩进。
+    """
+    stack = []  # 当前所在无缩进序列的列位置
+    count = len(lines)
+    for i in range(count):
+        line = lines[i]
+        if not line:
+            continue
+        indent = len(line) - len(line.lstrip(' '))
+        while stack and (indent < stack[-1] or (indent == stack[-1] and not line.startswith('- ', indent))):
+            stack.pop()
+        # 内容列: 跳过行首的 "- " 序列项标记
+        col = indent
+        while line.startswith('- ', col):
+            col += 2
+        if i + 1 < count:
+            next_line = lines[i + 1]
+            if next_line.startswith('- ', col) and len(next_line) - len(next_line.lstrip(' ')) == col \
+                    and _BLOCK_KEY_LINE.match(line, col):
+                stack.append(col)
+                # 开启序列的键行本身只受外层序列影响
+                if len(stack) > 1:
+                    lines[i] = ' ' * (2 * (len(stack) - 1)) + line
+                continue
+        if stack:
+            lines[i] = ' ' * (2 * len(stack)) + line
+
+def _rewrap_line(line):
+    """
+    按纯 Python 发射器的规则折行超出宽度的标量值。
+    :return: 折行后的文本；无法确定标量位置时返回 None
+    """
+    indent = len(line) - len(line.lstrip(' '))
+    col = indent
+    while line.startswith('- ', col):
+        col += 2
+    match = _KEY_VALUE.match(line, col)
+    if match:
+        value_start = match.start(2)
+        # 映射值的续行缩进为键所在列加两格
+        cont_indent = col + 2
+    elif _BLOCK_KEY_LINE.match(line, col):
+        # 简单键从不折行
+        return line
+    else:
+        value_start = col
+        # 序列项的续行缩进即标量所在列
+        cont_indent = col
+    token = line[value_start:]
+    if not token or token[0] in '&!*[{':
+        # 带锚点、标签或流式集合的长行不处理
+        return None if ' ' in token else line
+
+    buf = io.StringIO()
+    emitter = Emitter(buf, width=LINE_WIDTH, allow_unicode=True)
+    # 模拟写到该标量之前的发射器状态 (分隔空格由写入方法自行输出)
+    emitter.column = value_start - 1
+    emitter.indent = cont_indent
+    emitter.whitespace = False
+    emitter.indention = False
+    if token[0] == "'":
+        emitter.write_single_quoted(token[1:-1].replace("''", "'"), split=True)
+    elif token[0] == '"':
+        emitter.write_double_quoted(token[1:-1], split=True)
+    else:
+        emitter.write_plain(token, split=True)
+    return line[:value_start - 1] + buf.getvalue()
+
+def fast_dump(data, quote_strings=False):
+    """
+    使用 libyaml 输出与 IndentDumper (quote_strings 为 True 时为 RecipeDumper) 逐字节相同的 YAML。
+    C 发射器不折行输出，随后补齐序列缩进，并用纯 Python 发射器的规则折行超宽的标量。
+
+    :param data: 要输出的数据 (非空字典或列表)
+    :param quote_strings: 是否将所有字符串写成双引号形式
+    :return: YAML 文本；遇到无法保证一致的内容时返回 None，调用方应退回纯 Python 发射器
+    """
+    if not FAST_DUMP or not data or not isinstance(data, (dict, list)):
+        return None
+    stream = io.StringIO()
+    dumper_class = FastQuotedDumper if quote_strings else FastDumper
+    dumper = dumper_class(stream, default_flow_style=False, allow_unicode=True, sort_keys=False, width=-1)
+    try:
+        dumper.open()
+        dumper.represent(data)
+        dumper.close()
+    finally:
+        dumper.dispose()
+    if not dumper.fast_safe:
+        return None
+    text = stream.getvalue()
+    # 转义序列的写法两种发射器不完全相同
+    if '\\' in text:
+        return None
+    if quote_strings and _NON_BMP.search(text):
+        return None
+
+    lines = text.split('\n')
+    _indent_block_sequences(lines)
+    for i, line in enumerate(lines):
+        if len(line) > LINE_WIDTH:
+            wrapped = _rewrap_line(line)
+            if wrapped is None:
+                return None
+            lines[i] = wrapped
+    return '\n'.join(lines)
@@ -1,40 +1,518 @@
 import yaml
 import os
+import re
+import codecs
+import hashlib
+import pickle
+import zlib
+from yaml.events import (
+    ScalarEvent, AliasEvent, MappingStartEvent, SequenceStartEvent, MappingEndEvent, SequenceEndEvent
+)
+from src.utils.disk_cache import DiskCache
 
-def safe_load_yaml(file_path):
+# 优先使用 libyaml 提供的 C 加载器，未编译 libyaml 时退回纯 Python 实现
+try:
+    from yaml import CSafeLoader as FastLoader
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    FastLoader = yaml.SafeLoader
+    YAML_BACKEND = "python"
+
+# 解析缓存格式版本，修改预处理或解析逻辑导致结果不同时需递增
+PARSE_CACHE_FORMAT = 1
+# 缓存键包含加载器版本，升级 PyYAML 或切换后端后旧条目自然失效
+LOADER_VERSION = f"{yaml.__version__}/{YAML_BACKEND}/{PARSE_CACHE_FORMAT}"
+DEFAULT_PARSE_CACHE_MB = 256
+# 缓存条目中保留的加载细节
+_CACHED_INFO_KEYS = ("encoding", "backend", "tab_repairs", "chunk_errors")
+# 超过该大小 (字符数) 的文档拆分后并行解析，见 yaml_splitter
+SPLIT_THRESHOLD = 2 * 1024 * 1024
+
+class YAMLBudgetError(yaml.YAMLError):
+    """文档超出解析资源限制 (大小、节点数、别名、嵌套深度)。"""
+    pass
+
+class ParseLimits:
+    """
+    单个 YAML 文档的解析资源限制。
+    节点数按别名展开后计算，用于拦截“十亿笑声”一类的别名炸弹。
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_nodes=5000000, max_aliases=100000, max_depth=128):
+        self.max_bytes = max_bytes
+        self.max_nodes = max_nodes
+        self.max_aliases = max_aliases
+        self.max_depth = max_depth
+
+    def signature(self):
+        return f"{self.max_bytes}/{self.max_nodes}/{self.max_aliases}/{self.max_depth}"
+
+PARSE_LIMITS = ParseLimits()
+
+def configure_parse_limits(limits):
+    """
+    替换全局解析限制。
+    :param limits: ParseLimits 实例
+    """
+    global PARSE_LIMITS
+    PARSE_LIMITS = limits
+
+def check_document_size(raw):
+    """
+    检查文档大小。
+    :param raw: 文件的原始字节
+    :raises: YAMLBudgetError 超出限制时
+    """
+    if len(raw) > PARSE_LIMITS.max_bytes:
+        raise YAMLBudgetError(f"document is {len(raw)} bytes, limit is {PARSE_LIMITS.max_bytes}")
+
+# 可能的锚点或别名
+_ANCHOR_OR_ALIAS = re.compile(r'(?:^|[\s\[{,])[&*][^\s,\[\]{}]')
+
+def _needs_budget_check(content, limits, base_depth=0):
+    # 没有别名时展开后的节点数不超过字符数的一半；
+    # 块嵌套每层至少右移一列 (或一个 "- ")，流式嵌套每层至少一个括号。
+    # 这些上界都在限制内时无需逐事件检查
+    if len(content) // 2 > limits.max_nodes:
+        return True
+    if _ANCHOR_OR_ALIAS.search(content):
+        return True
+    if content.count('[') + content.count('{') >= limits.max_depth // 2 - base_depth:
+        return True
+    deep_prefix = re.compile(r'^[ \-]{%d}' % max(1, limits.max_depth // 2 - 2 - base_depth), re.M)
+    return deep_prefix.search(content) is not None
+
+def check_yaml_budget(content, loader=None, base_depth=0, count_nodes=False):
+    """
+    只读取事件流，在构造对象之前检查节点数 (含别名展开)、别名数和嵌套深度。
+    构造器和 C 组合器都是递归实现，过深的嵌套必须在此之前拦截。
+
+    :param content: 已预处理的 YAML 文本
+    :param loader: 读取事件使用的加载器，默认为 FastLoader
+    :param base_depth: 文本的根节点在整个文档中的嵌套深度 (拆分解析的块不一定位于文档根部)
+    :param count_nodes: 为 True 时总是逐事件统计节点数 (调用方需要汇总同一文档各块的节点数)
+    :return: 展开后的节点数；未逐事件检查时返回 None
+    :raises: YAMLBudgetError 超出限制时；yaml.YAMLError 语法错误时
+    """
+    limits = PARSE_LIMITS
+    if not count_nodes and not _needs_budget_check(content, limits, base_depth):
+        return None
+    stack = []      # 帧: [锚点, 开始时的展开节点数, 子树深度]
+    anchors = {}    # 锚点 -> (展开节点数, 子树深度)
+    open_anchors = set()
+    nodes = 0
+    aliases = 0
+    for event in yaml.parse(content, Loader=loader or FastLoader):
+        if isinstance(event, ScalarEvent):
+            nodes += 1
+            if event.anchor is not None:
+                anchors[event.anchor] = (1, 1)
+            if stack and stack[-1][2] < 1:
+                stack[-1][2] = 1
+        elif isinstance(event, (MappingStartEvent, SequenceStartEvent)):
+            nodes += 1
+            if base_depth + len(stack) >= limits.max_depth:
+                raise YAMLBudgetError(f"nesting deeper than {limits.max_depth} levels (line {event.start_mark.line + 1})")
+            if event.anchor is not None:
+                open_anchors.add(event.anchor)
+            stack.append([event.anchor, nodes - 1, 0])
+        elif isinstance(event, (MappingEndEvent, SequenceEndEvent)):
+            anchor, start, depth = stack.pop()
+            depth += 1
+            if anchor is not None:
+                open_anchors.discard(anchor)
+                anchors[anchor] = (nodes - start, depth)
+            if stack and stack[-1][2] < depth:
+                stack[-1][2] = depth
+        elif isinstance(event, AliasEvent):
+            aliases += 1
+            if aliases > limits.max_aliases:
+                raise YAMLBudgetError(f"more than {limits.max_aliases} aliases")
+            if event.anchor in open_anchors:
+                raise YAMLBudgetError(f"recursive alias *{event.anchor} (line {event.start_mark.line + 1})")
+            if event.anchor not in anchors:
+                # 未定义的别名由组合器报告
+                continue
+            size, depth = anchors[event.anchor]
+            nodes += size
+            if base_depth + len(stack) + depth > limits.max_depth:
+                raise YAMLBudgetError(f"alias *{event.anchor} expands deeper than {limits.max_depth} levels")
+            if stack and stack[-1][2] < depth:
+                stack[-1][2] = depth
+        else:
+            continue
+        if nodes > limits.max_nodes:
+            raise YAMLBudgetError(f"more than {limits.max_nodes} nodes after alias expansion")
+    return nodes
+
+_parse_cache = None
+
+def configure_parse_cache(directory, max_mb=DEFAULT_PARSE_CACHE_MB):
+    """
+    启用或关闭磁盘解析缓存。
+
+    :param directory: 缓存目录，None 或空字符串表示关闭
+    :param max_mb: 缓存容量上限 (MB)，超出后按最近使用时间淘汰
+    """
+    global _parse_cache
+    if directory:
+        _parse_cache = DiskCache(directory, int(max_mb) * 1024 * 1024)
+    else:
+        _parse_cache = None
+
+def parse_cache_config():
+    """
+    当前缓存配置，可作为 configure_parse_cache 的参数在子进程中恢复。
+    :return: (directory, max_mb)
+    """
+    if _parse_cache is None:
+        return (None, DEFAULT_PARSE_CACHE_MB)
+    return (_parse_cache.directory, _parse_cache.max_bytes // (1024 * 1024))
+
+def loader_config():
+    """
+    当前加载配置 (缓存与解析限制)，可作为 configure_loader 的参数在工作进程中恢复。
+    """
+    return parse_cache_config() + (PARSE_LIMITS,)
+
+def configure_loader(cache_directory, cache_mb, limits):
+    """在工作进程启动时恢复主进程的加载配置。"""
+    configure_parse_cache(cache_directory, cache_mb)
+    configure_parse_limits(limits)
+
+def _parse_cache_key(raw):
+    # 限制变化后，按旧限制通过检查的缓存条目不再可用
+    version = f"{LOADER_VERSION}/{PARSE_LIMITS.signature()}"
+    return hashlib.sha256(version.encode('ascii') + b'\0' + raw).hexdigest()
+
+def lookup_parse_cache(raw, info=None):
+    """
+    按原始字节查找已缓存的解析结果。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，命中时写入缓存的加载细节，backend 记为 cache
+    :return: (是否命中, 数据)
+    """
+    if _parse_cache is None:
+        return False, None
+    blob = _parse_cache.get(_parse_cache_key(raw))
+    if blob is None:
+        return False, None
+    try:
+        # 缓存目录只由本程序写入，可以信任其中的 pickle 数据
+        cached_info, data = pickle.loads(zlib.decompress(blob))
+    except Exception:
+        return False, None
+    if info is not None:
+        info.update(cached_info)
+        info["backend"] = "cache"
+    return True, data
+
+def store_parse_cache(raw, data, info=None):
+    """
+    保存解析结果 (未启用缓存时不做任何事)。
+
+    :param raw: 文件的原始字节
+    :param data: 解析后的数据
+    :param info: 解析时回传的加载细节
+    """
+    if _parse_cache is None:
+        return
+    cached_info = {k: v for k, v in (info or {}).items() if k in _CACHED_INFO_KEYS}
+    try:
+        blob = zlib.compress(pickle.dumps((cached_info, data), pickle.HIGHEST_PROTOCOL), 1)
+    except Exception as e:
+        print(f"Cannot cache parsed YAML: {e}")
+        return
+    _parse_cache.set(_parse_cache_key(raw), blob)
+
+# 通过环境变量启用缓存 (子进程导入时同样生效)
+configure_parse_cache(os.environ.get("MCC_PARSE_CACHE_DIR"),
+                      os.environ.get("MCC_PARSE_CACHE_MB") or DEFAULT_PARSE_CACHE_MB)
+
+# 字节顺序标记 (UTF-32 需在 UTF-16 之前检查，二者 LE 前缀相同)
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+# 编码探测时检查的字节数 (从第一个非 ASCII 字节开始)
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+def _sample_decodes(sample, encoding):
+    # 增量解码器允许样本末尾截断在多字节字符中间
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def detect_encoding(raw):
+    """
+    根据 BOM 和字节特征推断文件编码，不解码整个文件。
+
+    :param raw: 文件的原始字节
+    :return: 编码名称 (utf-8 / utf-8-sig / utf-16 / utf-32 / gbk / latin-1)
+    """
+    for bom, encoding in _BOMS:
+        if raw.startswith(bom):
+            return encoding
+    match = _NON_ASCII.search(raw)
+    if match is None:
+        # 纯 ASCII
+        return 'utf-8'
+    sample = raw[match.start():match.start() + ENCODING_SAMPLE_SIZE]
+    if _sample_decodes(sample, 'utf-8'):
+        return 'utf-8'
+    # GBK (常见于中文 Windows 环境)
+    if _sample_decodes(sample, 'gbk'):
+        return 'gbk'
+    # latin-1 保证能解码，但可能乱码
+    return 'latin-1'
+
+def decode_yaml_bytes(raw, info=None):
+    """
+    将原始字节解码为文本。编码只探测一次，正常情况下只解码一次；
+    仅当样本之外的内容与探测结果不符时才依次退回 GBK 和 latin-1。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，写入 encoding
+    :return: 解码后的文本
+    """
+    encoding = detect_encoding(raw)
+    try:
+        content = raw.decode(encoding)
+    except UnicodeDecodeError:
+        content = None
+        for fallback in ('gbk', 'latin-1'):
+            if fallback == encoding:
+                continue
+            try:
+                content = raw.decode(fallback)
+                encoding = fallback
+                break
+            except UnicodeDecodeError:
+                continue
+    if info is not None:
+        info["encoding"] = encoding
+    return content
+
+# 行首空白中包含制表符的行
+_TAB_INDENT = re.compile(r'^[ \t]*\t', re.M)
+# 块标量头 (key: | / - >- 等)
+_BLOCK_SCALAR_HEADER = re.compile(r'(?:^|[:\-])\s+[|>][0-9+\-]*\s*(?:#.*)?$|^[|>][0-9+\-]*\s*(?:#.*)?$')
+# 作为分隔符使用的制表符 (key:\tvalue、-\titem)，纯 Python 解析器不接受
+_SEPARATOR_TAB = re.compile(r'([:\-])\t+')
+
+def _infer_indent_width(lines):
+    # 统计纯空格缩进行之间最常见的缩进增量
+    counts = {}
+    prev = 0
+    for line in lines:
+        body = line.lstrip(' ')
+        if not body or body[0] in '#\t':
+            continue
+        indent = len(line) - len(body)
+        if indent > prev:
+            delta = indent - prev
+            counts[delta] = counts.get(delta, 0) + 1
+        prev = indent
+    if not counts:
+        return 2
+    width = max(counts, key=counts.get)
+    return width if 2 <= width <= 8 else 2
+
+def normalize_tab_indentation(content):
+    """
+    将行首缩进中的制表符替换为空格，只改写缩进部分，
+    引号字符串和块标量内容中的制表符保持不变。
+    缩进宽度根据文件中纯空格缩进的行推断 (默认 2)。
+
+    :param content: YAML 文本
+    :return: (修复后的文本, 修复记录列表)，记录包含 line (从 1 开始)、tabs、width
+    """
+    if '\t' not in content or not _TAB_INDENT.search(content):
+        return content, []
+    lines = content.split('\n')
+    width = _infer_indent_width(lines)
+    repairs = []
+    block_parent = None  # 块标量头所在行的缩进
+    block_indent = None  # 块标量内容的缩进
+    for i, line in enumerate(lines):
+        body = line.lstrip(' \t')
+        prefix = line[:len(line) - len(body)]
+        spaces = len(line) - len(line.lstrip(' '))
+
+        if block_parent is not None:
+            if not body:
+                continue
+            indent = len(prefix.expandtabs(width))
+            if indent > block_parent:
+                if block_indent is None:
+                    block_indent = spaces if spaces > block_parent else indent
+                # 缩进之后的制表符属于块标量内容
+                if spaces >= block_indent or '\t' not in prefix:
+                    continue
+                lines[i] = prefix.expandtabs(width) + body
+                repairs.append({"line": i + 1, "tabs": prefix.count('\t'), "width": width})
+                continue
+            block_parent = None
+            block_indent = None
+
+        if '\t' in prefix:
+            prefix = prefix.expandtabs(width)
+            lines[i] = prefix + body
+            repairs.append({"line": i + 1, "tabs": line[:len(line) - len(body)].count('\t'), "width": width})
+
+        if body and not body.startswith('#') and _BLOCK_SCALAR_HEADER.search(body):
+            block_parent = len(prefix)
+            block_indent = None
+
+    if not repairs:
+        return content, []
+    return '\n'.join(lines), repairs
+
+def _repair_separator_tabs(content):
+    repairs = []
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        fixed, count = _SEPARATOR_TAB.subn(r'\1 ', line)
+        if count:
+            lines[i] = fixed
+            repairs.append({"line": i + 1, "tabs": count, "width": 1})
+    return '\n'.join(lines), repairs
+
+def safe_load_yaml(file_path, info=None):
     """
     安全加载 YAML 文件，处理常见的制表符缩进等问题。
-    
+
     :param file_path: YAML 文件路径
+    :param info: 可选字典，用于回传加载细节 (文件编码、实际使用的解析后端)
     :return: 解析后的数据 (字典或列表)
     :raises: 如果加载失败，抛出 yaml.YAMLError 或 OSError
     """
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return load_yaml_bytes(raw, info)
+
+def load_yaml_bytes(raw, info=None):
+    """
+    从已读取的字节内容解析 YAML，供需要同时计算内容哈希的调用方使用。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，写入 encoding、backend (libyaml / python / cache)，
+                 以及存在制表符修复时的 tab_repairs 行号记录
+    :return: 解析后的数据 (字典或列表)
+    :raises: 如果解析失败，抛出 yaml.YAMLError；超出解析限制时为其子类 YAMLBudgetError
+    """
+    check_document_size(raw)
+    hit, data = lookup_parse_cache(raw, info)
+    if hit:
+        return data
+    if info is None:
+        info = {}
+    data = parse_yaml_document(prepare_yaml_text(raw, info), info)
+    store_parse_cache(raw, data, info)
+    return data
+
+def prepare_yaml_text(raw, info=None):
+    """
+    解码字节并完成解析前的预处理 (换行符统一、制表符缩进修复)。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，写入 encoding 和 tab_repairs
+    :return: 可直接交给解析器的文本
+    """
+    content = decode_yaml_bytes(raw, info)
+    # 与文本模式读取保持一致: 统一换行符
+    content = content.replace('\r\n', '\n')
+
+    # 在唯一一次解析前修复制表符缩进，不再反复整篇替换重试
+    content, repairs = normalize_tab_indentation(content)
+    if repairs and info is not None:
+        info["tab_repairs"] = repairs
+    return content
+
+def parse_yaml_document(content, info=None):
+    """
+    解析完整文档。大文档按顶层键拆分后并行解析；
+    整体解析失败时同样按块解析，只丢弃出错的块而不是整个文件。
+
+    :param content: prepare_yaml_text 返回的文本
+    :param info: 可选字典，写入 backend，按块解析时还会写入 chunk_errors
+    :return: 解析后的数据
+    :raises: 如果无法解析且无法拆分，抛出 yaml.YAMLError
+    """
+    # 延迟导入: yaml_splitter 依赖本模块
+    from src.utils.yaml_splitter import parse_split_yaml
+    if info is None:
+        info = {}
+    if len(content) >= SPLIT_THRESHOLD:
+        try:
+            return parse_split_yaml(content, info)
+        except ValueError:
+            pass
     try:
+        return parse_yaml_text(content, info)
+    except YAMLBudgetError:
+        # 超出资源限制的文档不做按块恢复
+        raise
+    except yaml.YAMLError as e:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            try:
-                # 尝试 GBK (常见于中文 Windows 环境)
-                with open(file_path, 'r', encoding='gbk') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                # 尝试 latin-1 (保证能读取，但可能乱码)
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-            
+            # 单线程按块解析，尽量保留可用部分
+            data = parse_split_yaml(content, info, workers=1)
+        except ValueError:
+            raise e
+        print(f"YAML parse error, recovered {len(data)} top-level keys by blocks: {e}")
+        return data
+
+def parse_yaml_text(content, info=None, base_depth=0, count_nodes=False):
+    """
+    解析已预处理的 YAML 文本。优先使用 C 加载器，失败时退回 Python 加载器。
+
+    :param content: prepare_yaml_text 返回的文本
+    :param info: 可选字典，写入 backend；统计了节点数时写入 nodes
+    :param base_depth: 见 check_yaml_budget
+    :param count_nodes: 见 check_yaml_budget
+    :return: 解析后的数据
+    :raises: 如果解析失败，抛出 yaml.YAMLError
+    """
+    if info is None:
+        info = {}
+
+    def check(text, loader):
+        nodes = check_yaml_budget(text, loader, base_depth, count_nodes)
+        if nodes is not None:
+            info["nodes"] = nodes
+
+    # 快速路径: C 加载器与 SafeLoader 共用同一构造器，结果一致
+    if FastLoader is not yaml.SafeLoader:
+        try:
+            check(content, FastLoader)
+            data = yaml.load(content, Loader=FastLoader)
+            info["backend"] = YAML_BACKEND
+            return data
+        except YAMLBudgetError:
+            raise
+        except yaml.YAMLError:
+            # 交给下面的 Python 加载器和修复逻辑处理
+            pass
+
+    info["backend"] = "python"
+    try:
+        check(content, yaml.SafeLoader)
+        return yaml.safe_load(content)
+    except YAMLBudgetError:
+        raise
+    except yaml.scanner.ScannerError:
+        # 最后手段: 修复作为分隔符的制表符 (纯 Python 解析器不接受)
+        if '\t' not in content:
+            raise
+        content, repairs = _repair_separator_tabs(content)
+        if not repairs:
+            raise
+        info.setdefault("tab_repairs", []).extend(repairs)
+        check(content, yaml.SafeLoader)
         return yaml.safe_load(content)
-    except yaml.scanner.ScannerError as e:
-        # 检查错误是否可能是由制表符引起的
-        if '\t' in content:
-            # 尝试将制表符替换为 2 个空格 (常见约定)
-            sanitized_content = content.replace('\t', '  ')
-            try:
-                return yaml.safe_load(sanitized_content)
-            except yaml.YAMLError:
-                # 如果 2 个空格不起作用，尝试 4 个空格
-                sanitized_content = content.replace('\t', '    ')
-                return yaml.safe_load(sanitized_content)
-        raise e
-    except Exception as e:
-        raise e
@@ -0,0 +1,306 @@
+import re
+import yaml
+from yaml.events import (
+    ScalarEvent, AliasEvent, MappingStartEvent, MappingEndEvent,
+    SequenceStartEvent, SequenceEndEvent, DocumentStartEvent
+)
+from src.utils.yaml_loader import (
+    FastLoader, prepare_yaml_text, parse_yaml_document, lookup_parse_cache, store_parse_cache,
+    check_document_size, YAMLBudgetError
+)
+from src.utils import yaml_loader
+from src.detectors import FormatMatcher, detect_data
+
+# 顶层键行 (第 0 列的普通键或引号键)，用于快速模式的文本估计
+_TOP_LEVEL_KEY = re.compile(r"""^([^\s#'"\-?:{}\[\],&*!|>%@`][^:\n]*?|'[^'\n]*'|"[^"\n]*")[ \t]*:(?=[ \t\r\n]|$)""", re.M)
+_FURNITURE_KEY = re.compile(r'^[ \t]+furniture[ \t]*:', re.M)
+
+class ShallowScanFallback(Exception):
+    """浅层扫描无法得出与完整加载一致的结论 (别名、合并键、多文档等)，需要完整解析。"""
+    pass
+
+def _new_shape():
+    return {
+        "top_keys": set(),
+        "formats": [],        # 识别出的格式 (按检测器注册顺序)
+        "confidence": {},     # 格式名 -> 置信度 (0 ~ 1)
+        "item_count": None,   # items 为映射时的条目数
+        "has_furniture": False,
+        "partial": False      # 提前结束扫描时为 True
+    }
+
+def _apply_matcher(shape, matcher):
+    shape["formats"] = matcher.formats()
+    shape["confidence"] = matcher.confidences()
+    return shape
+
+def describe_yaml_data(data):
+    """
+    根据已完整加载的数据生成与 scan_yaml_shape 相同结构的描述。
+
+    :param data: 解析后的 YAML 数据
+    :return: shape 字典；items 不是映射时不计入顶层键 (不作为物品配置，分类和配方照常识别)
+    """
+    shape = _new_shape()
+    if not data or not isinstance(data, dict):
+        return shape
+    items = data.get("items")
+    shape["top_keys"] = set(data.keys())
+    if not isinstance(items, dict):
+        shape["top_keys"].discard("items")
+        items = None
+    _apply_matcher(shape, detect_data(data))
+    if items is not None:
+        shape["item_count"] = len(items)
+        for item in items.values():
+            behaviours = item.get("behaviours") if isinstance(item, dict) else None
+            if isinstance(behaviours, dict) and "furniture" in behaviours:
+                shape["has_furniture"] = True
+                break
+    return shape
+
+def _tracked(path):
+    # 格式签名之外扫描自身需要的层级: 根、items (计数) 以及 items.<id>.behaviours (家具)
+    depth = len(path)
+    if depth == 0:
+        return True
+    if path[0] != "items":
+        return False
+    return depth <= 2 or (depth == 3 and path[2] == "behaviours")
+
+def scan_yaml_shape(content, stop_when_decided=False, detectors=None):
+    """
+    基于 PyYAML 事件流的浅层分类器。
+    不构造对象树，只读取格式签名 (见 src.detectors) 所需的层级，所有已注册格式在同一次遍历中打分，
+    并在不构造条目的情况下统计 items 数量。
+
+    :param content: 已预处理的 YAML 文本
+    :param stop_when_decided: 为 True 时，一旦识别出任意格式立即停止 (不再保证计数完整)
+    :param detectors: 检测器列表，默认使用全部已注册的检测器
+    :return: shape 字典
+    :raises: ShallowScanFallback 需要完整解析时；yaml.YAMLError 语法错误时；
+             YAMLBudgetError 节点数或嵌套深度超出限制时
+    """
+    limits = yaml_loader.PARSE_LIMITS
+    nodes = 0
+    shape = _new_shape()
+    matcher = FormatMatcher(detectors)
+    stack = []  # 帧 (均为映射): [路径, 各级是否为第一个键, 当前键, 是否等待键, 已读键数, 当前键是否为第一个]
+    skip = 0
+    documents = 0
+    item_ids = set()
+    items_kind = None
+
+    for event in yaml.parse(content, Loader=FastLoader):
+        # 与完整解析前的检查一致: 跳过的子树同样计入节点数和嵌套深度
+        if isinstance(event, ScalarEvent):
+            nodes += 1
+        elif isinstance(event, (MappingStartEvent, SequenceStartEvent)):
+            nodes += 1
+            if len(stack) + skip >= limits.max_depth:
+                raise YAMLBudgetError(f"nesting deeper than {limits.max_depth} levels (line {event.start_mark.line + 1})")
+        if nodes > limits.max_nodes:
+            raise YAMLBudgetError(f"more than {limits.max_nodes} nodes after alias expansion")
+
+        if skip:
+            if isinstance(event, (MappingStartEvent, SequenceStartEvent)):
+                skip += 1
+            elif isinstance(event, (MappingEndEvent, SequenceEndEvent)):
+                skip -= 1
+                if skip == 0 and stack:
+                    stack[-1][3] = True
+            continue
+
+        if isinstance(event, MappingEndEvent):
+            stack.pop()
+            if stack:
+                stack[-1][3] = True
+            continue
+
+        if isinstance(event, DocumentStartEvent):
+            documents += 1
+            if documents > 1:
+                # safe_load 只接受单文档，交给完整解析报告错误
+                raise ShallowScanFallback("multiple documents")
+            continue
+
+        if not isinstance(event, (ScalarEvent, MappingStartEvent, SequenceStartEvent, AliasEvent)):
+            continue
+
+        if isinstance(event, AliasEvent):
+            # 别名引用的内容无法在不构造的情况下确定
+            raise ShallowScanFallback("alias")
+
+        parent = stack[-1] if stack else None
+
+        # 映射中的键
+        if parent is not None and parent[3]:
+            if not isinstance(event, ScalarEvent):
+                raise ShallowScanFallback("complex key")
+            key = event.value
+            if key == "<<":
+                raise ShallowScanFallback("merge key")
+            parent[2] = key
+            parent[3] = False
+            parent[5] = parent[4] == 0
+            parent[4] += 1
+            path = parent[0]
+            matcher.key(path, parent[1], key)
+            depth = len(path)
+            if depth == 0:
+                shape["top_keys"].add(key)
+            elif path == ("items",):
+                # 重复键在构造时会合并，因此按去重后的键计数
+                item_ids.add(key)
+            elif depth == 3 and path[2] == "behaviours" and key == "furniture":
+                shape["has_furniture"] = True
+
+            if stop_when_decided and matcher.decided:
+                shape["partial"] = True
+                break
+            continue
+
+        # 值节点
+        if parent is None:
+            path = ()
+            firsts = ()
+        else:
+            path = parent[0] + (parent[2],)
+            firsts = parent[1] + (parent[5],)
+
+        if path == ("items",):
+            items_kind = "map" if isinstance(event, MappingStartEvent) else "other"
+
+        if isinstance(event, ScalarEvent):
+            if parent is not None:
+                matcher.scalar(parent[0], parent[1], parent[2], event.value)
+                parent[3] = True
+            continue
+
+        is_map = isinstance(event, MappingStartEvent)
+        if path == () and not is_map:
+            # 根节点不是映射: 旧逻辑不会识别任何格式
+            return shape
+        # 序列中不包含签名，整个跳过
+        if is_map and (_tracked(path) or matcher.wants(path, firsts)):
+            stack.append([path, firsts, None, True, 0, False])
+        else:
+            skip = 1
+
+    if items_kind == "other":
+        # 与 describe_yaml_data 一致: items 不是映射时不计入顶层键
+        shape["top_keys"].discard("items")
+
+    if items_kind == "map":
+        shape["item_count"] = len(item_ids)
+    return _apply_matcher(shape, matcher)
+
+def scan_yaml_bytes(raw, info=None, stop_when_decided=False):
+    """
+    对原始字节执行浅层扫描，必要时退回完整解析。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，回传加载细节
+    :param stop_when_decided: 见 scan_yaml_shape
+    :return: (shape, data)，浅层扫描成功时 data 为 None
+    :raises: yaml.YAMLError 无法解析时
+    """
+    check_document_size(raw)
+    # 解析缓存命中时直接使用缓存的对象树，不再读取事件流
+    hit, data = lookup_parse_cache(raw, info)
+    if hit:
+        return describe_yaml_data(data), data
+    if info is None:
+        info = {}
+    content = prepare_yaml_text(raw, info)
+    try:
+        shape = scan_yaml_shape(content, stop_when_decided)
+        info["backend"] = "events"
+        return shape, None
+    except YAMLBudgetError:
+        raise
+    except (ShallowScanFallback, yaml.YAMLError):
+        data = parse_yaml_document(content, info)
+        store_parse_cache(raw, data, info)
+        return describe_yaml_data(data), data
+
+def estimate_yaml_shape(content):
+    """
+    只按文本行估计顶层键、items 条目数和是否包含家具，不解析 YAML。
+    与 split_yaml_text 一样依据缩进判断，结果可能不精确 (例如多行字符串中的类似行)。
+
+    :param content: 已预处理的 YAML 文本
+    :return: (顶层键集合, items 条目数或 None, 是否包含家具)
+    """
+    keys = []
+    for match in _TOP_LEVEL_KEY.finditer(content):
+        key = match.group(1)
+        if key[0] in "'\"":
+            key = key[1:-1]
+        keys.append((key, match.start(), match.end()))
+    item_count = None
+    has_furniture = False
+    for index, (key, start, end) in enumerate(keys):
+        if key != "items":
+            continue
+        block_end = keys[index + 1][1] if index + 1 < len(keys) else len(content)
+        block = content[end:block_end]
+        # 第一条内容行的缩进即条目键的缩进
+        first = re.search(r'^([ \t]+)([^ \t\r\n#])', block, re.M)
+        if first is None or first.group(2) == '-':
+            break
+        indent = len(first.group(1))
+        item_count = len(re.findall(r'^ {%d}[^ \t\r\n#\-]' % indent, block, re.M))
+        has_furniture = _FURNITURE_KEY.search(block) is not None
+        break
+    return set(key for key, _, _ in keys), item_count, has_furniture
+
+def quick_scan_yaml_bytes(raw, info=None):
+    """
+    快速模式的扫描: 事件流在识别出格式后立即停止，计数改为文本估计。
+    无法浅层扫描的文件不退回完整解析，只给出文本估计 (不识别格式)。
+
+    :param raw: 文件的原始字节
+    :param info: 可选字典，回传加载细节
+    :return: (shape, data)，只有解析缓存命中时 data 才不为 None
+    :raises: YAMLBudgetError 超出解析限制时
+    """
+    check_document_size(raw)
+    hit, data = lookup_parse_cache(raw, info)
+    if hit:
+        return describe_yaml_data(data), data
+    if info is None:
+        info = {}
+    content = prepare_yaml_text(raw, info)
+    info["backend"] = "events"
+    try:
+        shape = scan_yaml_shape(content, stop_when_decided=True)
+    except YAMLBudgetError:
+        raise
+    except (ShallowScanFallback, yaml.YAMLError):
+        shape = _new_shape()
+        shape["partial"] = True
+    if shape["partial"]:
+        top_keys, item_count, has_furniture = estimate_yaml_shape(content)
+        shape["top_keys"] |= top_keys
+        shape["item_count"] = item_count
+        shape["has_furniture"] = shape["has_furniture"] or has_furniture
+    return shape, None
+
+def shape_roles(shape):
+    """
+    根据 shape 得出文档在转换流程中的用途。
+
+    :return: 用途集合，可能包含 items / categories / recipes / nexo
+    """
+    keys = shape["top_keys"]
+    roles = set()
+    if "items" in keys or "equipments" in keys or "armors_rendering" in keys:
+        roles.add("items")
+    if "categories" in keys:
+        roles.add("categories")
+    if "recipes" in keys:
+        roles.add("recipes")
+    if "Nexo" in shape["formats"]:
+        roles.add("nexo")
+    return roles
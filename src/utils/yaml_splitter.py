@@ -0,0 +1,247 @@
+import re
+import yaml
+from src.utils import yaml_loader
+from src.utils.yaml_loader import parse_yaml_text, YAMLBudgetError
+from src.utils.parallel import map_ordered, default_workers
+
+# 解析失败且错误位于块末尾时 (引号或流式集合跨越了拆分边界)，最多向后合并的块数
+MAX_MERGE = 8
+# 每个解析任务的最小文本量，避免任务过碎
+MIN_GROUP_CHARS = 64 * 1024
+
+# 顶层键行: 第 0 列开始，不是注释、序列项、文档标记或复杂键
+_TOP_KEY = re.compile(r'[^\s#\-?%]')
+_ITEMS_HEADER = re.compile(r'items:\s*(?:#.*)?$')
+# 显式键 (? key) 可能跨越多行，后面的 ": value" 行无法与键分开解析
+_EXPLICIT_KEY = re.compile(r'\?(?:\s|$)')
+# 锚点和别名可能跨块引用，出现时不拆分
+_ANCHOR_OR_ALIAS = re.compile(r'(?:^|[\s\[{,])[&*][^\s,\[\]{}]')
+_DOCUMENT_MARKER = re.compile(r'^(?:---|\.\.\.)(?:\s|$)', re.M)
+
+class YAMLChunk:
+    def __init__(self, kind, start_line):
+        # kind: top (顶层键)、items (items: 行本身)、item (items 下的条目)
+        self.kind = kind
+        self.start_line = start_line
+        self.lines = []
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+def _line_indent(line):
+    return len(line) - len(line.lstrip(' '))
+
+def split_yaml_text(content):
+    """
+    按缩进将文档拆分为顶层键块，并将 items: 下的每个条目拆为单独的块。
+    不解析 YAML，只依据行首缩进判断边界。
+
+    :param content: 已预处理的 YAML 文本
+    :return: YAMLChunk 列表；文档无法安全拆分时 (根不是映射、包含锚点/别名、多文档等) 返回 None
+    """
+    if _ANCHOR_OR_ALIAS.search(content) or _DOCUMENT_MARKER.search(content):
+        return None
+    lines = content.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    chunks = []
+    current = None
+    seen_key = False
+    item_indent = None  # items 子条目的缩进，-1 表示尚未确定，None 表示不在 items 内
+    for number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            if current is None:
+                # 文件开头的注释
+                current = YAMLChunk("top", number)
+                chunks.append(current)
+            current.lines.append(line)
+            continue
+        indent = _line_indent(line)
+        if indent == 0:
+            if not _TOP_KEY.match(line):
+                if not seen_key or _EXPLICIT_KEY.match(line):
+                    # 根节点是序列或复杂键
+                    return None
+                # 顶层键下的无缩进序列，或跨行的流式集合、引号字符串，留在当前块中
+                if item_indent == -1:
+                    item_indent = None
+                current.lines.append(line)
+                continue
+            seen_key = True
+            item_indent = None
+            if _ITEMS_HEADER.match(line):
+                current = YAMLChunk("items", number)
+                item_indent = -1
+            else:
+                current = YAMLChunk("top", number)
+            chunks.append(current)
+            current.lines.append(line)
+            continue
+        if not seen_key:
+            # 根映射整体缩进，按缩进拆分不可靠
+            return None
+        if item_indent == -1:
+            # items: 之后的第一行确定子条目缩进
+            item_indent = indent if not stripped.startswith('- ') and stripped != '-' else None
+        if item_indent is not None and indent == item_indent and not stripped.startswith('- '):
+            current = YAMLChunk("item", number)
+            chunks.append(current)
+        current.lines.append(line)
+    return chunks
+
+def _error_details(error, text):
+    mark = getattr(error, 'problem_mark', None)
+    line = mark.line if mark is not None else 0
+    # 错误位于文本末尾，说明块被截断 (边界落在引号或流式集合内部)
+    at_end = mark is not None and mark.index >= len(text.rstrip())
+    message = getattr(error, 'problem', None) or str(error).split('\n')[0]
+    return {"error": message, "line": line, "at_end": at_end}
+
+def _chunk_depth(kind):
+    # items 下的条目块在文档中位于 items 映射内，其余块的根映射就是文档的根映射
+    return 1 if kind == "item" else 0
+
+def _parse_chunk_text(text, base_depth=0, count_nodes=False):
+    # :return: (数据, 错误, 节点数)；节点数不含块自身的根映射 (各块共用文档的根映射或 items 映射)
+    info = {}
+    try:
+        data = parse_yaml_text(text, info, base_depth, count_nodes)
+    except YAMLBudgetError:
+        # 超出资源限制时整个文档都不可用，不按块跳过
+        raise
+    except yaml.YAMLError as e:
+        return None, _error_details(e, text), 0
+    return data, None, max(0, info.get("nodes", 0) - 1)
+
+def parse_chunk_group(group):
+    """
+    解析一组相邻的同类块 (在工作进程中执行)。
+    整组能解析时只解析一次，否则逐块解析以定位出错的块。
+
+    :param group: (块文本列表, 块在文档中的嵌套深度, 是否统计节点数)
+    :return: 与输入等长的 (数据, 错误, 节点数) 列表；整组成功时数据和节点数全部放在第一项
+    :raises: YAMLBudgetError 块超出解析限制时
+    """
+    texts, base_depth, count_nodes = group
+    data, error, nodes = _parse_chunk_text(''.join(texts), base_depth, count_nodes)
+    if error is None:
+        return [(data, None, nodes)] + [({}, None, 0)] * (len(texts) - 1)
+    if len(texts) == 1:
+        return [(None, error, 0)]
+    return [_parse_chunk_text(text, base_depth, count_nodes) for text in texts]
+
+def _group_chunks(chunks, workers):
+    total = sum(len(line) + 1 for chunk in chunks for line in chunk.lines)
+    target = max(MIN_GROUP_CHARS, total // max(1, workers * 4))
+    groups = []
+    current = []
+    size = 0
+    for index, chunk in enumerate(chunks):
+        chunk_size = sum(len(line) + 1 for line in chunk.lines)
+        if current and (chunks[current[-1]].kind != chunk.kind or size + chunk_size > target):
+            groups.append(current)
+            current = []
+            size = 0
+        current.append(index)
+        size += chunk_size
+    if current:
+        groups.append(current)
+    return groups
+
+def parse_split_yaml(content, info=None, workers=None):
+    """
+    拆分后并行解析单个大文档，再按原顺序组装根映射。
+    解析失败的块会被跳过并记录在 info["chunk_errors"] 中，不影响其他块。
+    解析限制按整个文档计算: 嵌套深度包含块在文档中的位置，各块的节点数在组装前汇总检查。
+
+    :param content: 已预处理的 YAML 文本
+    :param info: 可选字典，写入 backend (split) 和 chunk_errors
+    :param workers: 工作进程数，None 使用默认值
+    :return: 解析后的数据
+    :raises: ValueError 文档无法安全拆分时 (调用方应改用整体解析)；
+             YAMLBudgetError 文档超出解析限制时
+    """
+    chunks = split_yaml_text(content)
+    if not chunks or len(chunks) < 2:
+        raise ValueError("document cannot be split")
+    if workers is None:
+        workers = default_workers()
+
+    # 与整体解析相同: 按字符数估计的节点数上界在限制内时不必逐事件统计
+    # (拆分的文档没有锚点和别名)
+    limits = yaml_loader.PARSE_LIMITS
+    count_nodes = len(content) // 2 > limits.max_nodes
+    groups = _group_chunks(chunks, workers)
+    tasks = [([chunks[i].text for i in group], _chunk_depth(chunks[group[0]].kind), count_nodes) for group in groups]
+    group_results = map_ordered(parse_chunk_group, tasks, workers,
+                                initializer=yaml_loader.configure_loader, initargs=yaml_loader.loader_config())
+    results = [None] * len(chunks)
+    group_heads = [None] * len(chunks)
+    for group, group_result in zip(groups, group_results):
+        for index, result in zip(group, group_result):
+            results[index] = result
+            group_heads[index] = group[0]
+
+    # 先处理跨边界的块并汇总节点数，确认整个文档在限制内后再组装
+    parts = []
+    nodes = 1  # 文档的根映射
+    index = 0
+    while index < len(chunks):
+        chunk = chunks[index]
+        value, error, chunk_nodes = results[index]
+        consumed = 1
+        if error is not None and error["at_end"]:
+            # 边界可能切断了跨行的内容，尝试与后续同类块合并；
+            # 引号字符串的续行位于第 0 列时会被当作顶层键，因此也可以并入后续的顶层键块
+            text = chunk.text
+            for extra in range(1, MAX_MERGE + 1):
+                if index + extra >= len(chunks) or chunks[index + extra].kind not in (chunk.kind, "top"):
+                    break
+                text += chunks[index + extra].text
+                merged, merged_error, merged_nodes = _parse_chunk_text(text, _chunk_depth(chunk.kind), count_nodes)
+                if merged_error is None:
+                    value, error, chunk_nodes = merged, None, merged_nodes
+                    consumed = extra + 1
+                    break
+            # 整组解析成功时组内数据都放在组的第一块中；第一块被合并后，组内其余块需要单独解析
+            follow = index + consumed
+            while consumed > 1 and follow < len(chunks) and group_heads[follow] < index + consumed:
+                results[follow] = _parse_chunk_text(chunks[follow].text, _chunk_depth(chunks[follow].kind), count_nodes)
+                follow += 1
+        nodes += chunk_nodes
+        parts.append((index, value, error))
+        index += consumed
+    if count_nodes and nodes > limits.max_nodes:
+        raise YAMLBudgetError(f"more than {limits.max_nodes} nodes after alias expansion")
+
+    data = {}
+    items = None
+    errors = []
+    for index, value, error in parts:
+        chunk = chunks[index]
+        if error is None and value is not None and not isinstance(value, dict):
+            error = {"error": "chunk is not a mapping", "line": 0, "at_end": False}
+        if error is not None:
+            errors.append({
+                "line": chunk.start_line + error["line"],
+                "key": chunk.lines[0].strip(),
+                "error": error["error"]
+            })
+            print(f"Skipped unparsable YAML block at line {chunk.start_line}: {error['error']}")
+        elif chunk.kind == "items" and index + 1 < len(chunks) and chunks[index + 1].kind == "item":
+            # items: 行本身解析为 {'items': None}，条目随后逐块并入
+            items = {}
+            data["items"] = items
+        elif chunk.kind == "item":
+            if value:
+                items.update(value)
+        elif value:
+            data.update(value)
+
+    if info is not None:
+        info["backend"] = "split"
+        if errors:
+            info["chunk_errors"] = errors
+    return data
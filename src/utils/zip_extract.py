@@ -0,0 +1,118 @@
+import os
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.asset_stats import asset_type
+
+# 转换不会读取的目录 (版本控制、编辑器和 macOS 压缩时附带的元数据)
+SKIPPED_DIRS = {".git", ".svn", ".hg", ".idea", ".vscode", "__MACOSX", "node_modules"}
+# 成员数少于该值时串行解压
+MIN_PARALLEL_MEMBERS = 16
+
+def default_extract_workers():
+    """
+    默认解压线程数 (CPU 核数，最多 8)，可通过环境变量 MCC_EXTRACT_WORKERS 指定。
+    单核上多线程只会增加切换开销，因此默认串行。
+    """
+    env_value = os.environ.get("MCC_EXTRACT_WORKERS")
+    if env_value:
+        try:
+            return max(1, int(env_value))
+        except ValueError:
+            pass
+    return min(8, os.cpu_count() or 1)
+
+def is_pack_member(name):
+    """
+    成员是否可能被转换用到: 配置 (.yml/.yaml)、贴图及其 .mcmeta、模型等 JSON 和声音。
+    Blockbench 源文件、PSD、版本控制目录等其他文件不解压。
+    :param name: 压缩包内的成员路径
+    """
+    parts = [p for p in name.replace('\\', '/').split('/') if p]
+    if not parts:
+        return False
+    if any(part in SKIPPED_DIRS for part in parts[:-1]):
+        return False
+    # macOS 的资源分支文件 (._xxx) 和 .DS_Store
+    if parts[-1].startswith("._") or parts[-1] == ".DS_Store":
+        return False
+    return asset_type(parts[-1]) != "other"
+
+def _extension(name):
+    base = name.replace('\\', '/').rsplit('/', 1)[-1]
+    dot = base.rfind('.')
+    return base[dot:].lower() if dot > 0 else ""
+
+def extract_pack(zip_path, dest, workers=None, select=is_pack_member):
+    """
+    解压资源包中转换需要的成员。成员按 ZipFile.extract 的规则清理路径，
+    多线程解压时每个线程使用自己的 ZipFile 句柄 (zlib 解压时释放 GIL)。
+
+    :param zip_path: 压缩包路径
+    :param dest: 目标目录
+    :param workers: 解压线程数，None 表示 default_extract_workers()
+    :param select: 判断成员是否需要解压的函数，None 表示全部解压
+    :return: 摘要 {"extracted_files", "extracted_bytes", "skipped_files", "skipped_bytes", "skipped_types"}，
+             字节数为解压后大小，skipped_types 为扩展名 -> 跳过的字节数
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        infos = zip_ref.infolist()
+    # 同名成员只解压最后一个 (与 extractall 的覆盖结果一致)
+    members = {}
+    summary = {"extracted_files": 0, "extracted_bytes": 0, "skipped_files": 0, "skipped_bytes": 0, "skipped_types": {}}
+    for info in infos:
+        if info.is_dir():
+            continue
+        if select is not None and not select(info.filename):
+            summary["skipped_files"] += 1
+            summary["skipped_bytes"] += info.file_size
+            ext = _extension(info.filename) or "(none)"
+            summary["skipped_types"][ext] = summary["skipped_types"].get(ext, 0) + info.file_size
+            continue
+        members.pop(info.filename, None)
+        members[info.filename] = info
+    members = list(members.values())
+    for info in members:
+        summary["extracted_files"] += 1
+        summary["extracted_bytes"] += info.file_size
+
+    os.makedirs(dest, exist_ok=True)
+    if workers is None:
+        workers = default_extract_workers()
+    workers = min(workers, len(members))
+    if workers <= 1 or len(members) < MIN_PARALLEL_MEMBERS:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for info in members:
+                _extract_member(zip_ref, info, dest)
+        return summary
+
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+
+    def extract(info):
+        zip_ref = getattr(local, "zip_ref", None)
+        if zip_ref is None:
+            zip_ref = zipfile.ZipFile(zip_path, 'r')
+            local.zip_ref = zip_ref
+            with handles_lock:
+                handles.append(zip_ref)
+        _extract_member(zip_ref, info, dest)
+
+    # 大文件先解压，减少最后只剩一个线程在工作的时间
+    members.sort(key=lambda info: info.compress_size, reverse=True)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(extract, members):
+                pass
+    finally:
+        for zip_ref in handles:
+            zip_ref.close()
+    return summary
+
+def _extract_member(zip_ref, info, dest):
+    try:
+        zip_ref.extract(info, dest)
+    except FileExistsError:
+        # 另一个线程同时创建了同一个父目录
+        zip_ref.extract(info, dest)
@@ -0,0 +1,60 @@
+import os
+import zipfile
+
+# 每次向客户端发送的数据量
+STREAM_CHUNK_SIZE = 256 * 1024
+
+class _ChunkWriter:
+    # 只支持 write 的输出对象: ZipFile 检测到不可 seek 时为每个成员写数据描述符 (data descriptor)，
+    # 因此不需要回填本地文件头中的 CRC 和大小
+    def __init__(self):
+        self._chunks = []
+        self.pending = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+def iter_zip_directory(root, base_dir, chunk_size=STREAM_CHUNK_SIZE, compression=zipfile.ZIP_DEFLATED):
+    """
+    边压缩边产出 root/base_dir 的 zip 数据，不在磁盘上生成临时压缩包。
+    成员路径与 shutil.make_archive(..., 'zip', root, base_dir) 相同 (以 base_dir/ 开头，包含目录条目)。
+
+    :param root: 根目录
+    :param base_dir: root 下要打包的目录名
+    :param chunk_size: 产出块的大致大小
+    :return: 字节块生成器
+    """
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', compression) as zip_ref:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, base_dir)):
+            dirnames.sort()
+            rel_dir = os.path.relpath(dirpath, root)
+            zip_ref.write(dirpath, rel_dir)
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                info = zipfile.ZipInfo.from_file(path, os.path.join(rel_dir, name))
+                info.compress_type = compression
+                with open(path, 'rb') as src, zip_ref.open(info, 'w') as dst:
+                    while True:
+                        data = src.read(chunk_size)
+                        if not data:
+                            break
+                        dst.write(data)
+                        if writer.pending >= chunk_size:
+                            yield writer.take()
+            if writer.pending >= chunk_size:
+                yield writer.take()
+    # 剩余的数据描述符和中央目录
+    if writer.pending:
+        yield writer.take()
@@ -0,0 +1,88 @@
+"""
+YAML 解析资源限制的测试: 别名炸弹、嵌套深度 (整体解析和拆分解析) 以及 Nexo 物品分组的嵌套检查。
+运行: python -m unittest discover tests 或 python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils import yaml_loader
+from src.utils.yaml_loader import ParseLimits, YAMLBudgetError, configure_parse_limits, load_yaml_bytes, parse_yaml_text
+from src.utils.yaml_splitter import parse_split_yaml
+from src.converters.nexo_to_ce import NexoConverter
+
+MAX_DEPTH = 16
+
+BILLION_LAUGHS = """\
+a: &a ["lol","lol","lol","lol","lol","lol","lol","lol","lol"]
+b: &b [*a,*a,*a,*a,*a,*a,*a,*a,*a]
+c: &c [*b,*b,*b,*b,*b,*b,*b,*b,*b]
+d: &d [*c,*c,*c,*c,*c,*c,*c,*c,*c]
+e: &e [*d,*d,*d,*d,*d,*d,*d,*d,*d]
+f: &f [*e,*e,*e,*e,*e,*e,*e,*e,*e]
+g: &g [*f,*f,*f,*f,*f,*f,*f,*f,*f]
+h: &h [*g,*g,*g,*g,*g,*g,*g,*g,*g]
+i: &i [*h,*h,*h,*h,*h,*h,*h,*h,*h]
+"""
+
+def nested_block(depth, indent):
+    # depth 层嵌套的映射，每层一个键
+    lines = []
+    for level in range(depth):
+        lines.append(" " * (indent + 2 * level) + f"level{level}:")
+    lines.append(" " * (indent + 2 * depth) + "leaf: 1")
+    return "\n".join(lines) + "\n"
+
+def items_document(deep_item_depth):
+    # 可拆分的文档: 多个顶层键，items 下多个条目，其中一个条目嵌套 deep_item_depth 层
+    content = "info:\n  namespace: demo\nitems:\n"
+    for i in range(4):
+        content += f"  item{i}:\n    material: PAPER\n"
+    content += "  deep:\n" + nested_block(deep_item_depth, 4)
+    content += "categories:\n  main:\n    name: Main\n"
+    return content
+
+class YAMLBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self._limits = yaml_loader.PARSE_LIMITS
+        configure_parse_limits(ParseLimits(max_depth=MAX_DEPTH))
+
+    def tearDown(self):
+        configure_parse_limits(self._limits)
+
+    def test_billion_laughs(self):
+        with self.assertRaises(YAMLBudgetError):
+            parse_yaml_text(BILLION_LAUGHS)
+        with self.assertRaises(YAMLBudgetError):
+            load_yaml_bytes(BILLION_LAUGHS.encode('utf-8'))
+
+    def test_depth_whole_document(self):
+        self.assertIn("level0", parse_yaml_text(nested_block(MAX_DEPTH - 2, 0)))
+        with self.assertRaises(YAMLBudgetError):
+            parse_yaml_text(nested_block(MAX_DEPTH + 1, 0))
+        with self.assertRaises(YAMLBudgetError):
+            parse_yaml_text(items_document(MAX_DEPTH))
+
+    def test_depth_split_document(self):
+        data = parse_split_yaml(items_document(4), workers=1)
+        self.assertEqual(list(data), ["info", "items", "categories"])
+        self.assertIn("deep", data["items"])
+        # 块在文档中的位置计入深度: 只看块本身不会超出限制
+        with self.assertRaises(YAMLBudgetError):
+            parse_split_yaml(items_document(MAX_DEPTH - 2), workers=1)
+
+    def test_check_nesting(self):
+        def groups(depth):
+            data = {"material": "PAPER"}
+            for level in range(depth):
+                data = {f"group{level}": data}
+            return data
+        NexoConverter.check_nesting(groups(MAX_DEPTH))
+        with self.assertRaises(YAMLBudgetError):
+            NexoConverter.check_nesting(groups(MAX_DEPTH + 2))
+        # 物品本身 (含 material / itemname) 的子映射不计为分组
+        NexoConverter.check_nesting({"sword": {"itemname": "x", **groups(MAX_DEPTH + 2)}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+fast_dump 与纯 Python 发射器 (IndentDumper / RecipeDumper) 的逐字节对比测试。
+运行: python -m unittest discover tests 或 python -m pytest tests
+"""
+import os
+import sys
+import random
+import unittest
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.converters.base import IndentDumper, RecipeDumper
+from src.utils import yaml_dumper
+from src.utils.yaml_dumper import fast_dump, LINE_WIDTH
+
+def reference_dump(data, dumper):
+    return yaml.dump(data, Dumper=dumper, sort_keys=False, allow_unicode=True, default_flow_style=False)
+
+LONG_WORDS = " ".join(f"word{i}" for i in range(40))
+
+# 固定用例: 名称 -> 数据
+CASES = {
+    "flat": {"info": {"namespace": "demo"}, "items": {"ruby": {"material": "PAPER", "generate": True}}},
+    "nested_sequences": {
+        "items": {"sword": {"lore": ["first", "second"],
+                            "layers": [["a", "b"], ["c", ["d", "e"]]],
+                            "stages": [{"name": "x", "tags": ["t1", "t2"]}, {"name": "y", "tags": []}]}}
+    },
+    "sequence_root": [{"a": [1, 2, {"b": ["c"]}]}, ["d", ["e"]], "f"],
+    "sequence_in_sequence_items": {"pattern": [["A", "B", "A"], [" ", "C", " "]], "after": 1},
+    "long_key": {"k" * 99: 1, "k" * 100: 2, "short": {"k" * 150: ["x"]}},
+    "long_values": {
+        "plain": LONG_WORDS,
+        "list": [LONG_WORDS, "short", LONG_WORDS + " tail"],
+        "nested": {"deeper": {"lore": [LONG_WORDS]}},
+        "unbreakable": "x" * 120,
+    },
+    "quoted_strings": {
+        "yes": "no", "null": "~", "number": "123", "float": "1.5", "colon": "a: b", "hash": "a #b",
+        "quote": "it's", "lead": " leading", "trail": "trailing ", "empty": "",
+        "flow": "{x}", "list": "[y]", "star": "*ref", "amp": "&anchor", "bang": "!tag",
+        "long_quoted": "it's " + LONG_WORDS,
+    },
+    # RecipeDumper 需要转义其中的双引号
+    "escaped_quotes": {"double": 'say "hi"', "long_double": 'say "hi" ' + LONG_WORDS},
+    "unicode": {"名称": "物品 名称", "lore": ["<gray>中文描述", "é accent"], "long": "中文 " * 40},
+    "non_bmp": {"emoji": "😀 smile"},
+    "scalars": {"int": 1, "neg": -3, "float": 1.5, "bool": False, "none": None, "big": 10 ** 20,
+                "inf": float('inf')},
+    "multiline": {"text": "line one\nline two"},
+    "recipe": {
+        "recipes": {"demo:ruby_block": {"type": "shaped", "pattern": ["AAA", "A A", "AAA"],
+                                        "ingredients": {"A": "demo:ruby"},
+                                        "result": {"id": "demo:ruby_block", "count": 1}}}
+    },
+}
+
+# 随机数据使用的字符串片段 (覆盖需要引号、转义和折行的情况)
+ATOMS = ["a", "word", "minecraft:stone", "ns:item/x", "-", "- x", "?", ":", "x: y", "#", "x #y", "'", '"',
+         "it's", 'say "hi"', "yes", "null", "~", "true", "123", "1.5", "", " ", "  lead", "trail ", "中文",
+         "物品 名称", "é", "😀", "<gray>", "&a", "*b", "!c", "%d", "@e", "|", "> g", "{h}", "[i]", ",",
+         "tab\tin", "back\\slash", "\x07", "2024-01-01", "<<"]
+
+def random_data(rng):
+    def text():
+        if rng.random() < 0.6:
+            return rng.choice(ATOMS)
+        parts = [rng.choice(ATOMS) for _ in range(rng.randint(1, 30))]
+        return " ".join(parts) if rng.random() < 0.8 else "".join(parts)
+
+    def value(depth):
+        k = rng.random()
+        if depth > 5 or k < 0.45:
+            return text() if rng.random() < 0.7 else rng.choice([1, -3, 0, 1.5, True, False, None])
+        if k < 0.7:
+            return {text(): value(depth + 1) for _ in range(rng.randint(0, 5))}
+        return [value(depth + 1) for _ in range(rng.randint(0, 5))]
+
+    if rng.random() < 0.85:
+        return {text(): value(1) for _ in range(rng.randint(1, 4))}
+    return [value(1) for _ in range(3)]
+
+@unittest.skipIf(yaml_dumper.CDumper is None, "libyaml is not available")
+class FastDumpTest(unittest.TestCase):
+    def setUp(self):
+        self._fast_dump = yaml_dumper.FAST_DUMP
+        yaml_dumper.FAST_DUMP = True
+
+    def tearDown(self):
+        yaml_dumper.FAST_DUMP = self._fast_dump
+
+    def assert_same(self, data, dumper):
+        text = fast_dump(data, quote_strings=dumper is RecipeDumper)
+        if text is not None:
+            self.assertEqual(text, reference_dump(data, dumper))
+        return text
+
+    def test_cases_match_reference(self):
+        for name, data in CASES.items():
+            for dumper in (IndentDumper, RecipeDumper):
+                with self.subTest(case=name, dumper=dumper.__name__):
+                    self.assert_same(data, dumper)
+
+    def test_fast_path_is_used(self):
+        # 这些用例必须走快速路径，否则上面的对比没有意义
+        for name in ("flat", "nested_sequences", "sequence_root", "sequence_in_sequence_items",
+                     "long_values", "quoted_strings", "unicode", "recipe"):
+            for dumper in (IndentDumper, RecipeDumper):
+                with self.subTest(case=name, dumper=dumper.__name__):
+                    self.assertIsNotNone(self.assert_same(CASES[name], dumper))
+
+    def test_rewrapped_lines(self):
+        # 超宽的值需要按纯 Python 发射器的规则折行 (_rewrap_line)，续行缩进与所在位置有关
+        for dumper in (IndentDumper, RecipeDumper):
+            text = self.assert_same(CASES["long_values"], dumper)
+            self.assertTrue(any(len(line) > LINE_WIDTH for line in text.split('\n')))
+            self.assertNotIn(LONG_WORDS, text)
+
+    def test_fallback_cases(self):
+        # 复杂键、多行字符串和 BMP 以外的字符交给纯 Python 发射器
+        for name in ("long_key", "multiline", "non_bmp"):
+            with self.subTest(case=name):
+                self.assertIsNone(fast_dump(CASES[name]))
+
+    def test_random_documents_match_reference(self):
+        rng = random.Random(20240601)
+        used = 0
+        for _ in range(1500):
+            data = random_data(rng)
+            for dumper in (IndentDumper, RecipeDumper):
+                if self.assert_same(data, dumper) is not None:
+                    used += 1
+        self.assertGreater(used, 250)
+
+if __name__ == '__main__':
+    unittest.main()
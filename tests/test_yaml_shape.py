@@ -0,0 +1,41 @@
+"""
+浅层扫描 (scan_yaml_shape) 与完整解析后描述 (describe_yaml_data) 的一致性测试。
+运行: python -m unittest discover tests 或 python -m pytest tests
+"""
+import os
+import sys
+import unittest
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.yaml_shape import scan_yaml_shape, describe_yaml_data, shape_roles
+from src.utils.document_store import classify_document
+
+# 固定用例: 名称 -> (文档, 用途)
+CASES = {
+    "items_mapping": ("info:\n  namespace: demo\nitems:\n  ruby:\n    behaviours:\n      furniture: {}\n",
+                      {"items"}),
+    "items_sequence": ("items:\n- a\n- b\ncategories:\n  main:\n    name: Main\nrecipes:\n  crafting_table: {}\n",
+                       {"categories", "recipes"}),
+    "items_empty": ("items:\ncategories:\n  main: {}\n", {"categories"}),
+    "items_scalar": ("items: 3\ninfo:\n  namespace: demo\n", set()),
+    "items_sequence_with_equipments": ("items: [a]\nequipments:\n  e: {}\n", {"items"}),
+}
+
+class YAMLShapeTest(unittest.TestCase):
+    def test_shallow_scan_matches_loaded_data(self):
+        for name, (content, roles) in CASES.items():
+            with self.subTest(case=name):
+                data = yaml.safe_load(content)
+                shape = describe_yaml_data(data)
+                self.assertEqual(scan_yaml_shape(content), shape)
+                self.assertEqual(shape_roles(shape), roles)
+                self.assertEqual(classify_document(data), roles)
+
+    def test_non_mapping_items_has_no_count(self):
+        shape = describe_yaml_data(yaml.safe_load(CASES["items_sequence"][0]))
+        self.assertIsNone(shape["item_count"])
+        self.assertNotIn("items", shape["top_keys"])
+
+if __name__ == '__main__':
+    unittest.main()
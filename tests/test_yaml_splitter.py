@@ -0,0 +1,135 @@
+"""
+按块解析 (parse_split_yaml) 与 yaml.safe_load 的对比测试。
+safe_load 能解析的文档，按块解析要么拒绝拆分 (ValueError)，要么得到相同的结果 (包括键顺序)。
+运行: python -m unittest discover tests 或 python -m pytest tests
+"""
+import os
+import sys
+import random
+import unittest
+import yaml
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils import yaml_splitter
+from src.utils.yaml_splitter import parse_split_yaml
+
+# 固定用例: 名称 -> 文档
+CASES = {
+    "quoted_across_items": 'a: 1\nb: "x\ny: z"\nc: 2\nitems:\n  k: "multi\n  k2: v"\n  j: 1\n',
+    "single_quoted_across_items": "items:\n  a: 'one\n  b: two'\n  c: 3\nend: 1\n",
+    "flow_at_column_0": "items:\n  r: {a: [1,\n2]}\n  s: 1\nrecipes:\n  r: {a: [1,\n2]}\nz: [3,\n4]\n",
+    "duplicate_top_keys": "items:\n  a: 1\nother: x\nitems:\n  b: 2\n",
+    "duplicate_item_keys": "items:\n  a: 1\n  b: 2\n  a: 3\n",
+    "quoted_continuation_at_column_0": "items:\n  a: 'one\ntwo: x'\n  b: 2\nend: 1\n",
+    "explicit_key_at_column_0": "items:\n  a: 1\n? 'long\n  key'\n: value\nend: 1\n",
+    "indented_root": "  a: 1\n  items:\n    b: 2\n",
+    "sequence_under_items": "key:\n- a\n- b\nitems:\n- x\n- y: 1\n  z: 2\nz: 1\n",
+    "indented_sequence_under_items": "items:\n  - a\n  - b\nz: 1\n",
+    "comment_only_items": "items:\n  # c\nother: 1\n",
+    "block_scalar": "items:\n    a:\n      b: 1\n    c: |\n      text\n\n      more\nend: 1\n",
+    "empty_flow_items": "x: 1\nitems: {}\n",
+    "anchors": "a: &x 1\nb: *x\n",
+    "sequence_root": "- a\n- b\n",
+}
+
+# 随机文档使用的字符串片段 (覆盖需要引号、折行和转义的情况)
+ATOMS = ["a", "word", "ns:item/x", "- x", "x: y", "#", "x #y", "'", '"', "it's", 'say "hi"', "yes", "~",
+         "123", "", " ", "  lead", "trail ", "中文", "{h}", "[i]", ",", "|", "> g", "line\nbreak", "tab\tin"]
+
+def random_document(rng):
+    def text():
+        return " ".join(rng.choice(ATOMS) for _ in range(rng.randint(1, 12)))
+
+    def value(depth):
+        k = rng.random()
+        if depth > 3 or k < 0.5:
+            return text() if rng.random() < 0.7 else rng.choice([1, 1.5, True, None])
+        if k < 0.8:
+            return {text(): value(depth + 1) for _ in range(rng.randint(0, 3))}
+        return [value(depth + 1) for _ in range(rng.randint(0, 3))]
+
+    data = {"info": {"namespace": "demo"}}
+    data["items"] = {f"item{i}": {"display_name": text(), "lore": [text(), text()], "extra": value(1)}
+                     for i in range(rng.randint(1, 12))}
+    data[text()] = value(1)
+    content = yaml.safe_dump(data, sort_keys=False, allow_unicode=True, width=rng.choice([20, 40, 80]),
+                             default_flow_style=rng.choice([False, None]),
+                             default_style=rng.choice([None, '"', "'"]))
+    # 在行之间插入第 0 列的注释、空行，或把某行挪到第 0 列 (可能使文档失效，由 safe_load 判定)
+    lines = content.split('\n')
+    for _ in range(rng.randint(0, 3)):
+        index = rng.randrange(len(lines))
+        k = rng.random()
+        if k < 0.4:
+            lines.insert(index, "# note")
+        elif k < 0.7:
+            lines.insert(index, "")
+        else:
+            lines[index] = lines[index].lstrip(' ')
+    return '\n'.join(lines)
+
+class SplitYAMLTest(unittest.TestCase):
+    def setUp(self):
+        # 减小每组的最小文本量，使小文档也分成多组解析，覆盖组边界
+        self._min_group_chars = yaml_splitter.MIN_GROUP_CHARS
+        yaml_splitter.MIN_GROUP_CHARS = 1
+
+    def tearDown(self):
+        yaml_splitter.MIN_GROUP_CHARS = self._min_group_chars
+
+    def assert_same_as_safe_load(self, content):
+        """:return: 是否按块解析了 (False 表示文档无法拆分)"""
+        expected = yaml.safe_load(content)
+        info = {}
+        try:
+            data = parse_split_yaml(content, info, workers=1)
+        except ValueError:
+            return False
+        self.assertEqual(data, expected)
+        self.assertEqual(list(data), list(expected))
+        if isinstance(data.get("items"), dict):
+            self.assertEqual(list(data["items"]), list(expected["items"]))
+        self.assertNotIn("chunk_errors", info)
+        return True
+
+    def test_cases_match_safe_load(self):
+        for name, content in CASES.items():
+            with self.subTest(case=name):
+                self.assert_same_as_safe_load(content)
+
+    def test_unsplittable_cases(self):
+        for name in ("indented_root", "anchors", "sequence_root", "explicit_key_at_column_0"):
+            with self.subTest(case=name):
+                self.assertFalse(self.assert_same_as_safe_load(CASES[name]))
+
+    def test_random_documents_match_safe_load(self):
+        rng = random.Random(20240715)
+        split = 0
+        for _ in range(400):
+            content = random_document(rng)
+            try:
+                yaml.safe_load(content)
+            except yaml.YAMLError:
+                continue
+            with self.subTest(content=content):
+                if self.assert_same_as_safe_load(content):
+                    split += 1
+        self.assertGreater(split, 200)
+
+    def test_broken_item_is_skipped(self):
+        # 整体解析失败时按块恢复: 只丢弃出错的条目，其余条目和后面的顶层键保留
+        items = "".join(f"  item_{i}:\n    display_name: Item {i}\n" for i in range(12))
+        content = "info:\n  namespace: demo\nitems:\n" + items + "recipes:\n  r: {a: 1}\n"
+        broken = content.replace("  item_7:\n    display_name: Item 7\n",
+                                 "  item_7:\n    display_name: \"Item 7\n    oops: [\n", 1)
+        with self.assertRaises(yaml.YAMLError):
+            yaml.safe_load(broken)
+        info = {}
+        data = parse_split_yaml(broken, info, workers=1)
+        expected = yaml.safe_load(content)
+        del expected["items"]["item_7"]
+        self.assertEqual(data, expected)
+        self.assertEqual([error["key"] for error in info["chunk_errors"]], ["item_7:"])
+
+if __name__ == '__main__':
+    unittest.main()
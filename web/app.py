@@ -1,11 +1,16 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Response, render_template, request, send_file, jsonify
 import os
 import shutil
 import zipfile
 import uuid
 import re
-from threading import Thread
+import json
+import hashlib
+import hmac
+from threading import Thread, Lock
 import time
+from urllib.parse import quote, unquote
+import multiprocessing
 import yaml
 
 # 导入核心逻辑
@@ -14,13 +19,54 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.converters.ia_to_ce import IAConverter
 from src.converters.nexo_to_ce import NexoConverter
-from src.analyzer import PackageAnalyzer
-from src.utils.yaml_loader import safe_load_yaml
+from src.converters.base import CONVERTER_VERSION
+from src.analyzer import PackageAnalyzer, ANALYZE_MODES
+from src.utils.document_store import DocumentStore
+from src.utils.yaml_loader import YAMLBudgetError
+from src.utils.source_fs import DirectorySource, ZipSource
+from src.utils.report_cache import ReportCache
+from src.utils.artifact_cache import ArtifactCache
+from src.utils.upload_spool import UploadSpool
+from src.utils.zip_extract import extract_pack
+from src.utils.zip_stream import iter_zip_directory
+from src.utils.output_sink import DirectorySink, MemorySink, ZipSink
+from src.utils.jobs import JobManager, JobError, DONE, FAILED
+from src.utils.session_janitor import SessionJanitor
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'temp_uploads')
 app.config['OUTPUT_FOLDER'] = os.path.join(os.getcwd(), 'temp_output')
+# 按上传内容哈希命名的解压目录 (CONVERT_SOURCE 为 directory 时使用)，内容相同的上传共用
+app.config['EXTRACT_FOLDER'] = os.path.join(os.getcwd(), 'temp_extracted')
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB 限制
+# 不超过该大小的上传只在内存中分析，需要保留时才写入磁盘
+app.config['UPLOAD_SPOOL_MB'] = 64
+# YAML 并行扫描的工作进程数，None 表示自动 (见 src/utils/parallel.py)
+app.config['SCAN_WORKERS'] = None
+# 分析报告缓存: 内存中保留的条目数，以及可选的磁盘存储目录 (重启后仍可命中)
+app.config['REPORT_CACHE_SIZE'] = 64
+app.config['REPORT_CACHE_DIR'] = os.environ.get("MCC_REPORT_CACHE_DIR")
+# 解压线程数，None 表示自动 (见 src/utils/zip_extract.py)
+app.config['EXTRACT_WORKERS'] = None
+# 转换输出方式: directory 写入 CraftEngine/ 目录 (下载时边压缩边发送)；
+# zip 直接写成压缩包；memory 先保存在内存中，转换结束后写成压缩包 (适合小型资源包)
+app.config['OUTPUT_SINK'] = 'directory'
+# 转换输入来源: zip 直接读取上传的压缩包 (不解压)；directory 先解压到会话目录再读取
+app.config['CONVERT_SOURCE'] = 'zip'
+# 同时进行的转换任务数，其余任务排队
+app.config['CONVERT_WORKERS'] = 2
+# 会话清理: 超过 SESSION_TTL_SECONDS 未使用的会话被删除；上传和输出目录总大小超过 DISK_QUOTA_MB 时
+# 淘汰最久未使用的会话 (None 表示不限制)；每 JANITOR_INTERVAL 秒检查一次
+app.config['SESSION_TTL_SECONDS'] = 6 * 3600
+app.config['DISK_QUOTA_MB'] = 2048
+app.config['JANITOR_INTERVAL'] = 300
+# 转换结果缓存: 相同压缩包以相同参数再次转换时直接返回已有结果；容量为 None 或 0 时不缓存
+app.config['ARTIFACT_CACHE_DIR'] = os.path.join(os.getcwd(), 'temp_artifacts')
+app.config['ARTIFACT_CACHE_MB'] = 1024
+# /api/admin/* 需要在 X-Admin-Token 头中提供 ADMIN_TOKEN；未设置令牌时默认禁用，
+# 只有显式设置 ADMIN_OPEN (环境变量 MCC_ADMIN_OPEN=1) 才允许不带令牌访问
+app.config['ADMIN_TOKEN'] = os.environ.get("MCC_ADMIN_TOKEN")
+app.config['ADMIN_OPEN'] = os.environ.get("MCC_ADMIN_OPEN") == "1"
 
 # 支持的插件列表
 SUPPORTED_PLUGINS = [
@@ -35,151 +81,548 @@ SUPPORTED_PLUGINS = [
 # 确保临时目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(app.config['EXTRACT_FOLDER'], exist_ok=True)
+
+# YAML 文档存储: 上传内容的 SHA-256 -> DocumentStore
+# 分析阶段解析过的文件在转换阶段直接复用，避免重复读取和解析；内容相同的上传共用 (只读)
+document_stores = {}
+document_stores_lock = Lock()
+# 延迟解压时防止同一内容被并发解压
+extract_lock = Lock()
+# 上传内容哈希 -> 分析报告，重复上传同一压缩包时直接返回
+report_cache = ReportCache(app.config['REPORT_CACHE_SIZE'], app.config['REPORT_CACHE_DIR'])
+# 转换结果缓存 (见 ARTIFACT_CACHE_DIR)，未启用时为 None
+artifact_cache = (ArtifactCache(app.config['ARTIFACT_CACHE_DIR'], app.config['ARTIFACT_CACHE_MB'])
+                  if app.config['ARTIFACT_CACHE_MB'] else None)
+# session_id -> 上传内容的 SHA-256，用于查找文档存储、解压目录和转换结果缓存
+session_digests = {}
+session_digests_lock = Lock()
+# 快速分析后在后台运行的完整分析: session_id -> {"state", "report", "error"}
+analysis_jobs = {}
+analysis_jobs_lock = Lock()
+# 转换任务在后台线程池中运行，/api/convert 只返回任务 ID
+conversion_jobs = JobManager(app.config['CONVERT_WORKERS'])
+# zip / memory 输出方式在任务输出目录中生成的压缩包
+OUTPUT_ARCHIVE = "output.zip"
+# 目录输出时记录转换结果缓存键的文件 (首次下载时写入缓存后删除)
+ARTIFACT_KEY_FILE = "artifact.key"
+
+def _session_busy(session_id):
+    # 有未结束的转换任务或后台分析的会话，以及未结束任务的输出目录 (以任务 ID 命名) 不能清理
+    if conversion_jobs.active(session_id) is not None:
+        return True
+    job = conversion_jobs.get(session_id)
+    if job is not None and not job.finished:
+        return True
+    with analysis_jobs_lock:
+        job = analysis_jobs.get(session_id)
+    return job is not None and job["state"] == "running"
+
+def _forget_session(session_id):
+    # 会话目录被清理后释放内存中的会话状态；文档存储在没有会话使用该内容后释放
+    with analysis_jobs_lock:
+        analysis_jobs.pop(session_id, None)
+    with session_digests_lock:
+        digest = session_digests.pop(session_id, None)
+        in_use = digest in session_digests.values()
+    if digest is not None and not in_use:
+        with document_stores_lock:
+            document_stores.pop(digest, None)
+
+quota_mb = app.config['DISK_QUOTA_MB']
+janitor = SessionJanitor([app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'], app.config['EXTRACT_FOLDER']],
+                         app.config['SESSION_TTL_SECONDS'],
+                         quota_mb * 1024 * 1024 if quota_mb is not None else None,
+                         is_busy=_session_busy, on_evict=_forget_session)
+
+def start_background_tasks():
+    """
+    启动后台清理线程。导入本模块时不启动 (进程池的工作进程也会导入它)，
+    由 __main__ 或以 WSGI 方式部署时的入口调用。
+    """
+    janitor.start(app.config['JANITOR_INTERVAL'])
+
+def _get_document_store(upload_digest, extract_dir):
+    with document_stores_lock:
+        store = document_stores.get(upload_digest)
+        if store is None or store.root != extract_dir:
+            store = DocumentStore(extract_dir)
+            document_stores[upload_digest] = store
+        return store
+
+def _extract_dir(upload_digest):
+    """
+    :return: 上传内容的解压目录。直接读取压缩包时只作为成员路径的根目录，不会被创建。
+             按内容哈希命名，分析和转换的文档存储以它为根 (见 _get_document_store)
+    """
+    return os.path.join(app.config['EXTRACT_FOLDER'], upload_digest)
+
+def _remember_digest(session_id, upload_digest):
+    with session_digests_lock:
+        session_digests[session_id] = upload_digest
+
+def _session_digest(session_id, session_upload_dir):
+    """
+    :return: 会话上传内容的 SHA-256；不在内存中时 (如服务重启后) 重新计算，会话不存在时返回 None
+    """
+    with session_digests_lock:
+        digest = session_digests.get(session_id)
+    if digest is not None:
+        return digest
+    archive = _session_archive(session_upload_dir)
+    if archive is None:
+        return None
+    sha = hashlib.sha256()
+    try:
+        with open(archive, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+    except OSError:
+        return None
+    digest = sha.hexdigest()
+    _remember_digest(session_id, digest)
+    return digest
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def _finalize_report(report, filename):
+    """补充前端需要的字段 (源格式、可用目标格式、警告等)。"""
+    # 根据检测到的格式确定可用的目标格式
+    # 逻辑：
+    # 1. 识别源格式 (可能包含多个)
+    # 2. 如果包含 ItemsAdder -> 允许转为 CraftEngine (除非已包含 CraftEngine)
+    # 3. 如果包含 CraftEngine -> 暂无转换 (或允许转为 ItemsAdder)
+    # 4. 如果包含 Nexo -> 暂无转换
+
+    detected_formats = report["formats"]
+    available_targets = []
+    warnings = []
+
+    if "ItemsAdder" in detected_formats:
+        if "CraftEngine" in detected_formats:
+            warnings.append("检测到包中已包含 CraftEngine 配置。转换可能会覆盖或产生冲突。")
+        if "CraftEngine" not in available_targets:
+            available_targets.append("CraftEngine")
+
+    if "Nexo" in detected_formats:
+        if "CraftEngine" in detected_formats:
+            warnings.append("检测到包中已包含 CraftEngine 配置。转换可能会覆盖或产生冲突。")
+        if "CraftEngine" not in available_targets:
+            available_targets.append("CraftEngine")
+
+    if "CraftEngine" in detected_formats:
+         # 未来支持 CE -> IA
+         pass
+
+    report["source_formats"] = detected_formats # 改名以反映复数
+    report["available_targets"] = available_targets
+    report["warnings"] = warnings
+    report["filename"] = filename
+    report["supported_plugins"] = SUPPORTED_PLUGINS
+    return report
+
+def _start_full_analysis(session_id, file_path, extract_dir, filename, upload_digest):
+    with analysis_jobs_lock:
+        analysis_jobs[session_id] = {"state": "running", "report": None, "error": None}
+    Thread(target=_run_full_analysis, args=(session_id, file_path, extract_dir, filename, upload_digest),
+           daemon=True).start()
+
+def _run_full_analysis(session_id, file_path, extract_dir, filename, upload_digest):
+    try:
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            analyzer = PackageAnalyzer(extract_dir, document_store=_get_document_store(upload_digest, extract_dir),
+                                       workers=app.config['SCAN_WORKERS'], zip_file=zip_ref)
+            report = _finalize_report(analyzer.analyze(), filename)
+        report_cache.set(upload_digest, report)
+        job = {"state": "done", "report": report, "error": None}
+    except Exception as e:
+        print(f"Background analysis of {session_id} failed: {e}")
+        job = {"state": "failed", "report": None, "error": str(e)}
+    with analysis_jobs_lock:
+        analysis_jobs[session_id] = job
+
+def _upload_request():
+    """
+    上传的两种形式: multipart 表单的 file 字段，或请求体直接是压缩包 (文件名在 X-Filename 头中，URL 编码)。
+    后者不经过表单解析，直接从 request.stream 读取。
+    :return: (文件名, 数据流)；请求中没有文件时返回 (None, None)
+    """
+    if request.mimetype == 'multipart/form-data':
+        file = request.files.get('file')
+        if file is None:
+            return None, None
+        return os.path.basename(file.filename or ''), file.stream
+    filename = request.headers.get('X-Filename')
+    if filename is None:
+        return None, None
+    return os.path.basename(unquote(filename)), request.stream
+
+def _request_option(name, default=None):
+    # 直接上传请求体时参数放在查询字符串中 (读取表单会消耗请求体)
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        return request.form.get(name, default)
+    return request.args.get(name, default)
+
+def _new_upload_session(filename):
+    """
+    新建上传会话。会话在接收上传期间受保护，调用方处理完请求后需调用 janitor.unpin(session_id)。
+    :return: (会话 ID, 会话上传目录, UploadSpool)
+    """
+    session_id = str(uuid.uuid4())
+    session_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
+    janitor.pin(session_id)
+    os.makedirs(session_upload_dir, exist_ok=True)
+    spool = UploadSpool(os.path.join(session_upload_dir, filename), app.config['UPLOAD_SPOOL_MB'] * 1024 * 1024)
+    return session_id, session_upload_dir, spool
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze():
-    if 'file' not in request.files:
+    filename, stream = _upload_request()
+    if filename is None:
         return jsonify({'error': '没有收到文件'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
+    if filename == '':
         return jsonify({'error': '未选择文件'}), 400
+    if not filename.endswith('.zip'):
+        return jsonify({'error': '请上传 .zip 文件'}), 400
 
-    if file:
-        session_id = str(uuid.uuid4())
-        session_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
-        os.makedirs(session_upload_dir, exist_ok=True)
+    mode = _request_option('mode', 'full')
+    if mode not in ANALYZE_MODES:
+        return jsonify({'error': f'不支持的分析模式: {mode}'}), 400
 
-        try:
-            filename = file.filename
-            file_path = os.path.join(session_upload_dir, filename)
-            file.save(file_path)
-
-            extract_dir = os.path.join(session_upload_dir, "extracted")
-            if filename.endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
-            else:
-                return jsonify({'error': '请上传 .zip 文件'}), 400
-
-            # 运行分析
-            analyzer = PackageAnalyzer(extract_dir)
-            report = analyzer.analyze()
-            
-            # 根据检测到的格式确定可用的目标格式
-            # 逻辑：
-            # 1. 识别源格式 (可能包含多个)
-            # 2. 如果包含 ItemsAdder -> 允许转为 CraftEngine (除非已包含 CraftEngine)
-            # 3. 如果包含 CraftEngine -> 暂无转换 (或允许转为 ItemsAdder)
-            # 4. 如果包含 Nexo -> 暂无转换
-            
-            detected_formats = report["formats"]
-            available_targets = []
-            warnings = []
-            
-            if "ItemsAdder" in detected_formats:
-                if "CraftEngine" in detected_formats:
-                    warnings.append("检测到包中已包含 CraftEngine 配置。转换可能会覆盖或产生冲突。")
-                if "CraftEngine" not in available_targets:
-                    available_targets.append("CraftEngine")
-            
-            if "Nexo" in detected_formats:
-                if "CraftEngine" in detected_formats:
-                    warnings.append("检测到包中已包含 CraftEngine 配置。转换可能会覆盖或产生冲突。")
-                if "CraftEngine" not in available_targets:
-                    available_targets.append("CraftEngine")
-                
-            if "CraftEngine" in detected_formats:
-                 # 未来支持 CE -> IA
-                 pass
+    session_id, session_upload_dir, spool = _new_upload_session(filename)
+    try:
+        # 接收时同时计算内容哈希，用于识别重复上传
+        upload_digest = spool.receive(stream)
+        extract_dir = _extract_dir(upload_digest)
 
-            report["source_formats"] = detected_formats # 改名以反映复数
-            report["available_targets"] = available_targets
-            report["warnings"] = warnings
+        cached = report_cache.get(upload_digest)
+        if cached is not None:
+            # 只复用报告和 (只读的) 解析结果；每次上传仍是独立的会话，转换需要本次上传的压缩包
+            spool.persist()
+            _remember_digest(session_id, upload_digest)
+            report = cached["report"]
             report["filename"] = filename
-            report["supported_plugins"] = SUPPORTED_PLUGINS
-            
             return jsonify({
                 'status': 'success',
                 'report': report,
-                'session_id': session_id
+                'session_id': session_id,
+                'cached': True
             })
 
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+        # 直接从压缩包目录分析 (较小的上传完全在内存中)，只读取 YAML 成员；解压推迟到转换时进行
+        # (解析结果保存在会话文档存储中供转换复用)
+        with spool.open() as archive, zipfile.ZipFile(archive, 'r') as zip_ref:
+            analyzer = PackageAnalyzer(extract_dir, document_store=_get_document_store(upload_digest, extract_dir),
+                                       workers=app.config['SCAN_WORKERS'], zip_file=zip_ref, mode=mode)
+            report = _finalize_report(analyzer.analyze(), filename)
+        # 转换时需要原始压缩包
+        file_path = spool.persist()
+        _remember_digest(session_id, upload_digest)
+
+        if mode == "quick":
+            # 快速结果只用于首屏，完整分析在后台继续，可通过 GET /api/analyze/<session_id> 获取
+            _start_full_analysis(session_id, file_path, extract_dir, filename, upload_digest)
+        else:
+            report_cache.set(upload_digest, report)
+        
+        return jsonify({
+            'status': 'success',
+            'report': report,
+            'session_id': session_id
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        janitor.unpin(session_id)
+
+@app.route('/api/analyze/<session_id>', methods=['GET'])
+def analyze_status(session_id):
+    """快速分析后在后台进行的完整分析的状态: running / done / failed。"""
+    with analysis_jobs_lock:
+        job = analysis_jobs.get(session_id)
+    if job is None:
+        return jsonify({'error': '没有进行中的分析'}), 404
+    return jsonify({'status': 'success', 'state': job["state"], 'report': job["report"], 'error': job["error"]})
 
 @app.route('/api/convert', methods=['POST'])
 def convert():
     # 支持两种模式：
     # 1. 传统的直接上传文件并转换 (保持兼容)
     # 2. 接受 session_id (从 /api/analyze 获取) 进行转换
+    # 转换在后台任务中进行，返回任务 ID，通过 GET /api/jobs/<job_id> 查询进度和下载地址
     
-    session_id = request.form.get('session_id')
-    target_format = request.form.get('target_format', 'CraftEngine') # 默认 CE
-    source_format = request.form.get('source_format') # 新增: 明确源格式
+    session_id = _request_option('session_id')
+    target_format = _request_option('target_format', 'CraftEngine') # 默认 CE
+    source_format = _request_option('source_format') # 新增: 明确源格式
+    namespace = _request_option('namespace')
+
+    if target_format != "CraftEngine":
+        return jsonify({'error': f'不支持的目标格式: {target_format}'}), 400
+    # 未指定或非 Nexo 时按 ItemsAdder 转换 (见 _run_conversion)
+    source_format = "Nexo" if source_format == "Nexo" else "ItemsAdder"
     
     if session_id:
-        # 使用已存在的会话
+        # 使用已存在的会话 (解压推迟到任务中进行)
         session_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
-        extract_dir = os.path.join(session_upload_dir, "extracted")
-        if not os.path.exists(extract_dir):
+        # 提交任务前保护会话不被清理，提交后由未结束的任务保护
+        janitor.pin(session_id)
+        if not os.path.isdir(session_upload_dir):
+            janitor.unpin(session_id)
             return jsonify({'error': '会话已过期或不存在'}), 400
-            
-        session_output_dir = os.path.join(app.config['OUTPUT_FOLDER'], session_id)
-        os.makedirs(session_output_dir, exist_ok=True)
+        upload_digest = _session_digest(session_id, session_upload_dir)
+        if upload_digest is None:
+            janitor.unpin(session_id)
+            return jsonify({'error': '会话已过期或不存在'}), 400
+        spool = None
         
-    elif 'file' in request.files:
+    else:
         # 传统模式
-        file = request.files['file']
-        if file.filename == '':
+        filename, stream = _upload_request()
+        if filename is None:
+            return jsonify({'error': '无效的请求'}), 400
+        if filename == '':
             return jsonify({'error': '未选择文件'}), 400
-            
-        session_id = str(uuid.uuid4())
-        session_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], session_id)
-        session_output_dir = os.path.join(app.config['OUTPUT_FOLDER'], session_id)
-        os.makedirs(session_upload_dir, exist_ok=True)
-        os.makedirs(session_output_dir, exist_ok=True)
-
-        filename = file.filename
-        file_path = os.path.join(session_upload_dir, filename)
-        file.save(file_path)
-
-        extract_dir = os.path.join(session_upload_dir, "extracted")
-        if filename.endswith('.zip'):
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-        else:
+        if not filename.endswith('.zip'):
             return jsonify({'error': '请上传 .zip 文件'}), 400
+            
+        session_id, session_upload_dir, spool = _new_upload_session(filename)
+        try:
+            upload_digest = spool.receive(stream)
+        except Exception:
+            janitor.unpin(session_id)
+            raise
+
+    try:
+        original_filename = filename[:-4] if spool is not None else _original_name(session_upload_dir)
+        cached_url = _cached_artifact_url(upload_digest, source_format, target_format, namespace, original_filename)
+        if cached_url is not None:
+            if spool is not None:
+                # 命中缓存时不需要保留本次上传
+                spool.discard()
+                shutil.rmtree(session_upload_dir, ignore_errors=True)
+                return jsonify({'status': 'success', 'download_url': cached_url, 'cached': True})
+            janitor.touch(session_id)
+            return jsonify({'status': 'success', 'download_url': cached_url, 'session_id': session_id,
+                            'cached': True})
+        if spool is not None:
+            spool.persist()
+            _remember_digest(session_id, upload_digest)
+        # 任务的输出目录各自独立，同一会话可以同时有多个转换
+        job = conversion_jobs.submit(_run_conversion, session_id, session_upload_dir,
+                                     source_format, target_format, namespace, upload_digest,
+                                     key=session_id)
+    finally:
+        janitor.unpin(session_id)
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'session_id': session_id
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """转换任务的状态: queued / running / done / failed，完成后 result 中包含 download_url。"""
+    job = conversion_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(dict(job.to_dict(), status='success'))
+
+# SSE 连接空闲时发送注释行的间隔 (秒)，避免代理断开连接
+SSE_KEEPALIVE_SECONDS = 15
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    以 Server-Sent Events 推送转换任务的事件: stage (进入新阶段)、progress (已处理 / 总项数)，
+    最后是 done 或 failed (包含 result / error 和各阶段耗时 timings)。
+    result.packaging 为 deferred 时压缩包在下载时才生成，timings 中的 packaging 不含打包耗时。
+    事件数据为 JSON，id 为事件序号；断线重连时按 Last-Event-ID 从下一个事件继续。
+    """
+    job = conversion_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    try:
+        start = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        start = 0
+
+    def stream():
+        after = max(start, 0)
+        while True:
+            events = job.wait_events(after, SSE_KEEPALIVE_SECONDS)
+            if not events:
+                if job.finished:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            after = events[-1]["seq"] + 1
+            if events[-1]["type"] in (DONE, FAILED):
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _run_conversion(job, session_id, session_upload_dir, source_format, target_format, namespace, upload_digest):
+    """
+    后台转换任务。
+    :param job: 当前任务，用于报告阶段
+    :param upload_digest: 上传内容的 SHA-256，用于查找共用的解析结果和解压目录；启用了转换结果缓存时将结果存入缓存
+    :return: {"download_url": ...}
+    :raises: JobError 输入无法转换时
+    """
+    # 共用的解压目录在转换期间不能被清理
+    janitor.pin(upload_digest)
+    try:
+        return _convert_session(job, session_id, session_upload_dir, source_format, target_format, namespace,
+                                upload_digest)
+    finally:
+        janitor.unpin(upload_digest)
+
+def _convert_session(job, session_id, session_upload_dir, source_format, target_format, namespace, upload_digest):
+    extract_dir = _extract_dir(upload_digest)
+    extraction = None
+    if app.config['CONVERT_SOURCE'] == 'directory':
+        job.set_stage("extracting")
+        extract_dir, extraction = _ensure_extracted(session_upload_dir, extract_dir)
+        if extract_dir is None:
+            raise JobError('会话已过期或不存在')
+        # 只遍历一次解压目录，之后的查找和遍历都查询内存索引
+        source = DirectorySource.from_directory(extract_dir)
     else:
-        return jsonify({'error': '无效的请求'}), 400
+        archive = _session_archive(session_upload_dir)
+        if archive is None:
+            raise JobError('会话已过期或不存在')
+        # 路径与解压到 extract_dir 后一致，与分析阶段的文档存储共用键
+        source = ZipSource.open_archive(archive, extract_dir)
+
+    # 每个任务有独立的输出目录，同一会话的多次转换互不影响
+    job_output_dir = os.path.join(app.config['OUTPUT_FOLDER'], job.id)
+    os.makedirs(job_output_dir, exist_ok=True)
+    # 需要移动源文件时 (重组资源包结构、重命名命名空间) 在工作目录中的副本上进行，
+    # 解压目录可能被其他会话共用，不能修改
+    work_dir = os.path.join(job_output_dir, "work")
 
+    job.set_stage("scanning")
+    document_store = _get_document_store(upload_digest, extract_dir)
+    output = _open_output_sink(job_output_dir)
     try:
-        if target_format == "CraftEngine":
-            if source_format == "Nexo":
-                return _convert_nexo_to_ce(extract_dir, session_output_dir, session_upload_dir, target_format)
-            else:
-                # 默认为 ItemsAdder 或显式指定
-                return _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, target_format)
-        
-        return jsonify({'error': f'不支持的目标格式: {target_format}'}), 400
+        if source_format == "Nexo":
+            _convert_nexo_to_ce(job, extract_dir, job_output_dir, output, namespace, document_store, source)
+        else:
+            # 默认为 ItemsAdder 或显式指定
+            _convert_ia_to_ce(job, extract_dir, job_output_dir, work_dir, output, namespace, document_store, source)
+        output.close()
+    except Exception:
+        # 不保留失败转换的部分输出
+        output.close()
+        shutil.rmtree(job_output_dir, ignore_errors=True)
+        raise
+    finally:
+        source.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+    job.set_stage("packaging")
+    if isinstance(output, MemorySink):
+        output.write_zip(os.path.join(job_output_dir, OUTPUT_ARCHIVE))
+    if artifact_cache is not None:
+        try:
+            _store_artifact(job_output_dir, output, upload_digest, source_format, target_format, namespace)
+        except OSError as e:
+            # 缓存失败不影响本次结果
+            print(f"Failed to cache conversion result: {e}")
+    result = {'download_url': _package_output(job.id, session_upload_dir, target_format)}
+    if isinstance(output, DirectorySink):
+        # 目录输出在下载时才边压缩边发送 (见 download_job_output)，packaging 阶段的耗时不含打包
+        result['packaging'] = 'deferred'
+    if extraction is not None:
+        result['extraction'] = extraction
+    janitor.touch(session_id)
+    janitor.touch(job.id)
+    janitor.touch(upload_digest)
+    return result
+
+def _open_output_sink(job_output_dir):
+    """
+    :return: 按 OUTPUT_SINK 配置创建的输出目标，根目录为任务输出目录
+    """
+    kind = app.config['OUTPUT_SINK']
+    if kind == 'zip':
+        return ZipSink(job_output_dir, os.path.join(job_output_dir, OUTPUT_ARCHIVE))
+    if kind == 'memory':
+        return MemorySink(job_output_dir)
+    return DirectorySink(job_output_dir)
+
+def _session_archive(session_upload_dir):
+    """:return: 会话上传的压缩包路径，会话不存在时返回 None"""
+    if not os.path.isdir(session_upload_dir):
+        return None
+    archives = [f for f in os.listdir(session_upload_dir) if f.endswith('.zip')]
+    if not archives:
+        return None
+    return os.path.join(session_upload_dir, archives[0])
 
-def _convert_nexo_to_ce(extract_dir, session_output_dir, session_upload_dir, target_format):
+def _ensure_extracted(session_upload_dir, extract_dir):
+    """
+    返回上传内容的解压目录。分析阶段不解压，首次转换时才解压上传的压缩包 (只解压转换需要的文件)。
+    解压目录按内容哈希命名 (见 _extract_dir)，内容相同的会话共用，转换不能修改其中的文件。
+    :param session_upload_dir: 会话上传目录
+    :param extract_dir: 解压目录
+    :return: (解压目录, 解压摘要)；已解压过时摘要为 None，会话不存在时解压目录为 None
+    """
+    if os.path.isdir(extract_dir):
+        return extract_dir, None
+    with extract_lock:
+        if os.path.isdir(extract_dir):
+            return extract_dir, None
+        archive = _session_archive(session_upload_dir)
+        if archive is None:
+            return None, None
+        # 先解压到会话目录下的临时目录 (受会话保护，不会被清理) 再移入，避免中断后留下不完整的解压目录
+        partial_dir = os.path.join(session_upload_dir, "extracting")
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        summary = extract_pack(archive, partial_dir, workers=app.config['EXTRACT_WORKERS'])
+        shutil.move(partial_dir, extract_dir)
+    print(f"Extracted {summary['extracted_files']} files ({summary['extracted_bytes']} bytes), "
+          f"skipped {summary['skipped_files']} files ({summary['skipped_bytes']} bytes)")
+    return extract_dir, summary
+
+def _load_config(document_store, config_path, source):
+    """
+    加载单个配置文件。无法解析或超出解析限制的文件只跳过该文件，不中断整个转换。
+    :return: 解析后的数据，失败时返回 None
+    """
+    try:
+        return document_store.load(config_path, source)
+    except (yaml.YAMLError, OSError) as e:
+        print(f"Skipping {config_path}: {e}")
+        return None
+
+def _load_nexo_config(document_store, config_path, source):
+    """
+    加载单个 Nexo 配置并检查物品分组的嵌套深度，超出解析限制的文件与无法解析的文件一样只跳过该文件。
+    :return: 解析后的数据，失败时返回 None
+    """
+    data = _load_config(document_store, config_path, source)
+    try:
+        NexoConverter.check_nesting(data)
+    except YAMLBudgetError as e:
+        print(f"Skipping {config_path}: {e}")
+        return None
+    return data
+
+def _convert_nexo_to_ce(job, extract_dir, job_output_dir, output, user_namespace, document_store, file_index):
     # 1. 扫描 Nexo 配置和资源
     nexo_items_configs = []
     nexo_resourcepack_path = None
     
     # 尝试找到 Nexo 根目录
     scan_root = extract_dir
-    for root, dirs, files in os.walk(extract_dir):
+    for root, dirs, files in file_index.walk(extract_dir):
         if "Nexo" in dirs:
             scan_root = os.path.join(root, "Nexo")
             break
@@ -188,7 +631,7 @@ def _convert_nexo_to_ce(extract_dir, session_output_dir, session_upload_dir, tar
              break
 
     # 扫描配置和资源
-    for root, dirs, files in os.walk(scan_root):
+    for root, dirs, files in file_index.walk(scan_root):
         # 资源包检测
         if "pack" in dirs and nexo_resourcepack_path is None:
              nexo_resourcepack_path = os.path.join(root, "pack")
@@ -204,36 +647,41 @@ def _convert_nexo_to_ce(extract_dir, session_output_dir, session_upload_dir, tar
                 nexo_items_configs.append(full_path)
 
     if not nexo_items_configs:
-         return jsonify({'error': '未能找到 Nexo 配置文件'}), 400
+         raise JobError('未能找到 Nexo 配置文件')
 
     # 2. 运行转换
-    # 准备命名空间
-    user_namespace = request.form.get('namespace')
-    
+    job.set_stage("parsing", len(nexo_items_configs))
     if user_namespace and re.match(r'^[0-9a-z_.-]+$', user_namespace):
         # 用户指定了命名空间，合并所有配置
         converter = NexoConverter()
+        converter.set_output(output)
+        converter.set_progress(job)
         merged_data = {}
         for config_path in nexo_items_configs:
-            data = safe_load_yaml(config_path)
+            data = _load_nexo_config(document_store, config_path, file_index)
+            job.advance()
             if isinstance(data, dict):
                  merged_data.update(data)
         
         namespace = user_namespace
-        ce_output_base = os.path.join(session_output_dir, "CraftEngine", "resources", namespace)
+        ce_output_base = os.path.join(job_output_dir, "CraftEngine", "resources", namespace)
         ce_config_dir = os.path.join(ce_output_base, "configuration", "items", namespace)
         ce_res_dir = os.path.join(ce_output_base, "resourcepack")
 
         if nexo_resourcepack_path:
-            converter.set_resource_paths(nexo_resourcepack_path, ce_res_dir)
+            converter.set_resource_paths(nexo_resourcepack_path, ce_res_dir, file_index)
 
         converter.convert(merged_data, namespace=namespace)
         converter.save_config(ce_config_dir)
         
     else:
         # 用户未指定命名空间，使用文件名作为命名空间
+        # 先加载全部配置 (解析结果本就缓存在文档存储中)，使解析阶段在转换之前完成
+        loaded_configs = []
         for config_path in nexo_items_configs:
-            data = safe_load_yaml(config_path)
+            loaded_configs.append((config_path, _load_nexo_config(document_store, config_path, file_index)))
+            job.advance()
+        for config_path, data in loaded_configs:
             if not isinstance(data, dict):
                 continue
             
@@ -245,20 +693,21 @@ def _convert_nexo_to_ce(extract_dir, session_output_dir, session_upload_dir, tar
             
             # 每个文件独立转换
             converter = NexoConverter()
+            converter.set_output(output)
+            converter.set_progress(job)
             
-            ce_output_base = os.path.join(session_output_dir, "CraftEngine", "resources", namespace)
+            ce_output_base = os.path.join(job_output_dir, "CraftEngine", "resources", namespace)
             ce_config_dir = os.path.join(ce_output_base, "configuration", "items", namespace)
             ce_res_dir = os.path.join(ce_output_base, "resourcepack")
 
             if nexo_resourcepack_path:
-                converter.set_resource_paths(nexo_resourcepack_path, ce_res_dir)
+                converter.set_resource_paths(nexo_resourcepack_path, ce_res_dir, file_index)
             
             converter.convert(data, namespace=namespace)
             converter.save_config(ce_config_dir)
 
-    return _package_and_respond(session_output_dir, session_upload_dir, target_format)
 
-def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, target_format):
+def _convert_ia_to_ce(job, extract_dir, job_output_dir, work_dir, output, user_namespace, document_store, file_index):
     # 3. 定位配置和资源 (ItemsAdder -> CraftEngine 逻辑)
     # 改进逻辑: 扫描所有 YAML 文件并根据内容进行分类
     ia_items_configs = []
@@ -269,7 +718,7 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
     # 0. 确定扫描根目录
     scan_root = extract_dir
     found_ia_dir = False
-    for root, dirs, files in os.walk(extract_dir):
+    for root, dirs, files in file_index.walk(extract_dir):
         for d in dirs:
             if d.lower() == "itemsadder":
                 scan_root = os.path.join(root, d)
@@ -282,7 +731,8 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
             print(f"Detected ItemsAdder root at: {scan_root}")
 
     # 第一遍扫描：查找配置文件和标准资源包结构
-    for root, dirs, files in os.walk(scan_root):
+    yaml_files = []
+    for root, dirs, files in file_index.walk(scan_root):
         # --- 资源包检测 ---
         # 优先级 1: 显式的 "resourcepack" 目录
         if "resourcepack" in dirs and ia_resourcepack_path is None:
@@ -299,23 +749,23 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
         # --- 配置文件检测 ---
         for f in files:
             if f.endswith(".yml") or f.endswith(".yaml"):
-                full_path = os.path.join(root, f)
-                try:
-                    print(f"Scanning: {full_path}")
-                    data = safe_load_yaml(full_path)
-                    if not data:
-                        continue
-                    
-                    # 检查关键签名
-                    if "items" in data or "equipments" in data or "armors_rendering" in data:
-                        ia_items_configs.append(full_path)
-                    if "categories" in data:
-                        ia_categories_configs.append(full_path)
-                    if "recipes" in data:
-                        ia_recipes_configs.append(full_path)
-                except Exception as e:
-                    print(f"Error loading {full_path}: {e}")
-                    continue
+                yaml_files.append(os.path.join(root, f))
+
+    # 分析阶段已分类的文件直接复用其分类结果，其余文件并行做浅层扫描
+    job.set_total(len(yaml_files))
+    classified = document_store.classify_many(yaml_files, app.config['SCAN_WORKERS'], file_index, progress=job)
+    for full_path, entry, error in classified:
+        print(f"Scanning: {full_path}")
+        if entry is None:
+            print(f"Error loading {full_path}: {error}")
+            continue
+        # 检查关键签名
+        if "items" in entry.roles:
+            ia_items_configs.append(full_path)
+        if "categories" in entry.roles:
+            ia_categories_configs.append(full_path)
+        if "recipes" in entry.roles:
+            ia_recipes_configs.append(full_path)
 
     # 如果仍未找到资源包，尝试寻找 textures/models 的父级 (处理非标准结构)
     if ia_resourcepack_path is None:
@@ -324,23 +774,27 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
             ia_resourcepack_path = extract_dir
 
     if not ia_items_configs:
-            return jsonify({'error': '未能找到包含物品定义的配置文件 (items/equipments)'}), 400
+            raise JobError('未能找到包含物品定义的配置文件 (items/equipments)')
 
     # 4. 运行转换
+    job.set_stage("parsing", len(ia_items_configs) + len(ia_categories_configs) + len(ia_recipes_configs))
     converter = IAConverter()
+    converter.set_output(output)
+    converter.set_progress(job)
     
     # 加载并合并所有物品配置
     merged_items_data = {"items": {}, "equipments": {}, "armors_rendering": {}, "templates": {}, "recipes": {}, "info": {}}
     
     for config_path in ia_items_configs:
-        data = converter.load_config(config_path)
+        data = _load_config(document_store, config_path, file_index)
+        job.advance()
         if not data: continue
         
         # 合并逻辑
         if "info" in data and not merged_items_data["info"]:
             merged_items_data["info"] = data["info"] # 使用找到的第一个 info
         
-        if "items" in data:
+        if isinstance(data.get("items"), dict):
             merged_items_data.setdefault("items", {}).update(data["items"])
             
         if "equipments" in data:
@@ -358,7 +812,8 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
     if ia_categories_configs:
         merged_categories = {}
         for cat_config in ia_categories_configs:
-            data = converter.load_config(cat_config)
+            data = _load_config(document_store, cat_config, file_index)
+            job.advance()
             if data and "categories" in data:
                 merged_categories.update(data["categories"])
         
@@ -368,7 +823,8 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
     if ia_recipes_configs:
         merged_recipes = {}
         for recipe_config in ia_recipes_configs:
-            data = converter.load_config(recipe_config)
+            data = _load_config(document_store, recipe_config, file_index)
+            job.advance()
             if not data:
                 continue
             if "info" in data and not ia_data.get("info"):
@@ -391,68 +847,79 @@ def _convert_ia_to_ce(extract_dir, session_output_dir, session_upload_dir, targe
     namespace = original_namespace
     
     # 检查用户是否指定了命名空间
-    user_namespace = request.form.get('namespace')
     if user_namespace:
         # 验证命名空间规则: 0-9, a-z, _, -, .
         if not re.match(r'^[0-9a-z_.-]+$', user_namespace):
-            return jsonify({'error': '命名空间包含非法字符。仅允许小写字母、数字、下划线、连字符和英文句号。'}), 400
+            raise JobError('命名空间包含非法字符。仅允许小写字母、数字、下划线、连字符和英文句号。')
         namespace = user_namespace
 
     # 特殊处理：如果资源包结构是非标准的（直接包含 models/textures），则重组为标准结构
     # 这通常发生在 ia_resourcepack_path 指向了包含 models/textures 的根目录，但缺少 assets/<namespace> 包装的情况
-    if ia_resourcepack_path and os.path.exists(ia_resourcepack_path):
+    if ia_resourcepack_path and file_index.exists(ia_resourcepack_path):
         # 检查标准结构是否存在
         assets_path = os.path.join(ia_resourcepack_path, "assets")
-        if not os.path.exists(assets_path):
+        if not file_index.exists(assets_path):
             # 检查是否有models 或 textures
-            has_models = os.path.exists(os.path.join(ia_resourcepack_path, "models"))
-            has_textures = os.path.exists(os.path.join(ia_resourcepack_path, "textures"))
+            has_models = file_index.exists(os.path.join(ia_resourcepack_path, "models"))
+            has_textures = file_index.exists(os.path.join(ia_resourcepack_path, "textures"))
             
             if has_models or has_textures:
                 print(f"检测到非标准资源包结构，正在重组为 assets/{namespace}/...")
-                # 创建一个新的临时目录作为资源包根目录，以避免污染原始提取目录或处理路径冲突
-                restructured_root = os.path.join(session_upload_dir, "restructured_rp")
+                # 在资源包的副本上移动，不修改解压目录
+                file_index = file_index.working_copy(ia_resourcepack_path, os.path.join(work_dir, "resourcepack"))
+                ia_resourcepack_path = file_index.root
+                # 创建一个新的临时目录作为资源包根目录，以避免处理路径冲突
+                restructured_root = os.path.join(work_dir, "restructured_rp")
                 target_ns_dir = os.path.join(restructured_root, "assets", namespace)
-                os.makedirs(target_ns_dir, exist_ok=True)
+                # 直接读取压缩包时只在索引中移动，不写磁盘
+                restructured_index = file_index.derive(restructured_root)
                 
                 # 移动文件夹
                 for folder_name in ["models", "textures", "sounds"]:
                     src_folder = os.path.join(ia_resourcepack_path, folder_name)
-                    if os.path.exists(src_folder):
+                    if file_index.exists(src_folder):
                         dst_folder = os.path.join(target_ns_dir, folder_name)
                         # 移动文件夹
-                        shutil.move(src_folder, dst_folder)
+                        file_index.rename(src_folder, dst_folder, restructured_index)
                 
                 # 更新资源包路径指向新的标准结构根目录
                 ia_resourcepack_path = restructured_root
+                file_index = restructured_index
         else:
             # 标准结构：如果命名空间改变，尝试重命名文件夹以匹配新的命名空间
             if namespace != original_namespace:
                 src_ns_path = os.path.join(assets_path, original_namespace)
                 dst_ns_path = os.path.join(assets_path, namespace)
-                if os.path.exists(src_ns_path) and not os.path.exists(dst_ns_path):
+                if file_index.exists(src_ns_path) and not file_index.exists(dst_ns_path):
                     try:
                         print(f"Renaming resource pack namespace: {original_namespace} -> {namespace}")
-                        shutil.move(src_ns_path, dst_ns_path)
+                        # 在资源包的副本上重命名，不修改解压目录
+                        rp_copy = file_index.working_copy(ia_resourcepack_path, os.path.join(work_dir, "resourcepack"))
+                        rp_copy.rename(os.path.join(rp_copy.root, "assets", original_namespace),
+                                       os.path.join(rp_copy.root, "assets", namespace))
+                        file_index = rp_copy
+                        ia_resourcepack_path = rp_copy.root
                     except Exception as e:
                         print(f"Warning: Failed to rename namespace folder: {e}")
     
-    ce_output_base = os.path.join(session_output_dir, "CraftEngine", "resources", namespace)
+    ce_output_base = os.path.join(job_output_dir, "CraftEngine", "resources", namespace)
     ce_config_dir = os.path.join(ce_output_base, "configuration", "items", namespace)
     ce_res_dir = os.path.join(ce_output_base, "resourcepack")
     
     # 如果找到 resourcepack 则设置资源路径
     if ia_resourcepack_path:
-        converter.set_resource_paths(ia_resourcepack_path, ce_res_dir)
+        converter.set_resource_paths(ia_resourcepack_path, ce_res_dir, file_index)
 
     converter.convert(ia_data, namespace=namespace)
     
     converter.save_config(ce_config_dir)
 
-    return _package_and_respond(session_output_dir, session_upload_dir, target_format)
 
-def _package_and_respond(session_output_dir, session_upload_dir, target_format):
-    # 5. 压缩结果
+def _clean_filename(filename):
+    # 简单的文件名清理，防止非法字符
+    return re.sub(r'[\\/*?:"<>|]', "", filename)
+
+def _original_name(session_upload_dir):
     # 获取原始文件名 
     original_filename = "converted"
     try:
@@ -462,29 +929,151 @@ def _package_and_respond(session_output_dir, session_upload_dir, target_format):
                 break
     except:
         pass
+    return original_filename
 
-    output_filename = f"{original_filename} [{target_format} by MCC].zip"
-    # 简单的文件名清理，防止非法字符
-    output_filename = re.sub(r'[\\/*?:"<>|]', "", output_filename)
-    
-    output_zip_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-    # 我们希望压缩包解压后直接是 resources 文件夹，或者 CraftEngine 文件夹
+def _output_filename(original_filename, target_format):
+    return _clean_filename(f"{original_filename} [{target_format} by MCC].zip")
 
-    shutil.make_archive(output_zip_path[:-4], 'zip', session_output_dir, "CraftEngine")
+def _package_output(job_id, session_upload_dir, target_format):
+    """
+    结果不再预先打包: 下载时从任务输出目录边压缩边发送 (见 download_job_output)。
+    :return: 下载地址
+    """
+    # 5. 压缩结果
+    output_filename = _output_filename(_original_name(session_upload_dir), target_format)
+    return f'/api/download/{job_id}/{quote(output_filename)}'
 
-    # 清理会话文件 
-    # shutil.rmtree(session_upload_dir)
-    # shutil.rmtree(session_output_dir)
+def _artifact_key(upload_digest, source_format, target_format, namespace):
+    return ArtifactCache.key(upload_digest, source_format, target_format, namespace, CONVERTER_VERSION)
 
-    return jsonify({
-        'status': 'success',
-        'download_url': f'/api/download/{output_filename}'
-    })
+def _cached_artifact_url(upload_digest, source_format, target_format, namespace, original_filename):
+    """:return: 已缓存的转换结果的下载地址，未命中或未启用缓存时返回 None"""
+    if artifact_cache is None or upload_digest is None:
+        return None
+    key = _artifact_key(upload_digest, source_format, target_format, namespace)
+    if artifact_cache.get(key) is None:
+        return None
+    return f'/api/artifacts/{key}/{quote(_output_filename(original_filename, target_format))}'
+
+def _store_artifact(job_output_dir, output, upload_digest, source_format, target_format, namespace):
+    """
+    将转换结果存入转换结果缓存。已生成压缩包时 (zip / memory 输出) 以硬链接存入，不再复制一份；
+    目录输出不在这里打包，只记下缓存键，首次下载时把边压缩边发送的数据同时写入缓存 (见 _iter_caching)。
+    """
+    key = _artifact_key(upload_digest, source_format, target_format, namespace)
+    archive_path = os.path.join(job_output_dir, OUTPUT_ARCHIVE)
+    if isinstance(output, DirectorySink):
+        with open(os.path.join(job_output_dir, ARTIFACT_KEY_FILE), 'w', encoding='utf-8') as f:
+            f.write(key)
+    elif os.path.isfile(archive_path):
+        artifact_cache.put(key, archive_path, link=True)
+
+@app.route('/api/artifacts/<key>/<filename>')
+def download_artifact(key, filename):
+    """发送缓存的转换结果 (见 ArtifactCache)。"""
+    path = artifact_cache.get(key) if artifact_cache is not None and re.fullmatch(r'[0-9a-f]{64}', key) else None
+    if path is None:
+        return jsonify({'error': '转换结果不存在或已过期'}), 404
+    return send_file(path, mimetype='application/zip', as_attachment=True, download_name=_clean_filename(filename))
 
 @app.route('/api/download/<filename>')
 def download_file(filename):
     return send_file(os.path.join(app.config['OUTPUT_FOLDER'], filename), as_attachment=True)
 
+@app.route('/api/download/<job_id>/<filename>')
+def download_job_output(job_id, filename):
+    """
+    以分块传输发送任务输出目录的压缩包，压缩包在发送过程中生成，不写入磁盘。
+    输出方式为 zip / memory 时直接发送已生成的压缩包。
+    压缩包解压后直接是 CraftEngine 文件夹。
+    """
+    job_output_dir = os.path.join(app.config['OUTPUT_FOLDER'], job_id)
+    if job_id in ('.', '..') or os.path.basename(job_id) != job_id or not os.path.isdir(job_output_dir):
+        return jsonify({'error': '转换结果不存在或已过期'}), 404
+    job = conversion_jobs.get(job_id)
+    if job is not None and not job.finished:
+        return jsonify({'error': '该任务正在转换中'}), 409
+    janitor.touch(job_id)
+    filename = _clean_filename(filename)
+    try:
+        filename.encode('ascii')
+        disposition = f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        disposition = f"attachment; filename*=UTF-8''{quote(filename)}"
+    if not os.path.isdir(os.path.join(job_output_dir, "CraftEngine")):
+        archive_path = os.path.join(job_output_dir, OUTPUT_ARCHIVE)
+        if os.path.isfile(archive_path):
+            return send_file(archive_path, mimetype='application/zip', as_attachment=True, download_name=filename)
+    chunks = iter_zip_directory(job_output_dir, "CraftEngine")
+    if artifact_cache is not None and os.path.isfile(os.path.join(job_output_dir, ARTIFACT_KEY_FILE)):
+        chunks = _iter_caching(job_output_dir, chunks)
+    return Response(_iter_pinned(job_id, chunks),
+                    mimetype='application/zip', headers={'Content-Disposition': disposition})
+
+def _iter_caching(job_output_dir, chunks):
+    """
+    发送的同时把压缩包写入临时文件，完整发送后移入转换结果缓存 (见 _store_artifact)。
+    下载中断时丢弃临时文件，下次下载再缓存。
+    """
+    key_path = os.path.join(job_output_dir, ARTIFACT_KEY_FILE)
+    try:
+        with open(key_path, encoding='utf-8') as f:
+            key = f.read().strip()
+    except OSError:
+        yield from chunks
+        return
+    tmp_path = os.path.join(job_output_dir, f"artifact.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        if artifact_cache.put(key, tmp_path, move=True) is not None:
+            os.remove(key_path)
+    except OSError as e:
+        # 缓存失败不影响本次下载
+        print(f"Failed to cache conversion result: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _iter_pinned(job_id, chunks):
+    # 发送过程中保护任务输出不被清理
+    janitor.pin(job_id)
+    started = time.time()
+    try:
+        yield from chunks
+        # 目录输出的打包耗时 (含发送) 在这里才能测得，任务的 timings 中不包含
+        print(f"Job {job_id} archive streamed in {(time.time() - started) * 1000:.1f} ms")
+    finally:
+        janitor.unpin(job_id)
+
+def _admin_allowed():
+    token = app.config['ADMIN_TOKEN']
+    if token:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+    return app.config['ADMIN_OPEN']
+
+@app.route('/api/admin/usage', methods=['GET'])
+def admin_usage():
+    """
+    临时目录的磁盘占用: 各会话的大小、最近使用时间和是否正在使用，以及最近一次清理的摘要。
+    ?sweep=1 时先执行一次清理。
+    """
+    if not _admin_allowed():
+        return jsonify({'error': '无权访问'}), 403
+    if request.args.get('sweep') == '1':
+        janitor.sweep()
+    sessions = janitor.usage()
+    return jsonify({
+        'status': 'success',
+        'total_bytes': sum(s["bytes"] for s in sessions),
+        'quota_bytes': janitor.quota_bytes,
+        'ttl_seconds': janitor.ttl_seconds,
+        'sessions': sessions,
+        'last_sweep': janitor.last_sweep
+    })
+
 import webbrowser
 from threading import Timer, Lock
 
@@ -528,6 +1117,9 @@ def check_heartbeat():
             os._exit(0)
 
 if __name__ == '__main__':
+    # PyInstaller 打包后使用进程池时必需
+    multiprocessing.freeze_support()
+    start_background_tasks()
     # 仅在非调试模式下打开浏览器 (重载会导致双重打开)
     # 但对于打包的应用，调试通常为 False 或不相关。
     if not os.environ.get("WERKZEUG_RUN_MAIN"):
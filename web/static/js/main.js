@@ -47,11 +47,12 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function uploadFile(file) {
-        const formData = new FormData();
-        formData.append('file', file);
-
         const xhr = new XMLHttpRequest();
-        xhr.open('POST', '/api/analyze', true);
+        // 首屏只需要格式和大致数量，完整分析由后端在后台继续
+        xhr.open('POST', '/api/analyze?mode=quick', true);
+        // 请求体直接是压缩包 (不使用 multipart)，服务端边接收边计算哈希
+        xhr.setRequestHeader('Content-Type', 'application/zip');
+        xhr.setRequestHeader('X-Filename', encodeURIComponent(file.name));
 
         xhr.upload.onprogress = (e) => {
             if (e.lengthComputable) {
@@ -79,7 +80,7 @@ document.addEventListener('DOMContentLoaded', () => {
             showError("发生网络错误。");
         };
 
-        xhr.send(formData);
+        xhr.send(file);
     }
 
     function startConversion(sessionId) {
@@ -116,47 +117,132 @@ document.addEventListener('DOMContentLoaded', () => {
         xhr.open('POST', '/api/convert', true);
         
         xhr.onload = function() {
-            if (xhr.status === 200) {
+            let response = {};
+            try {
+                response = JSON.parse(xhr.responseText);
+            } catch(e) {}
+            // 202: 任务已创建
+            if (xhr.status === 202 && response.job_id) {
+                localStorage.setItem(JOB_STORAGE_KEY, response.job_id);
+                watchJob(response.job_id);
+            } else if (xhr.status === 200 && response.download_url) {
+                // 相同的压缩包和参数已转换过，直接返回缓存的结果
                 updateProgress(100, "转换完成");
-                const response = JSON.parse(xhr.responseText);
                 showResult(response.download_url);
             } else {
-                let errorMsg = "转换失败。";
-                try {
-                    const response = JSON.parse(xhr.responseText);
-                    errorMsg = response.error || errorMsg;
-                } catch(e) {}
-                showError(errorMsg);
+                showError(response.error || "转换失败。");
             }
         };
-        
-        let p = 0;
-        const interval = setInterval(() => {
-            if(xhr.readyState === 4) {
-                clearInterval(interval);
-                return;
-            }
-            if(p < 90) {
-                p += 5;
-                updateProgress(p, "正在转换...");
-            }
-        }, 200);
+
+        xhr.onerror = function() {
+            showError("发生网络错误。");
+        };
         
         xhr.send(formData);
     }
 
+    // 转换任务 ID 保存在 localStorage 中，刷新页面后继续跟踪
+    const JOB_STORAGE_KEY = 'mcc-convert-job';
+    // 阶段 -> [进度条起点, 终点, 提示文字]，阶段内按 已处理 / 总数 在两者之间推进
+    const JOB_STAGES = {
+        extracting: [5, 15, "正在解压"],
+        scanning: [15, 25, "正在扫描配置"],
+        parsing: [25, 35, "正在解析配置"],
+        converting_items: [35, 50, "正在转换物品"],
+        converting_categories: [50, 55, "正在转换分类"],
+        converting_recipes: [55, 60, "正在转换配方"],
+        writing: [60, 65, "正在写入配置"],
+        migrating_textures: [65, 80, "正在迁移贴图"],
+        migrating_models: [80, 92, "正在迁移模型"],
+        packaging: [92, 99, "正在打包"]
+    };
+
+    function showJobProgress(job) {
+        const stage = JOB_STAGES[job.stage];
+        if (!stage) {
+            updateProgress(5, "正在排队...");
+            return;
+        }
+        let percent = stage[0];
+        let text = stage[2];
+        if (job.total) {
+            percent += (stage[1] - stage[0]) * Math.min(job.processed / job.total, 1);
+            text += ` (${job.processed}/${job.total})`;
+        } else if (job.processed) {
+            text += ` (${job.processed})`;
+        }
+        updateProgress(Math.round(percent), text + "...");
+    }
+
+    function finishJob(job) {
+        localStorage.removeItem(JOB_STORAGE_KEY);
+        if (job.state === 'done') {
+            updateProgress(100, "转换完成");
+            showResult(job.result.download_url);
+        } else {
+            showError(job.error || "转换失败。");
+        }
+    }
+
+    // 通过 SSE 接收任务进度，不支持或连接失败时退回轮询
+    function watchJob(jobId) {
+        if (!window.EventSource) {
+            pollJob(jobId);
+            return;
+        }
+        const source = new EventSource(`/api/jobs/${jobId}/events`);
+        const onProgress = e => showJobProgress(JSON.parse(e.data));
+        source.addEventListener('stage', onProgress);
+        source.addEventListener('progress', onProgress);
+        ['done', 'failed'].forEach(type => source.addEventListener(type, e => {
+            source.close();
+            const event = JSON.parse(e.data);
+            finishJob({state: type, result: event.result, error: event.error});
+        }));
+        source.onerror = () => {
+            // 任务已过期或服务器重启时由轮询给出提示
+            source.close();
+            pollJob(jobId);
+        };
+    }
+
+    function pollJob(jobId) {
+        fetch(`/api/jobs/${jobId}`)
+            .then(r => {
+                if (r.status === 404) {
+                    // 任务已过期 (或服务器已重启)
+                    localStorage.removeItem(JOB_STORAGE_KEY);
+                    showError("转换任务不存在或已过期，请重新上传。");
+                    return null;
+                }
+                return r.json();
+            })
+            .then(job => {
+                if (!job) return;
+                if (job.state === 'done' || job.state === 'failed') {
+                    finishJob(job);
+                } else {
+                    showJobProgress(job);
+                    setTimeout(() => pollJob(jobId), 1000);
+                }
+            })
+            .catch(() => {
+                setTimeout(() => pollJob(jobId), 2000);
+            });
+    }
+
+    const pendingJob = localStorage.getItem(JOB_STORAGE_KEY);
+    if (pendingJob) {
+        dropZone.style.display = 'none';
+        progressSection.style.display = 'block';
+        updateProgress(5, "正在恢复转换任务...");
+        watchJob(pendingJob);
+    }
+
     function showAnalysisReport(report, sessionId) {
         progressSection.style.display = 'none';
         
-        // 支持的插件列表 (后端未返回时使用默认值)
-        const supportedPlugins = report.supported_plugins || [
-            {id: "ItemsAdder", name: "ItemsAdder", icon: "📦"},
-            {id: "Nexo", name: "Nexo", icon: "🧩"},
-            {id: "Oraxen", name: "Oraxen", icon: "💎"},
-            {id: "CraftEngine", name: "CraftEngine", icon: "⚙️"},
-            {id: "MythicCrucible", name: "MythicCrucible", icon: "⚔️"},
-            {id: "HMCCosmetics", name: "HMCCosmetics", icon: "👒"}
-        ];
+        const plugins = supportedPlugins(report);
 
         // 默认选择
         let selectedSource = report.source_formats[0] || null;
@@ -166,45 +252,6 @@ document.addEventListener('DOMContentLoaded', () => {
              selectedTarget = report.available_targets[0];
         }
 
-        // 生成插件网格 HTML
-        function generatePluginGrid(isSource) {
-            return supportedPlugins.map(p => {
-                let isSelectable = false;
-                let isSelected = false;
-
-                if (isSource) {
-                    // 源插件：必须在检测到的格式中
-                    if (report.source_formats.includes(p.id)) {
-                        isSelectable = true;
-                        if (p.id === selectedSource) isSelected = true;
-                    }
-                } else {
-                    // 目标插件：必须不在检测到的格式中 (Constraint 3) 且在可用目标中
-                    if (!report.source_formats.includes(p.id)) {
-                        if (report.available_targets.includes(p.id)) {
-                            isSelectable = true;
-                            if (p.id === selectedTarget) isSelected = true;
-                        }
-                        // 也可以显示为禁用状态，如果不满足条件
-                    }
-                }
-
-                const classes = `plugin-card ${isSelectable ? 'selectable' : ''} ${isSelected ? 'selected' : ''}`;
-                
-                // 判断是 emoji 还是图片路径
-                const iconContent = (p.icon.includes('/') || p.icon.includes('.')) 
-                    ? `<img src="${p.icon}" alt="${p.name}">`
-                    : p.icon;
-
-                return `
-                    <div class="${classes}" data-id="${p.id}">
-                        <div class="plugin-icon">${iconContent}</div>
-                        <div class="plugin-name">${p.name}</div>
-                    </div>
-                `;
-            }).join('');
-        }
-
         // 生成警告信息
         let warningHtml = '';
         if (report.warnings && report.warnings.length > 0) {
@@ -224,14 +271,14 @@ document.addEventListener('DOMContentLoaded', () => {
                     <div class="plugin-column">
                         <h4>源插件</h4>
                         <div class="plugin-grid" id="source-plugins-grid">
-                            ${generatePluginGrid(true)}
+                            ${renderPluginGrid(report, plugins, true, selectedSource)}
                         </div>
                     </div>
                     <div class="arrow-separator">➜</div>
                     <div class="plugin-column">
                         <h4>目标插件</h4>
                         <div class="plugin-grid" id="target-plugins-grid">
-                            ${generatePluginGrid(false)}
+                            ${renderPluginGrid(report, plugins, false, selectedTarget)}
                         </div>
                     </div>
                 </div>
@@ -251,23 +298,15 @@ document.addEventListener('DOMContentLoaded', () => {
                     </div>
                     <div class="report-item">
                         <span class="label">包含内容:</span>
-                        <span class="value">${report.content_types.join(', ') || '无'}</span>
+                        <span class="value" id="report-content-types">${renderContentTypes(report)}</span>
                     </div>
                     <div class="report-item">
                         <span class="label">完整性检查:</span>
-                        <ul class="check-list">
-                            <li class="${report.completeness.items_config ? 'ok' : 'fail'}">物品配置</li>
-                            <li class="${report.completeness.categories_config ? 'ok' : 'fail'}">分类配置</li>
-                            <li class="${report.completeness.resource_files ? 'ok' : 'fail'}">资源文件</li>
-                        </ul>
+                        <ul class="check-list" id="report-completeness">${renderCompleteness(report)}</ul>
                     </div>
                     <div class="report-item">
                         <span class="label">详细统计:</span>
-                        <ul class="stats-list">
-                            <li>物品: ${report.details.item_count}</li>
-                            <li>纹理: ${report.details.texture_count}</li>
-                            <li>模型: ${report.details.model_count}</li>
-                        </ul>
+                        <ul class="stats-list" id="report-stats">${renderStats(report)}</ul>
                     </div>
                 </div>
                 <div class="actions">
@@ -309,6 +348,124 @@ document.addEventListener('DOMContentLoaded', () => {
         });
         
         document.getElementById('start-convert-btn').onclick = () => startConversion(sessionId);
+
+        if (report.exact === false) {
+            pollFullReport(sessionId);
+        }
+    }
+
+    function supportedPlugins(report) {
+        // 支持的插件列表 (后端未返回时使用默认值)
+        return report.supported_plugins || [
+            {id: "ItemsAdder", name: "ItemsAdder", icon: "📦"},
+            {id: "Nexo", name: "Nexo", icon: "🧩"},
+            {id: "Oraxen", name: "Oraxen", icon: "💎"},
+            {id: "CraftEngine", name: "CraftEngine", icon: "⚙️"},
+            {id: "MythicCrucible", name: "MythicCrucible", icon: "⚔️"},
+            {id: "HMCCosmetics", name: "HMCCosmetics", icon: "👒"}
+        ];
+    }
+
+    // 生成插件网格 HTML
+    function renderPluginGrid(report, plugins, isSource, selectedId) {
+        return plugins.map(p => {
+            let isSelectable = false;
+            let isSelected = false;
+
+            if (isSource) {
+                // 源插件：必须在检测到的格式中
+                if (report.source_formats.includes(p.id)) {
+                    isSelectable = true;
+                    if (p.id === selectedId) isSelected = true;
+                }
+            } else {
+                // 目标插件：必须不在检测到的格式中 (Constraint 3) 且在可用目标中
+                if (!report.source_formats.includes(p.id)) {
+                    if (report.available_targets.includes(p.id)) {
+                        isSelectable = true;
+                        if (p.id === selectedId) isSelected = true;
+                    }
+                    // 也可以显示为禁用状态，如果不满足条件
+                }
+            }
+
+            const classes = `plugin-card ${isSelectable ? 'selectable' : ''} ${isSelected ? 'selected' : ''}`;
+            
+            // 判断是 emoji 还是图片路径
+            const iconContent = (p.icon.includes('/') || p.icon.includes('.')) 
+                ? `<img src="${p.icon}" alt="${p.name}">`
+                : p.icon;
+
+            return `
+                <div class="${classes}" data-id="${p.id}">
+                    <div class="plugin-icon">${iconContent}</div>
+                    <div class="plugin-name">${p.name}</div>
+                </div>
+            `;
+        }).join('');
+    }
+
+    function renderContentTypes(report) {
+        return report.content_types.join(', ') || '无';
+    }
+
+    function renderCompleteness(report) {
+        return `
+            <li class="${report.completeness.items_config ? 'ok' : 'fail'}">物品配置</li>
+            <li class="${report.completeness.categories_config ? 'ok' : 'fail'}">分类配置</li>
+            <li class="${report.completeness.resource_files ? 'ok' : 'fail'}">资源文件</li>
+        `;
+    }
+
+    function renderStats(report) {
+        // 快速分析的物品数为估计值
+        const approx = report.exact === false ? '≈ ' : '';
+        return `
+            <li>物品: ${approx}${report.details.item_count}</li>
+            <li>纹理: ${report.details.texture_count}</li>
+            <li>模型: ${report.details.model_count}</li>
+        `;
+    }
+
+    function pollFullReport(sessionId) {
+        // 后台完整分析结束后，用精确结果替换首屏的估计值 (不重新渲染整个报告，仍可选的选择保持不变)
+        fetch(`/api/analyze/${sessionId}`)
+            .then(r => r.json())
+            .then(data => {
+                if (data.state === 'running') {
+                    setTimeout(() => pollFullReport(sessionId), 1000);
+                    return;
+                }
+                if (data.state !== 'done' || !data.report) return;
+                const contentTypes = document.getElementById('report-content-types');
+                if (!contentTypes) return;
+                contentTypes.textContent = renderContentTypes(data.report);
+                document.getElementById('report-completeness').innerHTML = renderCompleteness(data.report);
+                document.getElementById('report-stats').innerHTML = renderStats(data.report);
+                renderFormatChoices(data.report);
+            })
+            .catch(() => {
+                console.log("Failed to fetch full analysis report.");
+            });
+    }
+
+    function renderFormatChoices(report) {
+        // 完整分析可能识别出快速分析遗漏的格式，源插件和目标插件按完整结果重新生成
+        const plugins = supportedPlugins(report);
+        const sourceInput = document.getElementById('selected-source');
+        const targetInput = document.getElementById('selected-target');
+        if (!report.source_formats.includes(sourceInput.value)) {
+            sourceInput.value = report.source_formats[0] || '';
+        }
+        const targets = (report.available_targets || []).filter(id => !report.source_formats.includes(id));
+        if (!targets.includes(targetInput.value)) {
+            targetInput.value = targets[0] || '';
+        }
+        document.getElementById('source-plugins-grid').innerHTML =
+            renderPluginGrid(report, plugins, true, sourceInput.value);
+        document.getElementById('target-plugins-grid').innerHTML =
+            renderPluginGrid(report, plugins, false, targetInput.value);
+        document.getElementById('start-convert-btn').disabled = !targetInput.value;
     }
 
     function updateProgress(percent, text) {